@@ -10,7 +10,8 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 
-SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "dev-secret-change-me")
+# Cùng quy tắc với services/auth_service: không có khóa mặc định ngoài APP_ENV=development
+SECRET_KEY = os.getenv("AUTH_SECRET_KEY") or ("dev-secret-change-me" if os.getenv("APP_ENV", "development") == "development" else "")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
 
@@ -34,10 +35,11 @@ def _hpw(pw: str) -> str:
     return pwd_context.hash(pw)
 
 
-def _init_users() -> None:
+def _init_users() -> Dict[str, User]:
+    # Băm mật khẩu demo ở lần đăng nhập đầu tiên thay vì lúc import
     global _USERS
     if _USERS:
-        return
+        return _USERS
     _USERS = {
         "student1": {
             "username": "student1",
@@ -68,9 +70,7 @@ def _init_users() -> None:
             "hashed_password": _hpw("123456"),
         },
     }
-
-
-_init_users()
+    return _USERS
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -78,7 +78,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def authenticate_user(username: str, password: str) -> Optional[User]:
-    user = _USERS.get(username)
+    user = _init_users().get(username)
     if not user:
         return None
     if not verify_password(password, user["hashed_password"]):
@@ -90,6 +90,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    if not SECRET_KEY:
+        raise RuntimeError("AUTH_SECRET_KEY is not set")
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -99,6 +101,8 @@ async def decode_token(token: str) -> User:
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not SECRET_KEY:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str | None = payload.get("sub")
@@ -106,7 +110,7 @@ async def decode_token(token: str) -> User:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = _USERS.get(username)
+    user = _init_users().get(username)
     if user is None:
         raise credentials_exception
     return user
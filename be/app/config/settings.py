@@ -13,6 +13,96 @@ DATABASE_URL = os.getenv(
     "mysql+pymysql://root:@localhost:3306/student_support_chat"
 )
 
+
+
+def _async_url(url: str) -> str:
+    """Đổi driver đồng bộ sang driver async tương ứng."""
+    for sync_prefix, async_prefix in (("mysql+pymysql://", "mysql+aiomysql://"), ("sqlite://", "sqlite+aiosqlite://")):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+# Async driver cho AsyncSession (mặc định suy ra từ DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
 # Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.0-pro")
+
+# Connection pool (SQLAlchemy QueuePool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Nhỏ hơn wait_timeout của MySQL để không dùng lại kết nối đã bị server đóng
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Read replica cho các truy vấn phân tích (mặc định dùng chung DB chính)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", DATABASE_URL)
+# Pool riêng, nhỏ hơn, để dashboard lãnh đạo không chiếm hết kết nối của chat
+ANALYTICS_POOL_SIZE = int(os.getenv("ANALYTICS_POOL_SIZE", "3"))
+ANALYTICS_MAX_OVERFLOW = int(os.getenv("ANALYTICS_MAX_OVERFLOW", "2"))
+
+# Lưu trữ thread đã giải quyết (xem archive_threads.py)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# Xóa hẳn khỏi bảng lưu trữ sau số ngày này (0 = giữ vĩnh viễn)
+ARCHIVE_PURGE_AFTER_DAYS = int(os.getenv("ARCHIVE_PURGE_AFTER_DAYS", "0"))
+# Số thread chuyển/xóa trong một transaction, giữ khóa ngắn
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+
+# Backend tìm kiếm: auto (theo database), mysql (FULLTEXT), sqlite (FTS5) hoặc like
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# innodb_ft_min_token_size của MySQL: từ ngắn hơn được lọc bằng LIKE thay vì FULLTEXT
+SEARCH_MYSQL_MIN_TOKEN_SIZE = int(os.getenv("SEARCH_MYSQL_MIN_TOKEN_SIZE", "3"))
+
+# Cache thông tin người dùng theo token (mỗi request đã xác thực)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Môi trường chạy; chỉ "development" mới được dùng khóa JWT mặc định
+APP_ENV = os.getenv("APP_ENV", "development")
+
+# JWT: mọi worker/node phải dùng chung AUTH_SECRET_KEY; với APP_ENV khác development (vd. production)
+# mà thiếu khóa thì app không khởi động
+DEV_AUTH_SECRET_KEY = "dev-secret-change-me"
+AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY") or (DEV_AUTH_SECRET_KEY if APP_ENV == "development" else "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Theo dõi độ trễ event loop (xem /diagnostics/event-loop)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "100"))
+
+# Pool worker sinh phản hồi tự động (job chia theo thread_id, hàng đợi giới hạn)
+ROUTER_WORKER_CONCURRENCY = int(os.getenv("ROUTER_WORKER_CONCURRENCY", "4"))
+ROUTER_WORKER_QUEUE_SIZE = int(os.getenv("ROUTER_WORKER_QUEUE_SIZE", "1000"))
+
+# Cache câu trả lời của Gemini (ANSWER_CACHE_SIMILARITY: ngưỡng Jaccard MinHash cho câu hỏi
+# gần giống, 0 = chỉ khớp chính xác; xem services/answer_cache.py)
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.8"))
+ANSWER_CACHE_MIN_CHARS = int(os.getenv("ANSWER_CACHE_MIN_CHARS", "10"))
+
+# Ngữ cảnh gửi cho Gemini: tổng số token ước lượng của prompt, phần dành cho tóm tắt tin nhắn cũ
+GEMINI_CONTEXT_TOKENS = int(os.getenv("GEMINI_CONTEXT_TOKENS", "4000"))
+GEMINI_SUMMARY_TOKENS = int(os.getenv("GEMINI_SUMMARY_TOKENS", "800"))
+
+# Nhà cung cấp LLM: gemini | fake (giả lập offline cho load test, xem replay_load.py)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.4"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_OUTPUT_WORDS = int(os.getenv("FAKE_LLM_OUTPUT_WORDS", "80"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# Gọi LLM: thời hạn mỗi lần gọi (giây), số lần thử lại với backoff ngẫu nhiên (ms),
+# circuit breaker mở sau LLM_BREAKER_FAILURES lỗi liên tiếp, thử lại sau LLM_BREAKER_RESET_SECONDS
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_MS = float(os.getenv("LLM_RETRY_BACKOFF_MS", "500"))
+LLM_RETRY_BACKOFF_MAX_MS = float(os.getenv("LLM_RETRY_BACKOFF_MAX_MS", "4000"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
@@ -1,14 +1,89 @@
-from sqlalchemy import create_engine
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config.settings import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DATABASE_REPLICA_URL,
+    ANALYTICS_POOL_SIZE,
+    ANALYTICS_MAX_OVERFLOW,
+)
+from .pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolMetrics
+
+
+def engine_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW, is_async: bool = False) -> Dict[str, Any]:
+    """Tham số pool cho create_engine theo cấu hình trong settings."""
+    parsed = make_url(url)
+    # SQLite in-memory dùng SingletonThreadPool, không nhận các tham số của QueuePool
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-from ..config.settings import DATABASE_URL
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+# Số liệu pool theo tên engine (xem /diagnostics/db-pool)
+pool_metrics: Dict[str, PoolMetrics] = {"primary": PoolMetrics("primary")}
+pool_metrics["primary"].attach(engine)
+
+# Engine cho truy vấn phân tích: trỏ tới replica, pool riêng và nhỏ hơn
+analytics_engine = create_engine(
+    DATABASE_REPLICA_URL,
+    **engine_options(DATABASE_REPLICA_URL, pool_size=ANALYTICS_POOL_SIZE, max_overflow=ANALYTICS_MAX_OVERFLOW)
+)
+pool_metrics["analytics"] = PoolMetrics("analytics")
+pool_metrics["analytics"].attach(analytics_engine)
+
+
+class RoutingSession(Session):
+    """Session gửi truy vấn đọc sang analytics_engine khi được đánh dấu read_only.
+
+    Mọi thao tác ghi (flush, INSERT/UPDATE/DELETE) luôn đi về engine chính; sau lần ghi đầu tiên,
+    các truy vấn đọc còn lại của transaction cũng đọc từ engine chính (replica không thấy
+    phần vừa ghi chưa commit).
+    """
+
+    _wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._wrote:
+            if not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+                return analytics_engine
+            self._wrote = True
+        return engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _read_from_replica_again(session, transaction):
+    # Hết transaction ngoài cùng (commit/rollback): truy vấn đọc lại đi sang replica
+    if transaction.parent is None:
+        session._wrote = False
+
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: đối tượng vẫn dùng được sau commit mà không cần refresh
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Session chỉ đọc cho các endpoint phân tích/báo cáo
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession, info={"read_only": True})
 
 # Create Base class
 Base = declarative_base()
@@ -20,3 +95,36 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get read-only (replica) DB session
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async engine được tạo khi dùng lần đầu, để driver async (aiomysql/aiosqlite)
+# chỉ bắt buộc khi có endpoint async thực sự được gọi
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+        # expire_on_commit=False: tránh lazy IO khi serialize sau commit
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+        pool_metrics["async"] = PoolMetrics("async")
+        pool_metrics["async"].attach(_async_engine.sync_engine)
+    return _async_engine
+
+
+# Dependency to get async DB session
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,117 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Ngưỡng (giây) của histogram thời gian chờ lấy kết nối
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """Thu thập số liệu của một connection pool (thread-safe)."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._buckets: List[int] = [0] * (len(CHECKOUT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self._buckets[bisect_left(CHECKOUT_BUCKETS, seconds)] += 1
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def attach(self, engine: Engine) -> None:
+        """Đăng ký lắng nghe sự kiện của pool thuộc engine.
+
+        Chỉ giữ engine, không giữ engine.pool: dispose() thay pool mới và số liệu đi theo pool mới.
+        """
+        self._engine = engine
+        self._instrument(engine.pool)
+
+        @event.listens_for(engine, "engine_disposed")
+        def _on_disposed(engine):
+            self._instrument(engine.pool)
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def _instrument(self, pool) -> None:
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.metrics = self
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self._engine.pool if self._engine is not None else None
+        data: Dict[str, Any] = {"name": self.name, "pool_class": type(pool).__name__ if pool else None}
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        with self._lock:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(CHECKOUT_BUCKETS + (float("inf"),), self._buckets):
+                cumulative += count
+                histogram["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            data.update({
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "checkout_latency_histogram": histogram,
+            })
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool đo thời gian chờ lấy kết nối ra khỏi pool."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Phiên bản dùng cho async engine (asyncio queue)."""
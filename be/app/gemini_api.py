@@ -1,8 +1,29 @@
-from google import genai 
+"""Gửi thử một prompt tới LLM provider đang cấu hình (LLM_PROVIDER), không chạy gì khi import.
 
-client = genai.Client()
+    python -m app.gemini_api "Explain how AI works in a few words"
+"""
+import sys
+import time
 
-response = client.models.generate_content(
-    model="gemini-1.5-pro",
-    contents="Explain how AI works in a few words",
-)
+from .services.llm_provider import get_provider
+
+
+def main() -> int:
+    prompt = " ".join(sys.argv[1:]) or "Explain how AI works in a few words"
+    provider = get_provider()
+    if not provider.is_configured():
+        print(f"LLM provider '{provider.name}' is not configured (set GEMINI_API_KEY or LLM_PROVIDER=fake)")
+        return 1
+
+    started = time.perf_counter()
+    first_token = None
+    for chunk in provider.stream([{"role": "user", "parts": [{"text": prompt}]}]):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        print(chunk, end="", flush=True)
+    print(f"\n\n[{provider.name}] first token {first_token or 0:.2f}s, total {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,13 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 from typing import List, Optional
 
 from dotenv import load_dotenv
 
-try:
-    import google.generativeai as genai
-except Exception:  # pragma: no cover
-    genai = None  # type: ignore
-
 from .schemas import Message, Thread
+from .services.llm_provider import GeminiProvider, ResilientProvider
 
 
 load_dotenv()  # load .env if present
@@ -21,15 +18,13 @@ def _get_api_key() -> Optional[str]:
 
 
 def is_configured() -> bool:
-    return _get_api_key() is not None and genai is not None
+    return _get_api_key() is not None
 
 
-def _ensure_configured() -> bool:
-    key = _get_api_key()
-    if not key or genai is None:
-        return False
-    genai.configure(api_key=key)
-    return True
+@lru_cache(maxsize=8)
+def _get_provider(key: str, model_name: str) -> ResilientProvider:
+    # Dùng lại model và circuit breaker giữa các lần gọi
+    return ResilientProvider(GeminiProvider(api_key=key, model=model_name))
 
 
 def generate_reply(thread: Thread, history: List[Message], user_text: str, *, model_name: str = "gemini-1.5-flash") -> Optional[str]:
@@ -37,7 +32,8 @@ def generate_reply(thread: Thread, history: List[Message], user_text: str, *, mo
     Create a short, helpful reply for the student's issue, considering the school's routing process.
     Returns None if Gemini is not configured or call fails.
     """
-    if not _ensure_configured():
+    key = _get_api_key()
+    if not key:
         return None
 
     system_preamble = (
@@ -72,16 +68,10 @@ Tin nhắn mới từ sinh viên:
 """
 
     try:
-        model = genai.GenerativeModel(model_name)
-        resp = model.generate_content([
+        text = _get_provider(key, model_name).generate([
             {"role": "user", "parts": [prompt]},
             *turns,
         ])
-        text = getattr(resp, "text", None)
-        if not text and hasattr(resp, "candidates") and resp.candidates:
-            # Fallback if text property not present
-            parts = getattr(resp.candidates[0].content, "parts", [])
-            text = "".join(getattr(p, "text", "") for p in parts)
         return (text or None)
     except Exception:
         return None
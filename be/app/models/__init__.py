@@ -1,6 +1,6 @@
 # Import các model vào đây để Alembic có thể phát hiện
-from .models import User, Thread, Message  # noqa
+from .models import User, Thread, Message, ThreadStat, ThreadArchive, MessageArchive  # noqa
 from .departments import Department  # noqa
 
 # Export các model để sử dụng trong ứng dụng
-__all__ = ['User', 'Thread', 'Message', 'Department']
+__all__ = ['User', 'Thread', 'Message', 'ThreadStat', 'ThreadArchive', 'MessageArchive', 'Department']
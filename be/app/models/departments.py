@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Integer
+from sqlalchemy import Column, String, ForeignKey, Text, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 
 from ..database.db import Base
+from .models import Timestamp
 
 
 class Department(Base):
@@ -17,7 +18,7 @@ class Department(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     
     # Relationships tạm thời bị comment vì các bảng khác chưa có foreign key liên kết
     # users = relationship("User", back_populates="department_info")
@@ -1,16 +1,23 @@
-from sqlalchemy import Column, String, ForeignKey, Text, DateTime, Enum, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, ForeignKey, Text, DateTime, Enum, Integer, Index, DDL, event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 # Thay thế UUID bằng VARCHAR để tương thích với MySQL
 import uuid
 
 from ..database.db import Base
+from ..utils.text import folded_default
 
 # Định nghĩa các trạng thái của Thread
 THREAD_STATUS = ('new', 'pending', 'assigned', 'in_progress', 'resolved', 'escalated')
 THREAD_PRIORITY = ('low', 'medium', 'normal', 'high', 'urgent')
 USER_ROLES = ('student', 'manager', 'department', 'leadership', 'system', 'assistant')
 
+# Mốc thời gian lưu đến giây như DATETIME của MySQL. Với SQLite, giá trị truyền vào cũng ghi
+# đúng định dạng của CURRENT_TIMESTAMP (server_default), nếu không "... 09:34:58.000000" lớn hơn
+# "... 09:34:58" khi so chuỗi và cursor phân trang (created_at, id) không bao giờ qua được giây đó
+Timestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
 
 class User(Base):
     __tablename__ = "users"
@@ -24,7 +31,7 @@ class User(Base):
     department = Column(String(100), nullable=True)  # Giữ lại trường cũ để tương thích
     # department_id bị comment vì cột này chưa tồn tại trong database
     # department_id = Column(String(36), ForeignKey("departments.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     
     # Relationships
     threads = relationship("Thread", back_populates="student", foreign_keys="Thread.student_id")
@@ -48,15 +55,42 @@ class Thread(Base):
     status = Column(Enum(*THREAD_STATUS), default="new", nullable=False)  # Thay đổi trạng thái mặc định thành "new"
     priority = Column(Enum(*THREAD_PRIORITY), default="normal", nullable=False)
     assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+    # Tóm tắt hoạt động, cập nhật cùng transaction với tin nhắn (message_service.create_message)
+    last_message_at = Column(Timestamp, server_default=func.now())
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_preview = Column(String(255), nullable=True)
+    last_sender = Column(Enum(*USER_ROLES), nullable=True)
+    # Tiêu đề đã bỏ dấu cho tìm kiếm full-text, tự tính khi INSERT (kể cả insert hàng loạt)
+    search_title = deferred(Column(String(255), nullable=True, default=folded_default("title")))
+    # Tóm tắt cuốn chiếu các tin nhắn cũ dùng làm ngữ cảnh cho Gemini (xem context_builder),
+    # context_summary_upto: id tin nhắn cuối cùng đã gộp vào tóm tắt
+    context_summary = deferred(Column(Text, nullable=True))
+    context_summary_upto = Column(Integer, nullable=True)
     
     # Relationships
-    student = relationship("User", back_populates="threads", foreign_keys=[student_id])
-    assignee_user = relationship("User", back_populates="assigned_threads", foreign_keys=[assignee_id])
+    # lazy="raise": bắt buộc service phải eager-load, tránh N+1 khi serialize
+    student = relationship("User", back_populates="threads", foreign_keys=[student_id], lazy="raise")
+    assignee_user = relationship("User", back_populates="assigned_threads", foreign_keys=[assignee_id], lazy="raise")
     messages = relationship("Message", back_populates="thread", cascade="all, delete-orphan")
     # assigned_department = relationship("Department", back_populates="assigned_threads")
 
+    # Index phục vụ các truy vấn danh sách (lọc + sắp xếp theo created_at)
+    __table_args__ = (
+        Index("ix_threads_student_id_created_at", "student_id", "created_at"),
+        Index("ix_threads_assigned_to_status_created_at", "assigned_to", "status", "created_at"),
+        Index("ix_threads_status_created_at", "status", "created_at"),
+        # Danh sách phòng ban không lọc trạng thái, và danh sách toàn bộ của quản lý/lãnh đạo
+        Index("ix_threads_assigned_to_created_at", "assigned_to", "created_at"),
+        Index("ix_threads_created_at", "created_at"),
+        # Hộp thư phòng ban sắp xếp theo hoạt động gần nhất
+        Index("ix_threads_assigned_to_last_message_at", "assigned_to", "last_message_at"),
+        Index("ix_threads_search_title", "search_title", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+    # Lấy created_at/updated_at do server sinh ngay khi flush (RETURNING nếu hỗ trợ)
+    __mapper_args__ = {"eager_defaults": True}
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -66,8 +100,107 @@ class Message(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     sender = Column(Enum(*USER_ROLES), nullable=False)
     text = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    # Nội dung đã bỏ dấu cho tìm kiếm full-text
+    search_text = deferred(Column(Text, nullable=True, default=folded_default("text")))
     
     # Relationships
     thread = relationship("Thread", back_populates="messages")
-    user = relationship("User", back_populates="messages")
+    user = relationship("User", back_populates="messages", lazy="raise")
+
+    # Index phục vụ list_messages (lọc theo thread, sắp xếp theo thời gian)
+    __table_args__ = (
+        Index("ix_messages_thread_id_created_at_id", "thread_id", "created_at", "id"),
+        # Poll tin nhắn mới theo after_id (WHERE thread_id = ? AND id > ? ORDER BY id)
+        Index("ix_messages_thread_id_id", "thread_id", "id"),
+        Index("ix_messages_search_text", "search_text", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class ThreadStat(Base):
+    """Bộ đếm số thread theo (status, assigned_to), cập nhật cùng transaction với thread."""
+    __tablename__ = "thread_stats"
+
+    status = Column(Enum(*THREAD_STATUS), primary_key=True)
+    # Chuỗi rỗng đại diện cho thread chưa được phân công (khóa chính không nhận NULL)
+    assigned_to = Column(String(100), primary_key=True, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ThreadArchive(Base):
+    """Thread đã giải quyết lâu ngày, chuyển khỏi bảng threads bởi archive_service."""
+    __tablename__ = "threads_archive"
+
+    id = Column(String(36), primary_key=True)
+    title = Column(String(255), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"))
+    department = Column(String(100), nullable=True)
+    topic = Column(String(100), nullable=True)
+    issue_type = Column(String(100), nullable=True)
+    assigned_to = Column(String(100), nullable=True)
+    status = Column(Enum(*THREAD_STATUS), nullable=False)
+    priority = Column(Enum(*THREAD_PRIORITY), nullable=False)
+    assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(Timestamp)
+    updated_at = Column(Timestamp)
+    last_message_at = Column(Timestamp)
+    message_count = Column(Integer, nullable=False, default=0)
+    last_message_preview = Column(String(255), nullable=True)
+    last_sender = Column(Enum(*USER_ROLES), nullable=True)
+    archived_at = Column(Timestamp, server_default=func.now())
+
+    student = relationship("User", foreign_keys=[student_id], lazy="raise")
+    assignee_user = relationship("User", foreign_keys=[assignee_id], lazy="raise")
+
+    # Index phục vụ xóa hẳn theo thời hạn lưu trữ
+    __table_args__ = (
+        Index("ix_threads_archive_updated_at", "updated_at"),
+    )
+
+
+class MessageArchive(Base):
+    """Tin nhắn của thread đã lưu trữ (giữ nguyên id gốc)."""
+    __tablename__ = "messages_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    thread_id = Column(String(36), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    sender = Column(Enum(*USER_ROLES), nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(Timestamp)
+
+    user = relationship("User", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_messages_archive_thread_id_created_at_id", "thread_id", "created_at", "id"),
+    )
+
+
+# SQLite (dev/test): bảng FTS5 external-content trỏ vào cột tìm kiếm, đồng bộ bằng trigger
+SQLITE_FTS_DDL = {
+    "threads": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS threads_fts USING fts5(search_title, content='threads', content_rowid='rowid')",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_ai AFTER INSERT ON threads BEGIN "
+        "INSERT INTO threads_fts(rowid, search_title) VALUES (new.rowid, new.search_title); END",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_ad AFTER DELETE ON threads BEGIN "
+        "INSERT INTO threads_fts(threads_fts, rowid, search_title) VALUES ('delete', old.rowid, old.search_title); END",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_au AFTER UPDATE OF search_title ON threads BEGIN "
+        "INSERT INTO threads_fts(threads_fts, rowid, search_title) VALUES ('delete', old.rowid, old.search_title); "
+        "INSERT INTO threads_fts(rowid, search_title) VALUES (new.rowid, new.search_title); END",
+    ],
+    "messages": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(search_text, content='messages', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF search_text ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        "INSERT INTO messages_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    ],
+}
+
+for _model in (Thread, Message):
+    for _statement in SQLITE_FTS_DDL[_model.__tablename__]:
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -2,3 +2,5 @@ from . import auth
 from . import threads
 from . import messages
 from . import leadership
+from . import search
+from . import answer_cache
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Any, Optional
+
+from ..services import auth_service
+from ..services.answer_cache import answer_cache
+
+router = APIRouter(prefix="/answer-cache", tags=["answer-cache"])
+
+STAFF_ROLES = ["manager", "department", "leadership"]
+
+
+@router.get("")
+def get_answer_cache_stats(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in STAFF_ROLES:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return answer_cache.stats()
+
+
+@router.delete("")
+def invalidate_answers(
+    topic: Optional[str] = None,
+    department: Optional[str] = None,
+    question: Optional[str] = Query(None, max_length=1000),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
+):
+    """Xóa câu trả lời đã cache khi thông tin thay đổi (vd. đổi hạn nộp học phí)."""
+    if not current_user or current_user["role"] not in STAFF_ROLES:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    # Phòng/khoa chỉ xóa được câu trả lời thuộc phòng/khoa mình
+    if current_user["role"] == "department":
+        if not current_user.get("department"):
+            raise HTTPException(status_code=403, detail="Access denied")
+        department = current_user["department"]
+
+    return {"invalidated": answer_cache.invalidate(topic=topic, department=department, question=question)}
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Optional, Any
 
-from ..database.db import get_db
+from ..database.db import get_db, get_async_db
+from ..models.models import User
 from ..services import auth_service
-from ..schemas import Token, UserCreate, UserResponse
+from ..schemas import Token, RefreshRequest, UserCreate, UserResponse
 
 router = APIRouter(tags=["authentication"], prefix="/auth")
 
@@ -13,9 +16,9 @@ router = APIRouter(tags=["authentication"], prefix="/auth")
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth_service.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,22 +26,28 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Tạo token đơn giản
-    access_token = auth_service.create_access_token(
-        data={"sub": user.username}
-    )
+    # JWT có chữ ký: worker/node nào cũng kiểm tra được
+    return auth_service.issue_tokens(user)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    claims = auth_service.decode_token(body.refresh_token, token_type="refresh")
+    user = None
+    if claims:
+        user = (await db.scalars(select(User).filter(User.username == claims["sub"]))).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "username": user.username,
-            "full_name": user.full_name,
-            "email": user.email,
-            "role": user.role,
-            "department": user.department
-        }
-    }
+    # Cấp cặp token mới (refresh token cũng được làm mới)
+    return auth_service.issue_tokens(user)
 
 
 @router.post("/register", response_model=UserResponse)
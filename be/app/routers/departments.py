@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import Dict, List, Any
+from typing import Dict, List, Optional, Any
 
 from ..database.db import get_db
 from ..services import department_service, auth_service
+from ..services.pagination import MAX_PAGE_SIZE, next_cursor
 from ..schemas.department_schemas import (
     DepartmentCreate, 
     DepartmentResponse, 
@@ -35,14 +36,15 @@ def create_department(
 
 @router.get("/departments", response_model=DepartmentListResponse)
 def list_departments(
-    skip: int = 0, 
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
     db: Session = Depends(get_db)
 ):
     # Tất cả người dùng đã đăng nhập đều có thể xem danh sách phòng ban
-    departments = department_service.list_departments(db, skip, limit)
-    return {"departments": departments}
+    departments = department_service.list_departments(db, skip, limit, cursor)
+    return {"departments": departments, "next_cursor": next_cursor(departments, limit)}
 
 
 @router.get("/departments/{department_id}", response_model=DepartmentResponse)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Dict, Any
+
+from ..database.db import pool_metrics
+from ..services import auth_service
+from ..services.llm_provider import get_provider
+from ..services.router_worker import router_worker
+from ..utils.cache import caches
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/db-pool")
+def get_db_pool_stats(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {"pools": [metrics.snapshot() for metrics in pool_metrics.values()]}
+
+
+@router.get("/caches")
+def get_cache_stats(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {"caches": [cache.stats() for cache in caches.values()]}
+
+
+@router.get("/event-loop")
+def get_event_loop_lag(request: Request, current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    monitor = getattr(request.app.state, "loop_monitor", None)
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Event loop monitor not running")
+    return monitor.snapshot()
+
+
+@router.get("/router-worker")
+def get_router_worker_stats(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return router_worker.stats()
+
+
+@router.get("/llm")
+def get_llm_stats(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    if not current_user or current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return get_provider().stats()
@@ -1,35 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict
+from typing import Dict, Optional, Literal
+from datetime import datetime
 
-from ..database.db import get_db
-from ..services import thread_service, auth_service
-from ..schemas import ThreadStatistics, ThreadListResponse
+from ..database.db import get_db, get_read_db, ReadSessionLocal
+from ..services import thread_service, auth_service, export_service, import_service
+from ..services.pagination import MAX_PAGE_SIZE, next_cursor
+from ..schemas import ThreadStatistics, ThreadListResponse, ThreadStatus, ImportReport
 
 router = APIRouter(prefix="/leadership", tags=["leadership"])
 
 
 @router.get("/threads", response_model=ThreadListResponse)
 def list_leadership_threads(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[ThreadStatus] = None,
     current_user: Dict = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user["role"] != "leadership":
         raise HTTPException(status_code=403, detail="Access denied")
         
-    threads = thread_service.list_threads(db, skip, limit)
-    return {"threads": threads}
+    threads = thread_service.list_threads(db, skip, limit, cursor, status=status)
+    return {"threads": threads, "next_cursor": next_cursor(threads, limit)}
 
 
 @router.get("/analytics", response_model=ThreadStatistics)
 def get_leadership_analytics(
     current_user: Dict = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user["role"] != "leadership":
         raise HTTPException(status_code=403, detail="Access denied")
         
     stats = thread_service.get_thread_statistics(db)
     return ThreadStatistics(**stats)
+
+
+@router.get("/export")
+def export_data(
+    kind: Literal["threads", "messages"] = "threads",
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Dict = Depends(auth_service.get_current_user)
+):
+    if current_user["role"] != "leadership":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Generator tự quản lý session (đọc từ replica) vì chạy sau khi endpoint trả về
+    chunks = export_service.stream_export(
+        ReadSessionLocal, kind, format,
+        status=status, department=department, date_from=date_from, date_to=date_to
+    )
+    filename = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=export_service.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import", response_model=ImportReport)
+def import_data(
+    kind: Literal["threads", "messages"] = "threads",
+    format: Literal["ndjson", "csv"] = "ndjson",
+    chunk_size: int = Query(import_service.CHUNK_SIZE, ge=1, le=import_service.MAX_CHUNK_SIZE),
+    file: UploadFile = File(...),
+    current_user: Dict = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_db)
+):
+    if current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Đọc file tải lên theo từng dòng, không nạp toàn bộ vào bộ nhớ
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    return import_service.import_records(db, stream, kind, format, chunk_size)
@@ -1,20 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, Any, Optional
+from datetime import datetime
+import asyncio
+import json
 from pydantic import TypeAdapter
 
-from ..database.db import get_db
-from ..services import message_service, auth_service, thread_service
+from ..database.db import get_async_db
+from ..services import auth_service, async_message_service, async_thread_service
+from ..services.pagination import MAX_PAGE_SIZE, next_cursor
+from ..services.router_worker import router_worker
+from ..services.reply_stream import reply_stream
+from ..models.models import ThreadArchive
 from ..schemas import MessageCreate, MessageResponse, MessageListResponse
 
 router = APIRouter(tags=["messages"])
 
+# Gửi comment giữ kết nối SSE khi không có sự kiện (giây)
+STREAM_KEEPALIVE_SECONDS = 15
+
 
 @router.get("/threads/{thread_id}/messages", response_model=MessageListResponse)
-def list_messages(
+async def list_messages(
     thread_id: str,  # Changed from int to str to support UUID strings
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check for authentication
     if not current_user:
@@ -25,7 +40,7 @@ def list_messages(
         )
     
     # Check if thread exists
-    thread = thread_service.get_thread(db, thread_id)
+    thread = await async_thread_service.get_thread(db, thread_id)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
@@ -36,25 +51,27 @@ def list_messages(
     if current_user["role"] == "department" and thread.assigned_to != current_user["department"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get messages
-    messages = message_service.list_messages(db, thread_id)
+    # Polling: chỉ trả về tin nhắn mới, 204 nếu không có gì thay đổi
+    if after_id is not None or since is not None:
+        messages = await async_message_service.list_new_messages(db, thread_id, after_id, since)
+        if not messages:
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
+        return {"messages": messages}
     
-    # Convert message IDs to strings if needed for the response
-    for msg in messages:
-        if hasattr(msg, 'id') and msg.id is not None:
-            # We don't modify the objects directly, just ensure they're properly 
-            # handled when serialized to JSON
-            pass
+    # Get messages (cũ nhất trước, phân trang theo cursor)
+    messages = await async_message_service.list_messages(
+        db, thread_id, limit, cursor, archived=isinstance(thread, ThreadArchive)
+    )
     
-    return {"messages": messages}
+    return {"messages": messages, "next_cursor": next_cursor(messages, limit)}
 
 
 @router.post("/threads/{thread_id}/messages")
-def post_message(
+async def post_message(
     thread_id: str,  # Changed from int to str to support UUID strings
     message: Dict[str, Any],  # Changed from MessageCreate to Dict to accept any fields
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check for authentication
     if not current_user:
@@ -69,8 +86,8 @@ def post_message(
     print(f"Current user: {current_user}")
     print(f"Thread ID: {thread_id}")
     
-    # Check if thread exists
-    thread = thread_service.get_thread(db, thread_id)
+    # Check if thread exists (thread đã lưu trữ không nhận tin nhắn mới)
+    thread = await async_thread_service.get_thread(db, thread_id, include_archived=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
@@ -90,13 +107,17 @@ def post_message(
     
     try:
         # Create message
-        new_message = message_service.create_message(
+        new_message = await async_message_service.create_message(
             db=db,
             thread_id=thread_id,
             message_data=message,
             user_id=current_user["id"]
         )
         
+        # Phản hồi tự động chạy nền trong pool worker, không chặn request
+        if new_message.sender == "student":
+            router_worker.enqueue(thread_id, "student", new_message.text, new_message.id)
+        
         # Skip complex validation and just return a direct dict
         # This bypasses the pydantic model validation which may be causing issues
         return {
@@ -113,3 +134,45 @@ def post_message(
             status_code=500,
             detail=f"Failed to create message: {str(e)}"
         )
+
+
+@router.get("/threads/{thread_id}/stream")
+async def stream_replies(
+    thread_id: str,
+    request: Request,
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Server-Sent Events: phản hồi tự động đang sinh (start/chunk) và tin nhắn đã lưu (done)."""
+    thread = await async_thread_service.get_thread(db, thread_id)
+    if not thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    
+    # Check permissions
+    if current_user["role"] == "student" and thread.student_id != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if current_user["role"] == "department" and thread.assigned_to != current_user["department"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Trả kết nối database về pool, không giữ suốt thời gian stream
+    await db.close()
+    
+    async def events() -> AsyncIterator[str]:
+        queue = reply_stream.subscribe(thread_id)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            reply_stream.unsubscribe(thread_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Literal
+
+from ..database.db import get_read_db
+from ..services import auth_service, search_service
+from ..schemas import SearchResponse
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/search", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Literal["all", "threads", "messages"] = "all",
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    # Check for authentication
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Kết quả chỉ gồm các thread người dùng được phép xem
+    return search_service.search(db, current_user, q, kind, limit)
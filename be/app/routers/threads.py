@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Any, Literal
 
-from ..database.db import get_db
-from ..services import thread_service, message_service, auth_service
+from ..database.db import get_db, get_async_db, get_read_db
+from ..services import thread_service, workflow_service, auth_service, async_thread_service
+from ..services.pagination import MAX_PAGE_SIZE, next_cursor
+from ..services.router_worker import router_worker
 from ..schemas import (
     ThreadCreate, 
     ThreadResponse, 
     ThreadListResponse, 
+    ThreadStatus,
     ThreadUpdate
 )
 
@@ -20,53 +24,63 @@ def create_thread(
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Create the thread
-    thread = thread_service.create_thread(
+    # Create the thread (kèm tin nhắn đầu tiên nếu có) trong một transaction
+    thread, issue_message = workflow_service.create_thread_with_issue(
         db=db, 
         thread_data=thread_data, 
         student_id=current_user["id"] if current_user["role"] == "student" else None
     )
     
-    # If initial issue provided, post it as first message
-    if thread_data.issue:
-        message_service.create_message(
-            db=db,
-            thread_id=thread.id,
-            message_data={"text": thread_data.issue, "sender": "student"},
-            user_id=current_user["id"] if current_user["role"] == "student" else None
-        )
+    # Phản hồi tự động cho vấn đề sinh viên gửi kèm (sau commit, worker đọc được tin nhắn)
+    if issue_message is not None and issue_message.sender == "student":
+        router_worker.enqueue(thread.id, "student", issue_message.text, issue_message.id)
     
     return thread
 
 
 @router.get("/threads", response_model=ThreadListResponse)
-def list_threads(
-    skip: int = 0, 
-    limit: int = 100,
+async def list_threads(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "last_message_at"] = "created_at",  # last_message_at: hoạt động gần nhất trước
+    status: Optional[ThreadStatus] = None,  # chỉ áp dụng cho danh sách của phòng ban/quản lý
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Different listing based on user role
     if current_user["role"] == "student":
-        threads = thread_service.list_threads_by_student(db, current_user["id"], skip, limit)
+        threads = await async_thread_service.list_threads_by_student(db, current_user["id"], skip, limit, cursor, sort)
     elif current_user["role"] == "department":
         # Lấy threads theo phòng ban
         if current_user.get("department_id"):
             # Ưu tiên dùng department_id nếu có
-            threads = thread_service.list_threads_by_department(db, current_user["department_id"], skip, limit)
+            threads = await async_thread_service.list_threads_by_department(db, current_user["department_id"], skip, limit, cursor, sort, status)
         elif current_user.get("department"):
             # Fallback về tên phòng ban nếu chưa có id
-            threads = thread_service.list_threads_by_department(db, current_user["department"], skip, limit)
+            threads = await async_thread_service.list_threads_by_department(db, current_user["department"], skip, limit, cursor, sort, status)
         else:
             # Nếu không có thông tin phòng ban thì trả về danh sách rỗng
             threads = []
     elif current_user["role"] in ["manager", "leadership"]:
-        threads = thread_service.list_threads(db, skip, limit)
+        threads = await async_thread_service.list_threads(db, skip, limit, cursor, sort, status)
     else:
         threads = []
     
     # Lưu ý: Thread sẽ được tự động join với Department thông qua relationship
-    return {"threads": threads}
+    return {"threads": threads, "next_cursor": next_cursor(threads, limit, sort)}
+
+
+# Khai báo trước /threads/{thread_id} để không bị route đó che mất
+@router.get("/threads/statistics", response_model=Dict)
+def get_thread_statistics(
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    if current_user["role"] not in ["manager", "leadership"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return thread_service.get_thread_statistics(db)
 
 
 @router.get("/threads/{thread_id}", response_model=ThreadResponse)
@@ -100,7 +114,8 @@ def update_thread(
     if current_user["role"] not in ["manager", "department", "leadership"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    thread = thread_service.get_thread(db, thread_id)
+    # Thread đã lưu trữ chỉ đọc
+    thread = thread_service.get_thread(db, thread_id, include_archived=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
@@ -108,28 +123,15 @@ def update_thread(
     if current_user["role"] == "department" and thread.assigned_to != current_user["department"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Update the thread
-    updated_thread = thread_service.update_thread(db, thread_id, thread_data)
-    
-    # Add response message if provided
-    if thread_data.response:
-        message_service.create_message(
-            db=db,
-            thread_id=thread_id,
-            message_data={"text": thread_data.response, "sender": current_user["role"]},
-            user_id=current_user["id"]
-        )
-        
-        # Add system notification if status changed to resolved
-        if thread_data.status == "resolved":
-            message_service.create_message(
-                db=db,
-                thread_id=thread_id,
-                message_data={
-                    "text": f"[SYSTEM] Vấn đề của bạn đã được {current_user['department'] if current_user['department'] else 'giải quyết'} giải quyết.",
-                    "sender": "system"
-                }
-            )
+    # Update the thread (kèm phản hồi/thông báo) trong một transaction
+    updated_thread = workflow_service.respond_to_thread(
+        db,
+        thread,
+        thread_data,
+        role=current_user["role"],
+        user_id=current_user["id"],
+        department=current_user["department"]
+    )
     
     return updated_thread
 
@@ -152,40 +154,12 @@ def assign_thread(
     if current_user["role"] != "manager":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    thread = thread_service.get_thread(db, thread_id)
+    thread = thread_service.get_thread(db, thread_id, include_archived=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    # Import department_service để sử dụng
-    from ..services.department_service import get_department_by_name
-    
-    # Kiểm tra xem phòng ban có tồn tại không
-    department_obj = get_department_by_name(db, department)
-    if not department_obj:
-        # Tạo department mới nếu chưa tồn tại
-        from ..services.department_service import create_department
-        from ..schemas.department_schemas import DepartmentCreate
-        
-        department_obj = create_department(db, DepartmentCreate(name=department, description="Auto-created department"))
-    
-    # Cập nhật thread với tên phòng ban
-    thread_data = ThreadUpdate(
-        assigned_to=department,
-        status="assigned"  # Đổi thành "assigned" thay vì "in_progress" để phù hợp với workflow
-    )
-    updated_thread = thread_service.update_thread(db, thread_id, thread_data)
-    
-    # Add system message about assignment
-    message_service.create_message(
-        db=db,
-        thread_id=thread_id,
-        message_data={
-            "text": f"[SYSTEM] Yêu cầu đã được chuyển đến phòng/khoa: {department}",
-            "sender": "system"
-        }
-    )
-    
-    return updated_thread
+    # Phân công (tạo phòng ban nếu cần) trong một transaction
+    return workflow_service.assign_thread(db, thread, department)
 
 
 @router.post("/threads/{thread_id}/escalate", response_model=ThreadResponse)
@@ -197,33 +171,8 @@ def escalate_thread(
     if current_user["role"] not in ["manager", "department"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    thread = thread_service.get_thread(db, thread_id)
+    thread = thread_service.get_thread(db, thread_id, include_archived=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    # Update the thread
-    thread_data = ThreadUpdate(status="escalated")
-    updated_thread = thread_service.update_thread(db, thread_id, thread_data)
-    
-    # Add system message about escalation
-    message_service.create_message(
-        db=db,
-        thread_id=thread_id,
-        message_data={
-            "text": f"[SYSTEM] Vấn đề đã được chuyển lên cấp cao hơn.",
-            "sender": "system"
-        }
-    )
-    
-    return updated_thread
-
-
-@router.get("/threads/statistics", response_model=Dict)
-def get_thread_statistics(
-    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db)
-):
-    if current_user["role"] not in ["manager", "leadership"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return thread_service.get_thread_statistics(db)
+    return workflow_service.escalate_thread(db, thread)
@@ -3,6 +3,7 @@ from .schemas import (
     UserCreate,
     UserResponse,
     Token,
+    RefreshRequest,
     TokenData,
     ThreadBase,
     ThreadCreate,
@@ -13,8 +14,10 @@ from .schemas import (
     MessageResponse,
     ThreadListResponse,
     MessageListResponse,
+    SearchResponse,
     ThreadStatistics,
     RoleType,
     ThreadStatus,
     ThreadPriority
 )
+from .import_schemas import ThreadImport, MessageImport, ImportReport
@@ -21,6 +21,7 @@ class DepartmentResponse(DepartmentBase):
 
     class Config:
         from_attributes = True
+        coerce_numbers_to_str = True  # id trong DB là số nguyên
 
 
 class DepartmentUpdate(BaseModel):
@@ -32,3 +33,4 @@ class DepartmentUpdate(BaseModel):
 class DepartmentListResponse(BaseModel):
     """Schema dùng để trả về danh sách Department"""
     departments: List[DepartmentResponse]
+    next_cursor: Optional[str] = None
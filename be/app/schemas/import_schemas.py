@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .schemas import RoleType, ThreadStatus, ThreadPriority
+
+
+class ThreadImport(BaseModel):
+    """Một dòng thread khi nhập hàng loạt (cùng cột với file xuất /leadership/export)"""
+    id: Optional[str] = None
+    title: str
+    student_id: Optional[int] = None
+    department: Optional[str] = None
+    topic: Optional[str] = None
+    issue_type: Optional[str] = None
+    assigned_to: Optional[str] = None
+    status: ThreadStatus = "pending"
+    priority: ThreadPriority = "normal"
+    assignee_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class MessageImport(BaseModel):
+    """Một dòng message khi nhập hàng loạt"""
+    id: Optional[int] = None
+    thread_id: str
+    user_id: Optional[int] = None
+    sender: RoleType
+    text: str
+    created_at: Optional[datetime] = None
+
+
+class ImportReport(BaseModel):
+    """Kết quả một lần nhập: số dòng, dòng bị loại và tốc độ"""
+    kind: str
+    processed: int
+    inserted: int
+    rejected: int
+    rejected_rows: List[Dict[str, Any]]
+    seconds: float
+    rows_per_sec: float
@@ -40,15 +40,22 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+        coerce_numbers_to_str = True  # id trong DB là số nguyên
 
 
 # Authentication models
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Số giây access token còn hiệu lực
     user: UserBase
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[str] = None
@@ -79,9 +86,15 @@ class ThreadResponse(ThreadBase):
     assignee: Optional[UserBase] = None
     created_at: datetime
     updated_at: datetime
+    # Tóm tắt hoạt động cho trang danh sách
+    last_message_at: Optional[datetime] = None
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_sender: Optional[str] = None
 
     class Config:
         from_attributes = True
+        coerce_numbers_to_str = True  # id trong DB là số nguyên
 
 
 class ThreadUpdate(BaseModel):
@@ -110,15 +123,23 @@ class MessageResponse(MessageBase):
 
     class Config:
         from_attributes = True
+        coerce_numbers_to_str = True  # id trong DB là số nguyên
 
 
 # List response models
 class ThreadListResponse(BaseModel):
     threads: List[ThreadResponse]
+    next_cursor: Optional[str] = None  # Cursor cho trang kế tiếp (None nếu hết dữ liệu)
 
 
 class MessageListResponse(BaseModel):
     messages: List[MessageResponse]
+    next_cursor: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    threads: List[ThreadResponse]
+    messages: List[MessageResponse]
 
 
 # Statistics models
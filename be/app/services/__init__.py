@@ -2,3 +2,5 @@ from . import auth_service
 from . import gemini_service
 from . import thread_service
 from . import message_service
+from . import async_thread_service
+from . import async_message_service
@@ -0,0 +1,235 @@
+"""Cache câu trả lời của Gemini theo câu hỏi đã chuẩn hóa và chủ đề/phòng ban/trạng thái của thread
+(cùng các thông tin có trong system prompt).
+
+Chỉ cache câu trả lời không cá nhân hóa (xem gemini_service.stream_reply).
+Câu hỏi gần giống (khác từ đệm, thứ tự từ, gõ sai vài ký tự) dùng lại câu trả lời khi độ
+tương đồng Jaccard trên tập n-gram ký tự đạt ANSWER_CACHE_SIMILARITY (0 = chỉ khớp chính xác).
+Các số trong câu hỏi phải trùng nhau: "học kỳ 1" và "học kỳ 2" không bao giờ khớp.
+Ứng viên được tra qua LSH trên chữ ký MinHash (không duyệt cả cache), rồi mới so Jaccard
+chính xác, để sai số của ước lượng MinHash không gây khớp nhầm.
+"""
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from ..config.settings import (
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_MIN_CHARS,
+)
+from ..utils.cache import TTLCache
+from ..utils.text import fold_text, search_terms
+
+# Độ dài n-gram ký tự dùng cho so khớp gần đúng
+NGRAM_SIZE = 3
+
+# Số hàm hash của chữ ký MinHash, chia thành LSH_BANDS dải để tra ứng viên: hai câu có
+# Jaccard 0.8 gần như chắc chắn trùng ít nhất một dải (1 - (1 - 0.8^4)^16 > 0.999)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+# Hệ số cố định: chữ ký giống nhau giữa các worker/lần khởi động
+_rng = random.Random(2021)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(MINHASH_PERMUTATIONS)
+]
+
+# Từ đệm/xưng hô (đã bỏ dấu) không làm đổi nội dung câu hỏi: "cho em hỏi ... ạ"
+FILLER_WORDS = frozenset(
+    "a ad admin oi nhe nha nhi xin cho hoi em giup voi vui long".split()
+)
+
+# (chủ đề, phòng ban, trạng thái thread, câu hỏi đã chuẩn hóa)
+AnswerKey = Tuple[str, str, str, str]
+Signature = Tuple[int, ...]
+
+
+class CachedAnswer(NamedTuple):
+    reply: str
+    shingles: FrozenSet[int]
+    latency_ms: float
+    created_at: float
+
+
+def normalize_question(text: Optional[str]) -> str:
+    """Bỏ dấu, chữ thường, bỏ dấu câu: "Hạn nộp học phí?" -> "han nop hoc phi"."""
+    return " ".join(search_terms(text))
+
+
+def numbers(question: str) -> FrozenSet[str]:
+    """Các từ có chữ số ("1", "2024", "k65"): câu hỏi khác số là câu hỏi khác."""
+    return frozenset(term for term in question.split() if any(ch.isdigit() for ch in term))
+
+
+def shingles(question: str) -> FrozenSet[int]:
+    """Tập hash của các n-gram ký tự trên các từ nội dung (thêm khoảng trắng hai đầu
+    để tính cả đầu/cuối từ)."""
+    content = " ".join(term for term in question.split() if term not in FILLER_WORDS)
+    padded = f" {content} "
+    return frozenset(
+        zlib.crc32(padded[i:i + NGRAM_SIZE].encode()) for i in range(max(1, len(padded) - NGRAM_SIZE + 1))
+    )
+
+
+def signature(hashed: FrozenSet[int]) -> Signature:
+    """Chữ ký MinHash: giá trị nhỏ nhất của từng hàm hash trên tập n-gram (tỉ lệ vị trí trùng
+    nhau giữa hai chữ ký xấp xỉ Jaccard của hai tập)."""
+    return tuple(min((a * x + b) % _MERSENNE_PRIME for x in hashed) for a, b in _PERMUTATIONS)
+
+
+def similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def bands(sig: Signature) -> List[Tuple[int, int]]:
+    """(số thứ tự dải, hash của dải): hai chữ ký trùng một dải thì là ứng viên của nhau."""
+    return [
+        (band, hash(sig[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND])) for band in range(LSH_BANDS)
+    ]
+
+
+class AnswerCache:
+    """TTL/LRU cache câu trả lời, kèm số liệu hit rate và thời gian gọi API tiết kiệm được."""
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        min_similarity: float = ANSWER_CACHE_SIMILARITY,
+        min_chars: int = ANSWER_CACHE_MIN_CHARS,
+    ) -> None:
+        self.cache = TTLCache("answers", maxsize=maxsize, ttl=ttl)
+        # (chủ đề, phòng ban, trạng thái, số thứ tự dải, hash của dải) -> khóa của câu trả lời lưu gần nhất
+        self.by_band = TTLCache("answer_bands", maxsize=maxsize * LSH_BANDS, ttl=ttl)
+        self.min_similarity = min_similarity
+        self.min_chars = min_chars
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.saved_ms = 0.0
+
+    def key(
+        self, topic: Optional[str], department: Optional[str], status: Optional[str], question: Optional[str]
+    ) -> Optional[AnswerKey]:
+        normalized = normalize_question(question)
+        # Câu quá ngắn ("ok", "cảm ơn") phụ thuộc ngữ cảnh hội thoại, không cache
+        if len(normalized) < self.min_chars:
+            return None
+        return fold_text(topic), fold_text(department), fold_text(status), normalized
+
+    def _is_near(self, key: AnswerKey, hashed: FrozenSet[int], other: AnswerKey, entry: CachedAnswer) -> bool:
+        return numbers(key[3]) == numbers(other[3]) and similarity(hashed, entry.shingles) >= self.min_similarity
+
+    def _find_similar(self, key: AnswerKey, hashed: FrozenSet[int]) -> Optional[CachedAnswer]:
+        candidates = {self.by_band.get(key[:3] + band) for band in bands(signature(hashed))} - {None, key}
+        best: Optional[CachedAnswer] = None
+        for candidate in candidates:
+            entry = self.cache.get(candidate)
+            if entry is not None and self._is_near(key, hashed, candidate, entry):
+                if best is None or similarity(hashed, entry.shingles) > similarity(hashed, best.shingles):
+                    best = entry
+        return best
+
+    def lookup(
+        self, topic: Optional[str], department: Optional[str], status: Optional[str], question: Optional[str]
+    ) -> Optional[str]:
+        key = self.key(topic, department, status, question)
+        if key is None:
+            return None
+
+        entry = self.cache.get(key)
+        near = False
+        if entry is None and self.min_similarity > 0:
+            hashed = shingles(key[3])
+            entry = self._find_similar(key, hashed)
+            if entry is not None:
+                near = True
+                # Lưu thêm cách hỏi này để lần sau khớp chính xác (hết hạn cùng bản gốc)
+                remaining = self.cache.ttl - (time.monotonic() - entry.created_at)
+                if remaining > 0:
+                    self.cache.set(key, entry._replace(shingles=hashed), ttl=remaining)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if near:
+                self.near_hits += 1
+            else:
+                self.exact_hits += 1
+            self.saved_ms += entry.latency_ms
+        return entry.reply
+
+    def store(
+        self, topic: Optional[str], department: Optional[str], status: Optional[str], question: Optional[str],
+        reply: str, latency_ms: float,
+    ) -> None:
+        key = self.key(topic, department, status, question)
+        if key is None or not reply:
+            return
+        hashed = shingles(key[3])
+        self.cache.set(key, CachedAnswer(reply, hashed, latency_ms, time.monotonic()))
+        if self.min_similarity > 0:
+            for band in bands(signature(hashed)):
+                self.by_band.set(key[:3] + band, key)
+        with self._lock:
+            self.stores += 1
+
+    def invalidate(
+        self,
+        topic: Optional[str] = None,
+        department: Optional[str] = None,
+        question: Optional[str] = None,
+    ) -> int:
+        """Xóa câu trả lời theo chủ đề/phòng ban và/hoặc câu hỏi (kèm các câu gần giống, ở mọi
+        trạng thái thread); không điều kiện = xóa hết."""
+        topic_key = fold_text(topic) if topic is not None else None
+        department_key = fold_text(department) if department is not None else None
+        normalized = normalize_question(question) if question is not None else None
+
+        def in_scope(key: AnswerKey) -> bool:
+            return (topic_key is None or key[0] == topic_key) and (department_key is None or key[1] == department_key)
+
+        if normalized is None:
+            self.by_band.invalidate_where(lambda key, target: in_scope(target))
+            return self.cache.invalidate_where(lambda key, entry: in_scope(key))
+
+        target = ("", "", "", normalized)
+        hashed = shingles(normalized)
+
+        def same_question(key: AnswerKey, entry: CachedAnswer) -> bool:
+            return key[3] == normalized or (self.min_similarity > 0 and self._is_near(target, hashed, key, entry))
+
+        # Xóa cả các cách hỏi khác đang dùng chung câu trả lời đó
+        stale = {
+            (key[:3], entry.reply) for key, entry in self.cache.items()
+            if in_scope(key) and same_question(key, entry)
+        }
+        return self.cache.invalidate_where(lambda key, entry: (key[:3], entry.reply) in stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            data = {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "latency_saved_ms": round(self.saved_ms, 1),
+                "min_similarity": self.min_similarity,
+            }
+        data["cache"] = self.cache.stats()
+        return data
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,122 @@
+"""Chuyển thread đã giải quyết lâu ngày sang bảng lưu trữ và xóa hẳn khi hết thời hạn."""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Insert, and_, delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from ..config.settings import ARCHIVE_AFTER_DAYS, ARCHIVE_PURGE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from ..models.models import Message, MessageArchive, Thread, ThreadArchive
+from .thread_service import bump_thread_stat
+
+threads = Thread.__table__
+messages = Message.__table__
+threads_archive = ThreadArchive.__table__
+messages_archive = MessageArchive.__table__
+
+
+def _copy(source, target, where) -> Insert:
+    # INSERT ... SELECT: dữ liệu không đi qua ứng dụng; chỉ chép các cột bảng
+    # lưu trữ có (bỏ cột tìm kiếm, thread lưu trữ không nằm trong kết quả tìm kiếm)
+    columns = [c for c in source.columns if c.name in target.c]
+    return insert(target).from_select([c.name for c in columns], select(*columns).where(where))
+
+
+def _inactive_before(table, cutoff: datetime):
+    """Không thay đổi và không có tin nhắn mới từ cutoff.
+
+    Tin nhắn mới không cập nhật updated_at (chỉ cập nhật last_message_at), nên
+    phải xét cả hai cột để không lưu trữ thread resolved vẫn đang được trao đổi.
+    """
+    return and_(
+        table.c.updated_at < cutoff,
+        or_(table.c.last_message_at.is_(None), table.c.last_message_at < cutoff),
+    )
+
+
+def _move_batch(db: Session, thread_ids: List[str]) -> int:
+    db.execute(_copy(threads, threads_archive, threads.c.id.in_(thread_ids)))
+    moved = db.execute(_copy(messages, messages_archive, messages.c.thread_id.in_(thread_ids))).rowcount
+    db.execute(delete(messages).where(messages.c.thread_id.in_(thread_ids)))
+    db.execute(delete(threads).where(threads.c.id.in_(thread_ids)))
+    return moved
+
+
+def archive_resolved_threads(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> Dict[str, Any]:
+    """Chuyển thread resolved không có hoạt động trong older_than_days ngày (kèm tin nhắn) sang bảng lưu trữ.
+
+    Mỗi batch là một transaction riêng; thread_stats không đổi vì thống kê
+    vẫn tính cả thread đã lưu trữ.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    report = {"threads": 0, "messages": 0, "batches": 0}
+
+    while max_batches is None or report["batches"] < max_batches:
+        # SKIP LOCKED: bỏ qua thread đang được request khác cập nhật
+        thread_ids = db.scalars(
+            select(threads.c.id)
+            .where(threads.c.status == "resolved", _inactive_before(threads, cutoff))
+            .order_by(threads.c.updated_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not thread_ids:
+            break
+
+        try:
+            report["messages"] += _move_batch(db, thread_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        report["threads"] += len(thread_ids)
+        report["batches"] += 1
+
+    return report
+
+
+def purge_archive(
+    db: Session,
+    older_than_days: int = ARCHIVE_PURGE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> Dict[str, Any]:
+    """Xóa hẳn thread lưu trữ (kèm tin nhắn) không có hoạt động trong older_than_days ngày; 0 = không xóa."""
+    report = {"threads": 0, "messages": 0, "batches": 0}
+    if older_than_days <= 0:
+        return report
+
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    while max_batches is None or report["batches"] < max_batches:
+        rows = db.execute(
+            select(threads_archive.c.id, threads_archive.c.status, threads_archive.c.assigned_to)
+            .where(_inactive_before(threads_archive, cutoff))
+            .order_by(threads_archive.c.updated_at)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        thread_ids = [row.id for row in rows]
+        try:
+            report["messages"] += db.execute(
+                delete(messages_archive).where(messages_archive.c.thread_id.in_(thread_ids))
+            ).rowcount
+            db.execute(delete(threads_archive).where(threads_archive.c.id.in_(thread_ids)))
+            # Thread bị xóa hẳn thì không còn tính trong thống kê
+            for (status, assigned_to), count in Counter((row.status, row.assigned_to) for row in rows).items():
+                bump_thread_stat(db, status, assigned_to, -count)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        report["threads"] += len(thread_ids)
+        report["batches"] += 1
+
+    return report
@@ -0,0 +1,35 @@
+"""Các hàm tin nhắn dùng AsyncSession (cho các endpoint async)."""
+from typing import List, Optional, Dict, Any, Union
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import Message
+from ..schemas import MessageCreate
+from .message_service import build_message, thread_summary_update, list_messages_stmt, list_new_messages_stmt
+
+
+async def create_message(db: AsyncSession, thread_id: str, message_data: Union[MessageCreate, Dict[str, Any]], user_id: Optional[str] = None) -> Message:
+    """Create a new message in a thread."""
+    db_message = build_message(thread_id, message_data, user_id)
+    
+    try:
+        summary = thread_summary_update(db, db_message)
+        if summary is not None:
+            await db.execute(summary)
+        db.add(db_message)
+        await db.commit()
+        return db_message
+    except Exception as e:
+        await db.rollback()
+        print(f"Error creating message: {e}")
+        raise
+
+
+async def list_messages(db: AsyncSession, thread_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, archived: bool = False) -> List[Message]:
+    """List messages in a thread, oldest first, optionally paginated by cursor (archived: đọc bảng lưu trữ)."""
+    return (await db.scalars(list_messages_stmt(thread_id, limit, cursor, archived))).all()
+
+
+async def list_new_messages(db: AsyncSession, thread_id: str, after_id: Optional[int] = None, since: Optional[datetime] = None) -> List[Message]:
+    """List only messages newer than after_id (by id) and/or since."""
+    return (await db.scalars(list_new_messages_stmt(thread_id, after_id, since))).all()
@@ -0,0 +1,36 @@
+"""Các hàm đọc thread dùng AsyncSession (cho các endpoint async)."""
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import Thread
+from .thread_service import thread_select, get_thread_stmt, paginate_threads
+
+
+async def get_thread(db: AsyncSession, thread_id: str, include_archived: bool = True) -> Optional[Thread]:
+    """Get a thread by ID, falling back to threads_archive (read-only) on a miss."""
+    thread = (await db.scalars(get_thread_stmt(thread_id))).first()
+    if thread is None and include_archived:
+        thread = (await db.scalars(get_thread_stmt(thread_id, archived=True))).first()
+    return thread
+
+
+async def list_threads(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at", status: Optional[str] = None) -> List[Thread]:
+    """List all threads (lọc theo trạng thái nếu có)."""
+    stmt = thread_select()
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    return (await db.scalars(paginate_threads(stmt, skip, limit, cursor, sort))).all()
+
+
+async def list_threads_by_student(db: AsyncSession, student_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at") -> List[Thread]:
+    """List threads by student ID."""
+    stmt = thread_select().filter(Thread.student_id == student_id)
+    return (await db.scalars(paginate_threads(stmt, skip, limit, cursor, sort))).all()
+
+
+async def list_threads_by_department(db: AsyncSession, department: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at", status: Optional[str] = None) -> List[Thread]:
+    """List threads by department name."""
+    stmt = thread_select().filter(Thread.assigned_to == department)
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    return (await db.scalars(paginate_threads(stmt, skip, limit, cursor, sort))).all()
@@ -1,14 +1,28 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.db import get_db
+from ..config.settings import (
+    USER_CACHE_TTL,
+    USER_CACHE_SIZE,
+    AUTH_SECRET_KEY,
+    JWT_ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+)
+from ..database.db import get_async_db
 from ..models.models import User
+from ..utils.cache import TTLCache
 
-# Đơn giản hóa: Sử dụng fake token cho demo
-fake_token_db = {}  # username -> token
-fake_users_db = {}  # token -> user_data
+# token -> thông tin người dùng, tránh truy vấn users ở mỗi request (kể cả polling)
+user_cache = TTLCache("users", maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
 # OAuth2 scheme vẫn giữ để tương thích với API
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
@@ -25,32 +39,104 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     return user
 
 
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """Như authenticate_user nhưng dùng AsyncSession."""
+    user = (await db.scalars(select(User).filter(User.username == username))).first()
+    if not user:
+        return None
+    if password != user.hashed_password:  # Lưu ý: trong production thì phải hash password
+        return None
+    return user
+
+
+def secret_key() -> str:
+    """Khóa ký JWT; không có khóa thì dừng hẳn thay vì ký bằng khóa ai cũng biết."""
+    if not AUTH_SECRET_KEY:
+        raise RuntimeError("AUTH_SECRET_KEY is not set (set it, or APP_ENV=development for the dev key)")
+    return AUTH_SECRET_KEY
+
+
+def _encode_token(username: str, token_type: str, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": username,
+        "type": token_type,
+        "iat": now,
+        "exp": now + expires_delta,
+        "jti": uuid.uuid4().hex
+    }
+    return jwt.encode(claims, secret_key(), algorithm=JWT_ALGORITHM)
+
+
 def create_access_token(data: Dict[str, Any]) -> str:
-    """Tạo token đơn giản cho demo."""
-    username = data["sub"]
-    token = f"demo_token_{username}_{hash(username)}"
-    
-    # Lưu thông tin trong bộ nhớ
-    fake_token_db[username] = token
-    fake_users_db[token] = {
-        "username": username
+    """Tạo JWT access token có hạn; kiểm tra chỉ cần khóa bí mật, không cần trạng thái chung."""
+    return _encode_token(data["sub"], "access", timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+
+def issue_tokens(user: User) -> Dict[str, Any]:
+    """Cặp access/refresh token mới kèm thông tin người dùng (response của login/refresh)."""
+    return {
+        "access_token": create_access_token(data={"sub": user.username}),
+        "refresh_token": create_refresh_token(data={"sub": user.username}),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "user": {
+            "username": user.username,
+            "full_name": user.full_name,
+            "email": user.email,
+            "role": user.role,
+            "department": user.department
+        }
     }
-    
-    return token
 
 
-async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[Dict[str, Any]]:
-    """Lấy thông tin người dùng hiện tại từ token đơn giản."""
-    if not token or token not in fake_users_db:
+def create_refresh_token(data: Dict[str, Any]) -> str:
+    """Tạo JWT refresh token (dùng ở /auth/refresh để lấy access token mới)."""
+    return _encode_token(data["sub"], "refresh", timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+def decode_token(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+    """Kiểm tra chữ ký, hạn dùng và loại token; trả về claims hoặc None."""
+    try:
+        claims = jwt.decode(token, secret_key(), algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    if claims.get("type") != token_type or not claims.get("sub"):
         return None
+    return claims
+
+
+def credentials_exception() -> HTTPException:
+    # 401 để client làm mới token bằng refresh token (src/utils/api.js)
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """Lấy thông tin người dùng hiện tại từ JWT access token; 401 nếu thiếu, sai hoặc hết hạn."""
+    # Dependency của hầu hết route: chỉ dùng I/O async để không chặn event loop
+    if not token:
+        raise credentials_exception()
     
-    username = fake_users_db[token]["username"]
-    user = db.query(User).filter(User.username == username).first()
+    # Phần tử cache không sống quá hạn của token nên không cần giải mã lại
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    claims = decode_token(token)
+    if not claims:
+        raise credentials_exception()
+    
+    username = claims["sub"]
+    user = (await db.scalars(select(User).filter(User.username == username))).first()
     
     if not user:
-        return None
+        raise credentials_exception()
     
-    return {
+    current_user = {
         "id": user.id,
         "username": user.username,
         "full_name": user.full_name,
@@ -58,6 +144,13 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Se
         "role": user.role,
         "department": user.department
     }
+    user_cache.set(token, current_user, ttl=min(USER_CACHE_TTL, claims["exp"] - time.time()))
+    return current_user
+
+
+def invalidate_user_cache(username: str) -> None:
+    """Xóa thông tin đã cache của người dùng (gọi sau mỗi lần tạo/cập nhật user)."""
+    user_cache.invalidate_where(lambda token, user: user["username"] == username)
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -81,4 +174,5 @@ def create_user(db: Session, username: str, email: str, full_name: str, password
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(username)
     return db_user
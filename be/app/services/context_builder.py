@@ -0,0 +1,96 @@
+"""Dựng ngữ cảnh hội thoại cho Gemini trong giới hạn token.
+
+Các lượt gần nhất được giữ nguyên văn; lượt cũ hơn được gộp dần vào tóm tắt
+lưu trên thread (Thread.context_summary), nên mỗi lần chỉ cần đọc các tin
+nhắn sau context_summary_upto thay vì toàn bộ lịch sử.
+"""
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Update, update
+
+from ..config.settings import GEMINI_CONTEXT_TOKENS, GEMINI_SUMMARY_TOKENS
+from ..models.models import Message, Thread
+
+# Số ký tự tối đa giữ lại cho mỗi lượt trong tóm tắt
+SUMMARY_LINE_CHARS = 160
+
+# Tin nhắn hệ thống không đưa vào prompt (xem gemini_service.format_messages_for_gemini)
+SKIPPED_SENDERS = ("system",)
+
+
+class ThreadContext(NamedTuple):
+    summary: Optional[str]
+    summary_upto: Optional[int]
+    recent: List[Message]
+    changed: bool
+    tokens: int
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Ước lượng số token (~4 ký tự/token), đủ để giữ prompt trong giới hạn mà không cần tokenizer."""
+    return (len(text or "") + 3) // 4
+
+
+def summary_line(message: Message) -> str:
+    text = " ".join((message.text or "").split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+    return f"- {message.sender}: {text}"
+
+
+def extend_summary(summary: Optional[str], messages: Sequence[Message], max_tokens: int = GEMINI_SUMMARY_TOKENS) -> Optional[str]:
+    """Thêm các lượt vào cuối tóm tắt, bỏ các dòng cũ nhất khi vượt max_tokens."""
+    lines = summary.splitlines() if summary else []
+    lines.extend(summary_line(m) for m in messages if m.sender not in SKIPPED_SENDERS)
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines) or None
+
+
+def build_context(
+    summary: Optional[str],
+    summary_upto: Optional[int],
+    history: Sequence[Message],
+    fixed_tokens: int = 0,
+    budget: int = GEMINI_CONTEXT_TOKENS,
+    summary_tokens: int = GEMINI_SUMMARY_TOKENS,
+) -> ThreadContext:
+    """Chọn các lượt gần nhất vừa ngân sách token, gộp phần cũ hơn vào tóm tắt.
+
+    history: các tin nhắn chưa nằm trong tóm tắt (id > summary_upto), cũ nhất trước.
+    fixed_tokens: phần prompt cố định (system prompt, tin nhắn mới).
+    """
+    history = [m for m in history if summary_upto is None or m.id > summary_upto]
+    available = max(0, budget - fixed_tokens - summary_tokens)
+
+    # Giữ nguyên văn các lượt mới nhất cho tới khi hết ngân sách
+    split = len(history)
+    used = 0
+    while split > 0:
+        message = history[split - 1]
+        cost = 0 if message.sender in SKIPPED_SENDERS else estimate_tokens(message.text) + 4
+        if used + cost > available:
+            break
+        used += cost
+        split -= 1
+
+    older, recent = history[:split], history[split:]
+    changed = bool(older)
+    if changed:
+        summary = extend_summary(summary, older, summary_tokens)
+        summary_upto = older[-1].id
+    return ThreadContext(summary, summary_upto, recent, changed, fixed_tokens + used + estimate_tokens(summary))
+
+
+def save_summary(thread_id: str, context: ThreadContext) -> Update:
+    """UPDATE lưu tóm tắt mới, giữ nguyên updated_at (đây không phải thay đổi của người dùng)."""
+    return (
+        update(Thread)
+        .where(Thread.id == thread_id)
+        .values(
+            context_summary=context.summary,
+            context_summary_upto=context.summary_upto,
+            updated_at=Thread.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -3,18 +3,20 @@ from sqlalchemy.orm import Session
 
 from ..models.departments import Department
 from ..schemas.department_schemas import DepartmentCreate, DepartmentUpdate
+from .pagination import apply_keyset
 
 
-def create_department(db: Session, department_data: DepartmentCreate) -> Department:
-    """Tạo một phòng ban mới."""
+def create_department(db: Session, department_data: DepartmentCreate, commit: bool = True) -> Department:
+    """Tạo một phòng ban mới (commit=False để gộp vào transaction của người gọi)."""
     db_department = Department(
         # Bỏ id để MySQL tự tạo auto increment
         name=department_data.name,
         description=department_data.description
     )
     db.add(db_department)
-    db.commit()
-    db.refresh(db_department)
+    if commit:
+        db.commit()
+        db.refresh(db_department)
     return db_department
 
 
@@ -28,9 +30,12 @@ def get_department_by_name(db: Session, name: str) -> Optional[Department]:
     return db.query(Department).filter(Department.name == name).first()
 
 
-def list_departments(db: Session, skip: int = 0, limit: int = 100) -> List[Department]:
+def list_departments(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Department]:
     """Liệt kê tất cả phòng ban."""
-    return db.query(Department).offset(skip).limit(limit).all()
+    query = apply_keyset(db.query(Department), Department.created_at, Department.id, cursor)
+    if not cursor and skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 
 def update_department(db: Session, department_id: int, department_data: DepartmentUpdate) -> Optional[Department]:
@@ -0,0 +1,71 @@
+"""Xuất threads/messages dạng NDJSON hoặc CSV theo luồng, bộ nhớ không phụ thuộc kích thước dữ liệu."""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from . import message_service, thread_service
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+# Số dòng đọc mỗi lần từ server-side cursor và ghi ra mỗi chunk
+BATCH_SIZE = 1000
+
+
+def _stream_rows(db: Session, stmt: Select, fmt: str, batch_size: int) -> Iterator[str]:
+    # yield_per bật server-side cursor (stream_results), chỉ giữ một batch trong bộ nhớ
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    columns = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    
+    if writer:
+        writer.writerow(columns)
+    
+    for partition in result.partitions():
+        for row in partition:
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(
+    session_factory: Callable[[], Session],
+    kind: str,
+    fmt: str,
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from=None,
+    date_to=None,
+    batch_size: int = BATCH_SIZE
+) -> Iterator[str]:
+    """Sinh từng chunk dữ liệu xuất; tự mở và đóng session riêng cho luồng."""
+    if kind == "messages":
+        stmt = message_service.export_messages_stmt(status, department, date_from, date_to)
+    else:
+        stmt = thread_service.export_threads_stmt(status, department, date_from, date_to)
+    
+    db = session_factory()
+    try:
+        yield from _stream_rows(db, stmt, fmt, batch_size)
+    finally:
+        db.close()
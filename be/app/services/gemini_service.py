@@ -1,25 +1,29 @@
-import google.generativeai as genai
-from typing import List, Optional
+import time
+from typing import Iterator, List, Optional, Sequence
 
-from ..config.settings import GEMINI_API_KEY, GEMINI_MODEL
 from ..models.models import Thread, Message
 from ..schemas import RoleType
+from . import context_builder
+from .answer_cache import answer_cache
+from .context_builder import ThreadContext, estimate_tokens
+from .llm_provider import get_provider
 
-# Configure the Gemini API
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
+def is_configured() -> bool:
+    return get_provider().is_configured()
 
-def format_messages_for_gemini(thread: Thread, messages: List[Message], new_message: str) -> List[dict]:
-    """Format messages for the Gemini API."""
-    formatted_messages = []
-    
-    # Add system prompt with context about the thread
+
+def build_system_prompt(thread: Thread, summary: Optional[str] = None, personalize: bool = True) -> str:
+    """System prompt with context about the thread (kèm tóm tắt các tin nhắn cũ nếu có).
+
+    personalize=False: bỏ tên sinh viên, để câu trả lời dùng chung được cho mọi sinh viên.
+    """
+    student = thread.student.full_name if personalize and thread.student else 'Unknown'
     system_prompt = f"""
     You are an AI assistant for student support at a school. 
     
     CONTEXT:
-    - Student: {thread.student.full_name if thread.student else 'Unknown'}
+    - Student: {student}
     - Department: {thread.department if thread.department else 'Not specified'}
     - Topic: {thread.topic if thread.topic else 'General'}
     - Current status: {thread.status}
@@ -31,6 +35,25 @@ def format_messages_for_gemini(thread: Thread, messages: List[Message], new_mess
     
     Respond in the same language the student uses.
     """
+    if summary:
+        system_prompt += f"\nSUMMARY OF EARLIER MESSAGES (oldest first):\n{summary}\n"
+    return system_prompt
+
+
+def build_context(thread: Thread, history: Sequence[Message], new_message: str) -> ThreadContext:
+    """Chọn lịch sử đưa vào prompt theo GEMINI_CONTEXT_TOKENS, gộp phần cũ vào tóm tắt của thread."""
+    fixed_tokens = estimate_tokens(build_system_prompt(thread)) + estimate_tokens(new_message)
+    return context_builder.build_context(
+        thread.context_summary, thread.context_summary_upto, history, fixed_tokens
+    )
+
+
+def format_messages_for_gemini(thread: Thread, messages: Sequence[Message], new_message: str, summary: Optional[str] = None, personalize: bool = True) -> List[dict]:
+    """Format messages for the Gemini API."""
+    formatted_messages = []
+    
+    # Add system prompt with context about the thread
+    system_prompt = build_system_prompt(thread, summary, personalize)
     formatted_messages.append({"role": "system", "parts": [{"text": system_prompt}]})
     
     # Add conversation history
@@ -57,22 +80,44 @@ def format_messages_for_gemini(thread: Thread, messages: List[Message], new_mess
     return formatted_messages
 
 
-def generate_reply(thread: Thread, messages: List[Message], new_message: str) -> Optional[str]:
+def stream_reply(thread: Thread, messages: Sequence[Message], new_message: str, summary: Optional[str] = None) -> Iterator[str]:
+    """Sinh phản hồi theo từng đoạn qua LLM provider; không yield gì nếu chưa cấu hình provider.
+
+    Lỗi của API (kể cả giữa chừng) được ném ra để người gọi bỏ phần đã nhận.
+    """
+    provider = get_provider()
+    if not provider.is_configured():
+        return
+    
+    # Chỉ câu hỏi không có lịch sử hội thoại mới dùng chung cache (theo chủ đề/phòng ban/trạng thái);
+    # prompt khi đó bỏ tên sinh viên để câu trả lời không mang thông tin của riêng ai
+    shared = not messages and not summary
+    if shared:
+        cached = answer_cache.lookup(thread.topic, thread.department, thread.status, new_message)
+        if cached is not None:
+            yield cached
+            return
+    
+    formatted_messages = format_messages_for_gemini(thread, messages, new_message, summary, personalize=not shared)
+    
+    # Get response from the LLM provider
+    started = time.perf_counter()
+    parts = []
+    for text in provider.stream(formatted_messages):
+        parts.append(text)
+        yield text
+    
+    if parts and shared:
+        answer_cache.store(
+            thread.topic, thread.department, thread.status, new_message, "".join(parts),
+            (time.perf_counter() - started) * 1000
+        )
+
+
+def generate_reply(thread: Thread, messages: Sequence[Message], new_message: str, summary: Optional[str] = None) -> Optional[str]:
     """Generate a reply using Gemini API."""
-    if not GEMINI_API_KEY:
-        return None
-        
     try:
-        formatted_messages = format_messages_for_gemini(thread, messages, new_message)
-        
-        # Get response from Gemini
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        response = model.generate_content(formatted_messages)
-        
-        if response and hasattr(response, 'text'):
-            return response.text
-        
-        return None
+        return "".join(stream_reply(thread, messages, new_message, summary)) or None
     except Exception as e:
         print(f"Error generating reply with Gemini: {str(e)}")
         return None
@@ -0,0 +1,157 @@
+"""Nhập threads/messages hàng loạt từ NDJSON hoặc CSV theo luồng, ghi theo batch trong từng transaction."""
+import csv
+import json
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..models.models import Message, Thread
+from ..schemas import MessageImport, ThreadImport
+from .message_service import refresh_thread_summaries
+from .thread_service import bump_thread_stat
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+IMPORT_SCHEMAS = {
+    "threads": ThreadImport,
+    "messages": MessageImport,
+}
+
+# Số dòng hợp lệ ghi trong một transaction (một executemany), mặc định và tối đa
+CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10_000
+
+# Chỉ giữ chi tiết của một số dòng bị loại đầu tiên trong báo cáo
+MAX_REJECTED_SAMPLES = 100
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Đọc từng dòng, trả về (số dòng, record, lỗi parse)."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Ô trống trong CSV nghĩa là không có giá trị
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None and v != ""}, None
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def _insert_rows(db: Session, kind: str, rows: List[Dict[str, Any]]) -> None:
+    table = Thread.__table__ if kind == "threads" else Message.__table__
+
+    # executemany yêu cầu cùng tập cột: gom các dòng theo cột có giá trị,
+    # cột vắng mặt để database dùng giá trị mặc định (vd. created_at)
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(row))].append(row)
+    for group in groups.values():
+        db.execute(insert(table), group)
+
+
+def _update_derived(db: Session, kind: str, rows: List[Dict[str, Any]]) -> None:
+    """Bộ đếm thống kê và tóm tắt thread tính từ các dòng vừa ghi."""
+    if kind == "threads":
+        # Bộ đếm thống kê cập nhật trong cùng transaction với dữ liệu
+        for (status, assigned_to), count in Counter((r["status"], r.get("assigned_to")) for r in rows).items():
+            bump_thread_stat(db, status, assigned_to, count)
+    else:
+        # Tóm tắt hoạt động (last_message_at, message_count...) của các thread có tin nhắn mới
+        refresh_thread_summaries(db, sorted({r["thread_id"] for r in rows}))
+
+
+def _write_chunk(db: Session, kind: str, chunk: List[Tuple[int, Dict[str, Any]]]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Ghi một chunk trong một transaction; nếu lỗi thì ghi lại từng dòng để tách dòng hỏng."""
+    rows = [row for _, row in chunk]
+    try:
+        _insert_rows(db, kind, rows)
+        _update_derived(db, kind, rows)
+        db.commit()
+        return len(chunk), []
+    except SQLAlchemyError:
+        db.rollback()
+
+    # Chunk có dòng vi phạm ràng buộc (trùng id, sai khóa ngoại...): mỗi dòng một SAVEPOINT,
+    # bộ đếm/tóm tắt thread cập nhật một lần cho các dòng ghi được
+    inserted = []
+    rejected = []
+    for line_no, row in chunk:
+        try:
+            with db.begin_nested():
+                _insert_rows(db, kind, [row])
+            inserted.append(row)
+        except SQLAlchemyError as e:
+            rejected.append({"line": line_no, "error": str(getattr(e, "orig", None) or e)})
+    if inserted:
+        _update_derived(db, kind, inserted)
+    db.commit()
+    return len(inserted), rejected
+
+
+def import_records(db: Session, stream: TextIO, kind: str, fmt: str, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Nhập threads/messages từ stream; trả về số dòng đã ghi, dòng bị loại và rows/sec."""
+    schema = IMPORT_SCHEMAS[kind]
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"kind": kind, "processed": 0, "inserted": 0, "rejected": 0, "rejected_rows": []}
+
+    def reject(items: List[Dict[str, Any]]) -> None:
+        report["rejected"] += len(items)
+        room = MAX_REJECTED_SAMPLES - len(report["rejected_rows"])
+        if room > 0:
+            report["rejected_rows"].extend(items[:room])
+
+    def flush(chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        inserted, rejected = _write_chunk(db, kind, chunk)
+        report["inserted"] += inserted
+        reject(rejected)
+
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    for line_no, record, error in iter_records(stream, fmt):
+        report["processed"] += 1
+        if error is None:
+            try:
+                row = schema.model_validate(record).model_dump(exclude_none=True)
+            except ValidationError as e:
+                error = _validation_error(e)
+        if error is not None:
+            reject([{"line": line_no, "error": error}])
+            continue
+
+        if kind == "threads":
+            row.setdefault("id", str(uuid.uuid4()))
+            # Thread cũ chưa có tin nhắn: hoạt động gần nhất là lúc tạo
+            if "created_at" in row:
+                row.setdefault("last_message_at", row["created_at"])
+        chunk.append((line_no, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+
+    seconds = time.perf_counter() - started
+    report["seconds"] = round(seconds, 3)
+    report["rows_per_sec"] = round(report["inserted"] / seconds, 1) if seconds > 0 else 0.0
+    return report
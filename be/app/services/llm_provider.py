@@ -0,0 +1,352 @@
+"""Giao diện nhà cung cấp LLM: Gemini thật hoặc backend giả lập chạy offline (load test).
+
+contents theo định dạng của Gemini: [{"role": ..., "parts": [{"text": ...}]}].
+Chọn provider bằng LLM_PROVIDER ("gemini" | "fake").
+"""
+import math
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from queue import Empty, Queue
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config.settings import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    LLM_PROVIDER,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_MS,
+    LLM_RETRY_BACKOFF_MAX_MS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_LATENCY_SIGMA,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_OUTPUT_WORDS,
+    FAKE_LLM_SEED,
+)
+from ..utils.circuit_breaker import CircuitBreaker
+
+# Lỗi tạm thời của google.api_core (quá tải, hết hạn, lỗi server), đáng để thử lại
+RETRYABLE_ERRORS = {
+    "DeadlineExceeded",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "TooManyRequests",
+    "GatewayTimeout",
+    "BadGateway",
+}
+
+
+class LLMError(Exception):
+    """Lỗi khi gọi LLM (lỗi API, lỗi giả lập); retryable=False với lỗi không tự hết (sai key, bị chặn...)."""
+
+    def __init__(self, message: str, retryable: bool = True) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMTimeout(LLMError):
+    """Lần gọi vượt quá thời hạn."""
+
+
+class CircuitOpenError(LLMError):
+    """Circuit breaker đang mở: không gọi provider."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, retryable=False)
+
+
+class LLMProvider(ABC):
+    name = "none"
+
+    def is_configured(self) -> bool:
+        return False
+
+    @abstractmethod
+    def stream(self, contents: List[Dict[str, Any]], timeout: Optional[float] = None) -> Iterator[str]:
+        """Sinh phản hồi theo từng đoạn văn bản; timeout (giây) là thời hạn của cả lần gọi."""
+
+    def generate(self, contents: List[Dict[str, Any]], timeout: Optional[float] = None) -> str:
+        return "".join(self.stream(contents, timeout))
+
+
+class GeminiProvider(LLMProvider):
+    """google.generativeai, import ở lần gọi đầu tiên (SDK import mất gần 1 giây).
+
+    GenerativeModel được tạo một lần cho mỗi model rồi dùng lại.
+    """
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = GEMINI_API_KEY, model: str = GEMINI_MODEL) -> None:
+        self.api_key = api_key
+        self.model = model
+        self._genai: Any = None
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, name: str) -> Any:
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+            if name not in self._models:
+                self._models[name] = self._genai.GenerativeModel(name)
+            return self._models[name]
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    def stream(self, contents: List[Dict[str, Any]], timeout: Optional[float] = None) -> Iterator[str]:
+        request_options = {"timeout": timeout} if timeout else None
+        try:
+            response = self._get_model(self.model).generate_content(
+                contents, stream=True, request_options=request_options
+            )
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    yield text
+        except LLMError:
+            raise
+        except Exception as e:
+            kind = type(e).__name__
+            if kind == "DeadlineExceeded" or isinstance(e, TimeoutError):
+                raise LLMTimeout(f"{kind}: {e}") from e
+            retryable = kind in RETRYABLE_ERRORS or isinstance(e, ConnectionError)
+            raise LLMError(f"{kind}: {e}", retryable=retryable) from e
+
+
+_FAKE_WORDS = (
+    "sinh viên vui lòng liên hệ phòng đào tạo để được hỗ trợ về học phí lịch thi "
+    "đăng ký học phần thủ tục hồ sơ trong giờ hành chính qua email hoặc cổng thông tin"
+).split()
+
+
+class FakeProvider(LLMProvider):
+    """LLM giả lập, tất định theo (seed, prompt): cùng prompt cho cùng độ trễ, lỗi và nội dung;
+    lần gọi lại cùng prompt (retry) rút độ trễ và lỗi mới theo thứ tự lần gọi.
+
+    Độ trễ tổng theo phân phối log-normal (trung vị latency_ms, độ lệch sigma);
+    token đầu tiên đến sau ~30% độ trễ, phần còn lại trải đều theo từng đoạn.
+    Vượt timeout thì ném LLMTimeout sau đúng timeout giây, như provider thật.
+    """
+    name = "fake"
+
+    # Tỷ lệ độ trễ trước token đầu tiên, số từ mỗi đoạn stream
+    FIRST_TOKEN_SHARE = 0.3
+    CHUNK_WORDS = 8
+
+    def __init__(
+        self,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        latency_sigma: float = FAKE_LLM_LATENCY_SIGMA,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        output_words: int = FAKE_LLM_OUTPUT_WORDS,
+        seed: int = FAKE_LLM_SEED,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.output_words = output_words
+        self.seed = seed
+        # Số lần đã gọi theo crc32 của prompt
+        self._calls: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return True
+
+    def stream(self, contents: List[Dict[str, Any]], timeout: Optional[float] = None) -> Iterator[str]:
+        prompt = "\n".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for item in contents for part in item.get("parts", ())
+        )
+        rng = random.Random(f"{self.seed}:{prompt}")
+        key = zlib.crc32(prompt.encode())
+        with self._lock:
+            attempt = self._calls.get(key, 0)
+            self._calls[key] = attempt + 1
+        timing = random.Random(f"{self.seed}:{prompt}:{attempt}")
+
+        latency = self.latency_ms * math.exp(self.latency_sigma * timing.gauss(0, 1)) / 1000
+        failed = timing.random() < self.error_rate
+        words = max(1, int(self.output_words * rng.uniform(0.5, 1.5)))
+        chunks = -(-words // self.CHUNK_WORDS)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        def wait(seconds: float) -> None:
+            if deadline is not None and time.monotonic() + seconds > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                raise LLMTimeout(f"Simulated LLM call exceeded {timeout}s")
+            time.sleep(seconds)
+
+        wait(latency * self.FIRST_TOKEN_SHARE)
+        if failed:
+            raise LLMError("Simulated LLM failure")
+        gap = latency * (1 - self.FIRST_TOKEN_SHARE) / chunks
+        for i in range(chunks):
+            if i:
+                wait(gap)
+            n = min(self.CHUNK_WORDS, words - i * self.CHUNK_WORDS)
+            yield " ".join(rng.choice(_FAKE_WORDS) for _ in range(n)) + " "
+
+
+class ResilientProvider(LLMProvider):
+    """Bọc một provider: thời hạn mỗi lần gọi, thử lại với backoff ngẫu nhiên, circuit breaker.
+
+    Chỉ thử lại khi chưa nhận được đoạn nào (đoạn đã stream tới client thì không gửi lại).
+    Khi breaker mở, stream() ném CircuitOpenError ngay, người gọi dùng câu trả lời mặc định.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_ms: float = LLM_RETRY_BACKOFF_MS,
+        backoff_max_ms: float = LLM_RETRY_BACKOFF_MAX_MS,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.provider = provider
+        self.name = provider.name
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_ms = backoff_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.breaker = breaker or CircuitBreaker(
+            f"llm:{provider.name}", LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def is_configured(self) -> bool:
+        return self.provider.is_configured()
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: ngẫu nhiên trong [0, min(max, base * 2^attempt)] (giây)."""
+        return random.uniform(0, min(self.backoff_max_ms, self.backoff_ms * 2 ** attempt)) / 1000
+
+    def _chunks(self, contents: List[Dict[str, Any]], timeout: Optional[float]) -> Iterator[str]:
+        """Đọc provider ở thread phụ để thời hạn áp dụng cho từng đoạn, kể cả đoạn đầu tiên:
+        provider không tự dừng đúng hạn thì vẫn ném LLMTimeout sau timeout giây."""
+        deadline = time.monotonic() + timeout if timeout else None
+        queue: "Queue[tuple]" = Queue()
+        stop = threading.Event()
+
+        def pump() -> None:
+            iterator = self.provider.stream(contents, timeout)
+            try:
+                for chunk in iterator:
+                    if stop.is_set():
+                        break
+                    queue.put(("chunk", chunk))
+            except BaseException as e:
+                queue.put(("error", e))
+                return
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            queue.put(("done", None))
+
+        threading.Thread(target=pump, name=f"llm-{self.name}", daemon=True).start()
+        try:
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    kind, value = queue.get(timeout=remaining)
+                except Empty:
+                    raise LLMTimeout(f"LLM call exceeded {timeout}s") from None
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            # Thread phụ bỏ phần còn lại ở đoạn kế tiếp (không ngắt được lời gọi đang chờ)
+            stop.set()
+
+    def stream(self, contents: List[Dict[str, Any]], timeout: Optional[float] = None) -> Iterator[str]:
+        timeout = timeout or self.timeout
+        with self._lock:
+            self.calls += 1
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"LLM provider '{self.name}' unavailable (circuit open)")
+            received = False
+            recorded = False
+            chunks = self._chunks(contents, timeout)
+            try:
+                for chunk in chunks:
+                    received = True
+                    yield chunk
+            except Exception as e:
+                self.breaker.record_failure()
+                recorded = True
+                with self._lock:
+                    self.errors += 1
+                    if isinstance(e, LLMTimeout):
+                        self.timeouts += 1
+                if not isinstance(e, LLMError):
+                    raise LLMError(f"{type(e).__name__}: {e}", retryable=False) from e
+                if received or not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"LLM call failed ({e}), retrying in {delay:.2f}s")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                recorded = True
+                return
+            finally:
+                chunks.close()
+                # Người gọi dừng đọc giữa chừng (GeneratorExit): không tính thành công hay lỗi,
+                # nhưng trả lại lượt gọi thử để breaker half_open không bị kẹt
+                if not recorded:
+                    self.breaker.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "provider": self.name,
+                "configured": self.is_configured(),
+                "timeout_s": self.timeout,
+                "max_retries": self.max_retries,
+                "calls": self.calls,
+                "retries": self.retries,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+            }
+        data["breaker"] = self.breaker.snapshot()
+        return data
+
+
+LLM_PROVIDERS = {"gemini": GeminiProvider, "fake": FakeProvider}
+
+_provider: Optional[ResilientProvider] = None
+
+
+def get_provider() -> ResilientProvider:
+    """Provider đang dùng (đã bọc ResilientProvider), tạo theo LLM_PROVIDER ở lần gọi đầu tiên."""
+    global _provider
+    if _provider is None:
+        _provider = ResilientProvider(LLM_PROVIDERS.get(LLM_PROVIDER, GeminiProvider)())
+    return _provider
+
+
+def use_provider(provider: LLMProvider) -> ResilientProvider:
+    """Thay provider (vd. replay harness dùng FakeProvider với tham số riêng)."""
+    global _provider
+    _provider = provider if isinstance(provider, ResilientProvider) else ResilientProvider(provider)
+    return _provider
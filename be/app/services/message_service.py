@@ -1,14 +1,19 @@
 from typing import List, Optional, Dict, Any, Union
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy.sql import func, cast
-from sqlalchemy import String
+from sqlalchemy import String, bindparam, select, update, Select, Update
+from datetime import datetime
 
-from ..models.models import Message, Thread
+from ..models.models import Message, MessageArchive, Thread
 from ..schemas import MessageCreate
+from .pagination import apply_keyset
 
 
-def create_message(db: Session, thread_id: str, message_data: Union[MessageCreate, Dict[str, Any]], user_id: Optional[str] = None) -> Message:
-    """Create a new message in a thread."""
+def build_message(thread_id: str, message_data: Union[MessageCreate, Dict[str, Any]], user_id: Optional[str] = None) -> Message:
+    """Build (but do not persist) a Message from a dict or MessageCreate."""
     
     # Handle when message_data is dict instead of MessageCreate
     if isinstance(message_data, dict):
@@ -16,50 +21,117 @@ def create_message(db: Session, thread_id: str, message_data: Union[MessageCreat
         text = message_data.get("text", message_data.get("content", ""))
         # Accept either "sender" or "sender_type" for the sender role
         sender = message_data.get("sender", message_data.get("sender_type", "system"))
-        print(f"Creating message from dict: text='{text}', sender='{sender}'")
     else:
         text = message_data.text
         sender = message_data.sender
-        print(f"Creating message from Pydantic model: text='{text}', sender='{sender}'")
     
-    # Tìm ID lớn nhất hiện tại và tăng lên 1
-    # Đảm bảo max_id là số nguyên
-    try:
-        # Sử dụng một con số cao ngẫu nhiên để tránh xung đột
-        import random
-        import time
-        
-        # Tạo một ID ngẫu nhiên dựa trên thời gian + số ngẫu nhiên
-        # Đảm bảo ID đủ lớn để không trùng với ID hiện có
-        timestamp = int(time.time())
-        random_part = random.randint(1000, 9999)
-        next_id = timestamp + random_part
-        
-        print(f"Using timestamp-based ID: {next_id}")
-    except Exception as e:
-        # Fallback to a very large number
-        import random
-        next_id = random.randint(100000, 999999)
-        print(f"Error generating message ID: {e}")
-        print(f"Using random ID: {next_id}")
-    
-    # Create the message with the integer ID
+    # ID do AUTO_INCREMENT của database cấp khi flush: không trùng giữa các
+    # process/worker và tăng dần theo thứ tự ghi
     db_message = Message(
-        id=next_id,
         thread_id=thread_id,
         user_id=user_id,
         sender=sender,
         text=text
     )
     
+    return db_message
+
+
+# Độ dài đoạn xem trước lưu trên thread
+PREVIEW_LENGTH = 200
+
+# Các cột tóm tắt trên Thread do database tính (thread_summary_update), phải đọc lại khi cần
+THREAD_COMPUTED_SUMMARY_ATTRS = ["last_message_at", "message_count"]
+
+
+def message_preview(text: Optional[str]) -> str:
+    return " ".join((text or "").split())[:PREVIEW_LENGTH]
+
+
+def thread_summary_update(db: Union[Session, AsyncSession], db_message: Message) -> Optional[Update]:
+    """Cập nhật tóm tắt của thread cho tin nhắn mới; trả về câu UPDATE cần chạy (None nếu thread chưa flush).
+
+    Câu UPDATE chạy trước INSERT tin nhắn để mọi transaction khóa dòng thread
+    theo cùng một thứ tự, và message_count tăng nguyên tử trên database.
+    """
+    preview = message_preview(db_message.text)
+    
+    # Thread vừa tạo trong transaction này: gán thẳng lên đối tượng
+    for obj in db.new:
+        if isinstance(obj, Thread) and obj.id == db_message.thread_id:
+            obj.message_count = (obj.message_count or 0) + 1
+            obj.last_message_preview = preview
+            obj.last_sender = db_message.sender
+            return None
+    
+    # Thread đã nạp trong session: gán sẵn giá trị đã biết (không đánh dấu thay đổi),
+    # chỉ đọc lại các cột do database tính, để serialize sau commit không phải truy vấn lại
+    loaded = db.identity_map.get(identity_key(Thread, db_message.thread_id))
+    if loaded is not None:
+        set_committed_value(loaded, "last_message_preview", preview)
+        set_committed_value(loaded, "last_sender", db_message.sender)
+        db.expire(loaded, THREAD_COMPUTED_SUMMARY_ATTRS)
+    
+    return (
+        update(Thread)
+        .where(Thread.id == db_message.thread_id)
+        .values(
+            last_message_at=func.now(),
+            message_count=Thread.message_count + 1,
+            last_message_preview=preview,
+            last_sender=db_message.sender,
+            # Tin nhắn mới không tính là sửa thread
+            updated_at=Thread.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_thread_summaries(db: Session, thread_ids: List[str]) -> None:
+    """Tính lại tóm tắt của các thread từ bảng messages (dùng sau khi ghi tin nhắn hàng loạt)."""
+    same_thread = Message.thread_id == Thread.id
+    newest_first = (Message.created_at.desc(), Message.id.desc())
+    db.execute(
+        update(Thread)
+        .where(Thread.id.in_(thread_ids))
+        .values(
+            message_count=select(func.count(Message.id)).where(same_thread).scalar_subquery(),
+            last_message_at=func.coalesce(
+                select(func.max(Message.created_at)).where(same_thread).scalar_subquery(),
+                Thread.created_at
+            ),
+            last_sender=select(Message.sender).where(same_thread)
+                .order_by(*newest_first).limit(1).scalar_subquery(),
+            updated_at=Thread.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    # Đoạn xem trước tính bằng message_preview như khi ghi từng tin nhắn (SQL không gộp được khoảng trắng)
+    latest_text = select(Message.text).where(same_thread).order_by(*newest_first).limit(1).scalar_subquery()
+    rows = db.execute(select(Thread.id, latest_text).where(Thread.id.in_(thread_ids))).all()
+    threads = Thread.__table__
+    db.execute(
+        update(threads)
+        .where(threads.c.id == bindparam("b_id"))
+        .values(last_message_preview=bindparam("b_preview"), updated_at=threads.c.updated_at),
+        [{"b_id": thread_id, "b_preview": message_preview(text) if text is not None else None} for thread_id, text in rows]
+    )
+
+
+def create_message(db: Session, thread_id: str, message_data: Union[MessageCreate, Dict[str, Any]], user_id: Optional[str] = None, commit: bool = True) -> Message:
+    """Create a new message in a thread (commit=False để gộp vào transaction của người gọi)."""
+    db_message = build_message(thread_id, message_data, user_id)
+    summary = thread_summary_update(db, db_message)
+    if summary is not None:
+        db.execute(summary)
+    db.add(db_message)
+    if not commit:
+        return db_message
+    
     try:
-        db.add(db_message)
+        # id và created_at được lấy ngay khi flush (eager_defaults), không cần refresh
         db.commit()
-        db.refresh(db_message)
-        
-        # No need to modify the db_message directly
-        # The conversion will happen in the router when creating the response
-        
         return db_message
     except Exception as e:
         db.rollback()
@@ -69,12 +141,66 @@ def create_message(db: Session, thread_id: str, message_data: Union[MessageCreat
 
 def get_message(db: Session, message_id: str) -> Optional[Message]:
     """Get a message by ID."""
-    return db.query(Message).filter(Message.id == message_id).first()
+    return db.query(Message).options(joinedload(Message.user)).filter(Message.id == message_id).first()
+
+
+def message_select(thread_id: str, model=Message) -> Select:
+    """SELECT Message (hoặc MessageArchive) của một thread kèm eager-load user."""
+    return select(model).options(joinedload(model.user)).filter(model.thread_id == thread_id)
+
+
+def list_messages_stmt(thread_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, archived: bool = False) -> Select:
+    model = MessageArchive if archived else Message
+    stmt = apply_keyset(message_select(thread_id, model), model.created_at, model.id, cursor)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def list_messages(db: Session, thread_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, archived: bool = False) -> List[Message]:
+    """List messages in a thread, oldest first, optionally paginated by cursor (archived: đọc bảng lưu trữ)."""
+    return db.scalars(list_messages_stmt(thread_id, limit, cursor, archived)).all()
+
+
+def list_new_messages_stmt(thread_id: str, after_id: Optional[int] = None, since: Optional[datetime] = None) -> Select:
+    stmt = message_select(thread_id)
+    
+    if after_id is not None:
+        # id do database cấp tăng dần nên dùng trực tiếp làm mốc: vẫn đúng khi tin nhắn
+        # after_id đã bị xóa/lưu trữ, và không bỏ sót tin nhắn commit muộn có created_at cũ hơn
+        stmt = stmt.filter(Message.id > after_id)
+    
+    if since is not None:
+        stmt = stmt.filter(Message.created_at > since)
+    
+    return stmt.order_by(Message.id)
+
+
+def list_new_messages(db: Session, thread_id: str, after_id: Optional[int] = None, since: Optional[datetime] = None) -> List[Message]:
+    """List only messages newer than after_id (by id) and/or since."""
+    return db.scalars(list_new_messages_stmt(thread_id, after_id, since)).all()
 
 
-def list_messages(db: Session, thread_id: str) -> List[Message]:
-    """List all messages in a thread."""
-    return db.query(Message).filter(Message.thread_id == thread_id).order_by(Message.created_at).all()
+def export_messages_stmt(
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> Select:
+    """SELECT các cột tin nhắn (kèm trạng thái/phòng ban của thread) để xuất báo cáo."""
+    stmt = select(
+        Message.id, Message.thread_id, Message.user_id, Message.sender, Message.text,
+        Message.created_at, Thread.status.label("thread_status"), Thread.assigned_to.label("thread_assigned_to")
+    ).join(Thread, Thread.id == Message.thread_id)
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    if department:
+        stmt = stmt.filter(Thread.assigned_to == department)
+    if date_from:
+        stmt = stmt.filter(Message.created_at >= date_from)
+    if date_to:
+        stmt = stmt.filter(Message.created_at < date_to)
+    return stmt.order_by(Message.created_at, Message.id)
 
 
 def delete_message(db: Session, message_id: str) -> bool:
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Số phần tử tối đa mỗi trang của các endpoint danh sách
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: Optional[datetime], item_id: Any) -> str:
+    """Mã hóa khóa (created_at, id) thành cursor dạng chuỗi mờ (opaque)."""
+    payload = {
+        "c": created_at.isoformat() if created_at else None,
+        "i": item_id
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """Giải mã cursor; trả về lỗi 400 nếu cursor không hợp lệ."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, payload["i"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query: Query, created_col, id_col, cursor: Optional[str], descending: bool = False) -> Query:
+    """Sắp xếp theo (created_at, id) và lọc các dòng nằm sau cursor."""
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col, id_col)
+
+    if not cursor:
+        return query
+
+    created_at, item_id = decode_cursor(cursor)
+    if created_at is None:
+        # Dòng không có created_at: chỉ so sánh theo id
+        return query.filter(id_col < item_id if descending else id_col > item_id)
+
+    # Điều kiện created_col <=/>= thừa về logic nhưng để database nhảy thẳng tới vị trí cursor
+    # trên index (riêng biểu thức OR thì không dùng được làm khoảng quét): trang sâu không chậm dần
+    if descending:
+        return query.filter(created_col <= created_at, or_(
+            created_col < created_at,
+            and_(created_col == created_at, id_col < item_id)
+        ))
+    return query.filter(created_col >= created_at, or_(
+        created_col > created_at,
+        and_(created_col == created_at, id_col > item_id)
+    ))
+
+
+def next_cursor(items: List[Any], limit: Optional[int], sort_attr: str = "created_at") -> Optional[str]:
+    """Trả về cursor của trang kế tiếp, hoặc None nếu đã hết dữ liệu."""
+    if not limit or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, sort_attr), last.id)
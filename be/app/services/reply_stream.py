@@ -0,0 +1,59 @@
+"""Phát phản hồi đang sinh (từng đoạn) tới các client đang theo dõi thread qua SSE.
+
+Worker (thread nền) gọi publish(); các kết nối SSE (event loop) nhận qua
+asyncio.Queue. Hub nằm trong process: client kết nối tới process khác vẫn
+nhận được tin nhắn cuối cùng qua polling như trước.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Set, Tuple
+
+# Số sự kiện tối đa chờ gửi cho một kết nối; client quá chậm sẽ bị bỏ sự kiện
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def _offer(queue: "asyncio.Queue[Dict[str, Any]]", event: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+class ReplyStreamHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Dict[str, Any]]"]]] = {}
+
+    def subscribe(self, thread_id: str) -> "asyncio.Queue[Dict[str, Any]]":
+        """Gọi trong event loop; trả về hàng đợi nhận sự kiện của thread."""
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(thread_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, thread_id: str, queue: "asyncio.Queue[Dict[str, Any]]") -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(thread_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[thread_id]
+
+    def has_subscribers(self, thread_id: str) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(thread_id))
+
+    def publish(self, thread_id: str, event: Dict[str, Any]) -> None:
+        """Thread-safe: gửi sự kiện tới mọi kết nối đang theo dõi thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(thread_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Event loop đã đóng (đang tắt server)
+                pass
+
+
+reply_stream = ReplyStreamHub()
@@ -0,0 +1,273 @@
+"""Pool worker sinh phản hồi tự động cho tin nhắn của sinh viên, chạy nền ngoài event loop.
+
+Job được chia shard theo thread_id: mỗi thread luôn về cùng một worker nên
+phản hồi trong một thread giữ đúng thứ tự, còn các thread khác chạy song song.
+"""
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import deque
+from queue import Empty, Full, Queue
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, undefer
+
+from ..config.settings import ROUTER_WORKER_CONCURRENCY, ROUTER_WORKER_QUEUE_SIZE
+from ..database.db import SessionLocal
+from ..models.models import Message, Thread
+from ..schemas import RoleType
+from . import context_builder, gemini_service, message_service, thread_service
+from .context_builder import ThreadContext
+from .llm_provider import CircuitOpenError
+from .reply_stream import reply_stream
+
+# Ngưỡng (ms) của histogram thời gian chờ trong hàng đợi và thời gian xử lý
+LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Phân vị tính trên LATENCY_SAMPLES mẫu gần nhất
+PERCENTILES = (50, 90, 95, 99)
+LATENCY_SAMPLES = 1024
+
+STUDENT_ACK = "[QLSV] Đã tiếp nhận ý kiến, sẽ chuyển đến phòng/khoa phù hợp."
+FALLBACK_ACK = "[QLSV] Đã tiếp nhận ý kiến và sẽ phản hồi sớm."
+
+
+class ReplyJob(NamedTuple):
+    thread_id: str
+    sender: RoleType
+    text: str
+    message_id: Optional[int]
+    enqueued_at: float
+
+
+class _Latency:
+    """Tổng, max, histogram (ms) và phân vị trên các mẫu gần nhất của một loại độ trễ."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._samples: Deque[float] = deque(maxlen=samples)
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self._buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self._samples.append(ms)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        ordered = sorted(self._samples)
+        return {
+            f"p{p}_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 3) if ordered else None
+            for p in PERCENTILES
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        histogram = {}
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), self._buckets):
+            cumulative += count
+            histogram["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            **self.percentiles(),
+            "histogram_ms": histogram,
+        }
+
+
+class RouterWorkerPool:
+    """concurrency thread worker, mỗi worker một hàng đợi giới hạn (tổng queue_size job)."""
+
+    def __init__(
+        self,
+        concurrency: int = ROUTER_WORKER_CONCURRENCY,
+        queue_size: int = ROUTER_WORKER_QUEUE_SIZE,
+        latency_samples: int = LATENCY_SAMPLES,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        shard_size = max(1, -(-queue_size // self.concurrency))
+        self.queues: List["Queue[ReplyJob]"] = [Queue(maxsize=shard_size) for _ in range(self.concurrency)]
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        # Lỗi khi gọi LLM (job vẫn hoàn thành bằng câu trả lời mặc định)
+        self.llm_errors = 0
+        self.queue_wait = _Latency(latency_samples)
+        self.processing = _Latency(latency_samples)
+        self.end_to_end = _Latency(latency_samples)
+        self.time_to_first_token = _Latency(latency_samples)
+
+    def shard(self, thread_id: str) -> int:
+        # crc32 ổn định giữa các lần chạy (hash() của str thì không)
+        return zlib.crc32(thread_id.encode()) % self.concurrency
+
+    def start(self) -> None:
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), name=f"router-worker-{i}", daemon=True)
+            for i, q in enumerate(self.queues)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+    def enqueue(self, thread_id: str, sender: RoleType, text: str, message_id: Optional[int] = None) -> bool:
+        """Đưa job vào hàng đợi của shard; trả về False nếu hàng đợi đã đầy."""
+        try:
+            self.queues[self.shard(thread_id)].put_nowait(
+                ReplyJob(thread_id, sender, text, message_id, time.perf_counter())
+            )
+        except Full:
+            with self._lock:
+                self.rejected += 1
+            print(f"Router worker queue full, dropping reply job for thread {thread_id}")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self, queue: "Queue[ReplyJob]") -> None:
+        while not self._stop.is_set():
+            try:
+                job = queue.get(timeout=0.5)
+            except Empty:
+                continue
+
+            started = time.perf_counter()
+            ok = self._process(job)
+            finished = time.perf_counter()
+            with self._lock:
+                self.queue_wait.observe((started - job.enqueued_at) * 1000)
+                self.processing.observe((finished - started) * 1000)
+                self.end_to_end.observe((finished - job.enqueued_at) * 1000)
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            queue.task_done()
+
+    def _process(self, job: ReplyJob) -> bool:
+        with SessionLocal() as session:
+            try:
+                thread = session.scalars(
+                    thread_service.get_thread_stmt(job.thread_id).options(undefer(Thread.context_summary))
+                ).first()
+                if thread is None:
+                    return True
+
+                reply: Optional[str] = None
+                context: Optional[ThreadContext] = None
+                if job.sender == "student" and gemini_service.is_configured():
+                    # Chỉ đọc các tin nhắn chưa gộp vào tóm tắt, trước tin nhắn đang trả lời
+                    # (tin nhắn mới được truyền riêng)
+                    stmt = select(Message).filter(Message.thread_id == job.thread_id)
+                    if thread.context_summary_upto is not None:
+                        stmt = stmt.filter(Message.id > thread.context_summary_upto)
+                    if job.message_id is not None:
+                        stmt = stmt.filter(Message.id < job.message_id)
+                    history = session.scalars(stmt.order_by(Message.created_at, Message.id)).all()
+
+                    context = gemini_service.build_context(thread, history, job.text)
+                    # Kết thúc transaction đọc và trả connection về pool trước khi gọi LLM
+                    # (expire_on_commit=False nên thread/history vẫn dùng được): không giữ
+                    # transaction hay khóa dòng nào trong suốt thời gian chờ phản hồi
+                    session.commit()
+                    # Ask Gemini for a reply if configured
+                    reply = self._stream_reply(job, thread, context)
+
+                if not reply:
+                    reply = STUDENT_ACK if job.sender == "student" else "[SYSTEM] Message processed."
+
+                if context is not None and context.changed:
+                    # Lưu tóm tắt cùng transaction ngắn với tin nhắn trả lời bên dưới
+                    session.execute(context_builder.save_summary(job.thread_id, context))
+                # Qua message_service để tóm tắt của thread (last_message_at...) được cập nhật
+                self._save_reply(session, job, reply)
+                return True
+            except Exception as e:
+                print(f"Error in background worker: {str(e)}")
+                # As a last resort, ensure user gets an ack
+                try:
+                    session.rollback()
+                    self._save_reply(session, job, FALLBACK_ACK)
+                except Exception:
+                    pass
+                return False
+
+    def _stream_reply(self, job: ReplyJob, thread: Thread, context: ThreadContext) -> Optional[str]:
+        """Gửi từng đoạn phản hồi tới client đang theo dõi thread; trả về toàn bộ phản hồi."""
+        parts: List[str] = []
+        reply_stream.publish(job.thread_id, {"type": "start", "reply_to": job.message_id})
+        try:
+            for chunk in gemini_service.stream_reply(thread, context.recent, job.text, context.summary):
+                if not parts:
+                    # Tính từ lúc sinh viên gửi tin nhắn (gồm cả thời gian chờ trong hàng đợi)
+                    with self._lock:
+                        self.time_to_first_token.observe((time.perf_counter() - job.enqueued_at) * 1000)
+                parts.append(chunk)
+                reply_stream.publish(job.thread_id, {"type": "chunk", "reply_to": job.message_id, "text": chunk})
+        except CircuitOpenError:
+            # Provider đang lỗi liên tục: trả lời ngay bằng câu mặc định, không chờ gọi API
+            return None
+        except Exception as e:
+            # Bỏ phần đã nhận, dùng câu trả lời mặc định (client thay bằng tin nhắn ở sự kiện "done")
+            print(f"Error generating reply with Gemini: {str(e)}")
+            with self._lock:
+                self.llm_errors += 1
+            return None
+        return "".join(parts) or None
+
+    def _save_reply(self, session: Session, job: ReplyJob, text: str) -> None:
+        """Lưu phản hồi (đúng một lần) và báo cho client thay phần đang stream bằng tin nhắn đã lưu."""
+        message = message_service.create_message(session, job.thread_id, {"text": text, "sender": "assistant"})
+        reply_stream.publish(job.thread_id, {
+            "type": "done",
+            "reply_to": job.message_id,
+            "message": {
+                "id": str(message.id),
+                "thread_id": message.thread_id,
+                "sender": message.sender,
+                "text": message.text,
+                "created_at": message.created_at.isoformat() if message.created_at else None,
+            },
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [q.qsize() for q in self.queues]
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "alive_workers": sum(t.is_alive() for t in self._threads),
+                "queue_size": self.queue_size,
+                "queue_depth": sum(depths),
+                "queue_depth_per_worker": depths,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+                "llm_errors": self.llm_errors,
+                "queue_wait": self.queue_wait.snapshot(),
+                "processing": self.processing.snapshot(),
+                "end_to_end": self.end_to_end.snapshot(),
+                "time_to_first_token": self.time_to_first_token.snapshot(),
+            }
+
+
+router_worker = RouterWorkerPool()
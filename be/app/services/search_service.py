@@ -0,0 +1,118 @@
+"""Tìm kiếm full-text trên tiêu đề thread và nội dung tin nhắn, backend thay đổi theo database."""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import ColumnElement, Select, and_, literal_column, select, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, joinedload
+
+from ..config.settings import SEARCH_BACKEND, SEARCH_MYSQL_MIN_TOKEN_SIZE
+from ..models.models import Message, Thread
+from ..utils.text import search_terms
+from .thread_service import thread_select
+
+
+class SearchBackend:
+    """Sinh điều kiện lọc trên cột đã bỏ dấu (search_title/search_text) từ các từ khóa."""
+    name = "like"
+
+    def thread_filter(self, terms: List[str]) -> ColumnElement:
+        return and_(*(Thread.search_title.contains(term, autoescape=True) for term in terms))
+
+    def message_filter(self, terms: List[str]) -> ColumnElement:
+        return and_(*(Message.search_text.contains(term, autoescape=True) for term in terms))
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """MATCH ... AGAINST trên index FULLTEXT.
+
+    InnoDB bỏ qua các từ ngắn hơn innodb_ft_min_token_size (mặc định 3), tức phần lớn
+    âm tiết tiếng Việt 1-2 ký tự ("di", "ve", "an"): các từ này được lọc thêm bằng LIKE
+    thay vì bị bỏ qua âm thầm; truy vấn chỉ gồm từ ngắn thì dùng LIKE hoàn toàn.
+    """
+    name = "mysql"
+
+    def __init__(self, min_token_size: int = SEARCH_MYSQL_MIN_TOKEN_SIZE) -> None:
+        self.min_token_size = min_token_size
+
+    @staticmethod
+    def _query(terms: List[str]) -> str:
+        # Boolean mode: mọi từ đều bắt buộc, cho phép khớp tiền tố
+        return " ".join(f"+{term}*" for term in terms)
+
+    def _filter(self, column, terms: List[str]) -> ColumnElement:
+        indexed = [term for term in terms if len(term) >= self.min_token_size]
+        short = [column.contains(term, autoescape=True) for term in terms if len(term) < self.min_token_size]
+        if not indexed:
+            return and_(*short)
+        return and_(match(column, against=self._query(indexed)).in_boolean_mode(), *short)
+
+    def thread_filter(self, terms: List[str]) -> ColumnElement:
+        return self._filter(Thread.search_title, terms)
+
+    def message_filter(self, terms: List[str]) -> ColumnElement:
+        return self._filter(Message.search_text, terms)
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """Bảng ảo FTS5 threads_fts/messages_fts (tạo cùng bảng chính, xem models.SQLITE_FTS_DDL)."""
+    name = "sqlite"
+
+    @staticmethod
+    def _query(terms: List[str]) -> str:
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def thread_filter(self, terms: List[str]) -> ColumnElement:
+        matches = text("SELECT rowid FROM threads_fts WHERE threads_fts MATCH :thread_q").bindparams(thread_q=self._query(terms))
+        return literal_column("threads.rowid").in_(matches.columns(literal_column("rowid")))
+
+    def message_filter(self, terms: List[str]) -> ColumnElement:
+        matches = text("SELECT rowid FROM messages_fts WHERE messages_fts MATCH :message_q").bindparams(message_q=self._query(terms))
+        return Message.id.in_(matches.columns(literal_column("rowid")))
+
+
+SEARCH_BACKENDS = {backend.name: backend for backend in (SearchBackend(), MySQLFullTextBackend(), SQLiteFTS5Backend())}
+
+
+def get_backend(db: Session) -> SearchBackend:
+    """Chọn backend theo SEARCH_BACKEND, hoặc theo dialect của database khi là "auto"."""
+    name = SEARCH_BACKEND
+    if name == "auto":
+        name = db.get_bind(Thread).dialect.name
+    return SEARCH_BACKENDS.get(name, SEARCH_BACKENDS["like"])
+
+
+def _scope(stmt: Select, current_user: Dict[str, Any]) -> Select:
+    """Giới hạn kết quả theo quyền truy cập thread (giống routers/messages.py)."""
+    if current_user["role"] == "student":
+        return stmt.filter(Thread.student_id == current_user["id"])
+    if current_user["role"] == "department":
+        return stmt.filter(Thread.assigned_to == current_user["department"])
+    return stmt
+
+
+def search(
+    db: Session,
+    current_user: Dict[str, Any],
+    query: str,
+    kind: str = "all",
+    limit: int = 20,
+    backend: Optional[SearchBackend] = None
+) -> Dict[str, List[Any]]:
+    """Tìm thread theo tiêu đề và tin nhắn theo nội dung (mới nhất trước)."""
+    results: Dict[str, List[Any]] = {"threads": [], "messages": []}
+    terms = search_terms(query)
+    if not terms:
+        return results
+
+    backend = backend or get_backend(db)
+
+    if kind in ("all", "threads"):
+        stmt = _scope(thread_select().filter(backend.thread_filter(terms)), current_user)
+        results["threads"] = db.scalars(stmt.order_by(Thread.created_at.desc()).limit(limit)).all()
+
+    if kind in ("all", "messages"):
+        stmt = select(Message).options(joinedload(Message.user)).join(Thread, Thread.id == Message.thread_id)
+        stmt = _scope(stmt.filter(backend.message_filter(terms)), current_user)
+        results["messages"] = db.scalars(stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)).all()
+
+    return results
@@ -1,14 +1,17 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from datetime import datetime
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, update, insert, select, Select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
-from ..models.models import Thread, Message, User
+from ..models.models import Thread, Message, User, ThreadStat, ThreadArchive
 from ..schemas import ThreadCreate, ThreadUpdate
+from .pagination import apply_keyset
 
 
-def create_thread(db: Session, thread_data: ThreadCreate, student_id: Optional[int] = None) -> Thread:
-    """Create a new thread."""
+def create_thread(db: Session, thread_data: ThreadCreate, student_id: Optional[int] = None, commit: bool = True) -> Thread:
+    """Create a new thread (commit=False để gộp vào transaction của người gọi)."""
     # Tạo ID UUID mới cho thread
     thread_id = str(uuid.uuid4())
     
@@ -20,42 +23,73 @@ def create_thread(db: Session, thread_data: ThreadCreate, student_id: Optional[i
         topic=thread_data.topic,
         issue_type=thread_data.issue_type,
         status="pending",
-        priority=thread_data.priority
+        priority=thread_data.priority,
+        # Gán sẵn quan hệ để serialize không cần truy vấn lại
+        student=db.get(User, student_id) if student_id else None,
+        assignee_user=None
     )
     db.add(db_thread)
-    db.commit()
-    db.refresh(db_thread)
+    bump_thread_stat(db, "pending", None, 1)
+    if commit:
+        db.commit()
     return db_thread
 
 
-def get_thread(db: Session, thread_id: str) -> Optional[Thread]:
-    """Get a thread by ID."""
-    return db.query(Thread).filter(Thread.id == thread_id).first()
+def thread_select(model=Thread) -> Select:
+    """SELECT Thread (hoặc ThreadArchive) kèm eager-load các quan hệ dùng trong ThreadResponse."""
+    return select(model).options(
+        joinedload(model.student),
+        joinedload(model.assignee_user)
+    )
+
+
+def get_thread_stmt(thread_id: str, archived: bool = False) -> Select:
+    model = ThreadArchive if archived else Thread
+    return thread_select(model).filter(model.id == thread_id)
+
+
+def get_thread(db: Session, thread_id: str, include_archived: bool = True) -> Optional[Thread]:
+    """Get a thread by ID, falling back to threads_archive (read-only) on a miss."""
+    thread = db.scalars(get_thread_stmt(thread_id)).first()
+    if thread is None and include_archived:
+        thread = db.scalars(get_thread_stmt(thread_id, archived=True)).first()
+    return thread
 
 
-def list_threads(db: Session, skip: int = 0, limit: int = 100) -> List[Thread]:
-    """List all threads."""
-    return db.query(Thread).order_by(Thread.created_at.desc()).offset(skip).limit(limit).all()
+def paginate_threads(stmt: Select, skip: int, limit: int, cursor: Optional[str], sort: str = "created_at") -> Select:
+    """Phân trang theo cursor (sort, id); skip chỉ dùng khi không có cursor."""
+    stmt = apply_keyset(stmt, getattr(Thread, sort), Thread.id, cursor, descending=True)
+    if not cursor and skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
 
 
-def list_threads_by_student(db: Session, student_id: int, skip: int = 0, limit: int = 100) -> List[Thread]:
+def list_threads(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at", status: Optional[str] = None) -> List[Thread]:
+    """List all threads (lọc theo trạng thái nếu có)."""
+    stmt = thread_select()
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    return db.scalars(paginate_threads(stmt, skip, limit, cursor, sort)).all()
+
+
+def list_threads_by_student(db: Session, student_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at") -> List[Thread]:
     """List threads by student ID."""
-    return db.query(Thread).filter(Thread.student_id == student_id).order_by(Thread.created_at.desc()).offset(skip).limit(limit).all()
+    stmt = thread_select().filter(Thread.student_id == student_id)
+    return db.scalars(paginate_threads(stmt, skip, limit, cursor, sort)).all()
 
 
-def list_threads_by_department(db: Session, department: str, skip: int = 0, limit: int = 100) -> List[Thread]:
+def list_threads_by_department(db: Session, department: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, sort: str = "created_at", status: Optional[str] = None) -> List[Thread]:
     """List threads by department name."""
     # Tìm kiếm chỉ theo assigned_to vì chúng ta chỉ sử dụng tên phòng ban
-    return db.query(Thread).filter(
-        Thread.assigned_to == department
-    ).order_by(Thread.created_at.desc()).offset(skip).limit(limit).all()
+    stmt = thread_select().filter(Thread.assigned_to == department)
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    return db.scalars(paginate_threads(stmt, skip, limit, cursor, sort)).all()
 
 
-def update_thread(db: Session, thread_id: str, thread_data: ThreadUpdate) -> Optional[Thread]:
-    """Update a thread."""
-    db_thread = get_thread(db, thread_id)
-    if not db_thread:
-        return None
+def apply_thread_update(db: Session, db_thread: Thread, thread_data: ThreadUpdate) -> Thread:
+    """Áp dụng ThreadUpdate lên thread đã nạp (không commit)."""
+    old_key = (db_thread.status, db_thread.assigned_to)
         
     # Update thread fields
     if thread_data.assigned_to is not None:
@@ -70,40 +104,164 @@ def update_thread(db: Session, thread_id: str, thread_data: ThreadUpdate) -> Opt
     if thread_data.assignee_id is not None:
         setattr(db_thread, 'assignee_id', thread_data.assignee_id)
     
-    db.commit()
-    db.refresh(db_thread)
+    # Cập nhật bộ đếm thống kê trong cùng transaction
+    new_key = (db_thread.status, db_thread.assigned_to)
+    if new_key != old_key:
+        bump_thread_stat(db, old_key[0], old_key[1], -1)
+        bump_thread_stat(db, new_key[0], new_key[1], 1)
+    
     return db_thread
 
 
-def get_thread_statistics(db: Session) -> Dict[str, Any]:
-    """Get thread statistics."""
-    total = db.query(func.count(Thread.id)).scalar()
+def export_threads_stmt(
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> Select:
+    """SELECT các cột thread để xuất báo cáo (chỉ cột, không nạp vào identity map)."""
+    stmt = select(
+        Thread.id, Thread.title, Thread.student_id, Thread.department, Thread.topic,
+        Thread.issue_type, Thread.assigned_to, Thread.status, Thread.priority,
+        Thread.assignee_id, Thread.created_at, Thread.updated_at
+    )
+    if status:
+        stmt = stmt.filter(Thread.status == status)
+    if department:
+        stmt = stmt.filter(Thread.assigned_to == department)
+    if date_from:
+        stmt = stmt.filter(Thread.created_at >= date_from)
+    if date_to:
+        stmt = stmt.filter(Thread.created_at < date_to)
+    return stmt.order_by(Thread.created_at, Thread.id)
+
+
+def update_thread(db: Session, thread_id: str, thread_data: ThreadUpdate, commit: bool = True) -> Optional[Thread]:
+    """Update a thread."""
+    # Thread đã lưu trữ chỉ đọc
+    db_thread = get_thread(db, thread_id, include_archived=False)
+    if not db_thread:
+        return None
+    
+    apply_thread_update(db, db_thread, thread_data)
+    if commit:
+        db.commit()
+    return db_thread
+
+
+def thread_stat_upsert(db: Session, status: str, key: str, delta: int):
+    """INSERT ... ON DUPLICATE KEY / ON CONFLICT cộng delta nguyên tử; None nếu dialect không hỗ trợ."""
+    dialect = db.get_bind(ThreadStat).dialect.name
+    values = {"status": status, "assigned_to": key, "count": delta}
+    if dialect == "mysql":
+        stmt = mysql.insert(ThreadStat).values(**values)
+        return stmt.on_duplicate_key_update(count=ThreadStat.count + stmt.inserted.count)
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(ThreadStat).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=[ThreadStat.status, ThreadStat.assigned_to],
+            set_={"count": ThreadStat.count + stmt.excluded.count},
+        )
+    return None
+
+
+def bump_thread_stat(db: Session, status: str, assigned_to: Optional[str], delta: int) -> None:
+    """Cộng delta vào bộ đếm thread_stats (không commit, dùng chung transaction).
+
+    Dùng upsert nên hai transaction cùng tạo một dòng bộ đếm không tranh chấp khóa chính;
+    delta âm trên dòng chưa có được ghi nguyên giá trị âm để tổng vẫn khớp.
+    """
+    key = assigned_to or ""
+    stmt = thread_stat_upsert(db, status, key, delta)
+    if stmt is not None:
+        db.execute(stmt)
+        return
     
-    # Count by status
-    status_counts = {
+    result = db.execute(
+        update(ThreadStat)
+        .where(ThreadStat.status == status, ThreadStat.assigned_to == key)
+        .values(count=ThreadStat.count + delta)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(ThreadStat).values(status=status, assigned_to=key, count=delta))
+
+
+def _summarize_counts(rows: List[Tuple[str, Optional[str], int]]) -> Dict[str, Any]:
+    """Gộp các dòng (status, assigned_to, count) thành dữ liệu thống kê."""
+    stats: Dict[str, Any] = {
+        "total": 0,
         "pending": 0,
         "in_progress": 0,
         "resolved": 0,
-        "escalated": 0
+        "escalated": 0,
+        "by_department": {}
     }
+    by_department = stats["by_department"]
     
-    for status in status_counts.keys():
-        status_counts[status] = db.query(func.count(Thread.id)).filter(Thread.status == status).scalar()
-    
-    # Count by department
-    departments = db.query(Thread.assigned_to).filter(Thread.assigned_to != None).distinct().all()
-    by_department = {}
+    for status, assigned_to, count in rows:
+        if not count:
+            continue
+        stats["total"] += count
+        if status in ("pending", "in_progress", "resolved", "escalated"):
+            stats[status] += count
+        if assigned_to:
+            by_department[assigned_to] = by_department.get(assigned_to, 0) + count
     
-    for dept in departments:
-        if dept[0]:  # Check if department is not None
-            count = db.query(func.count(Thread.id)).filter(Thread.assigned_to == dept[0]).scalar()
-            by_department[dept[0]] = count
+    return stats
+
+
+def count_thread_statistics(db: Session) -> List[Tuple[str, str, int]]:
+    """Đếm trực tiếp bằng một GROUP BY trên mỗi bảng threads/threads_archive: luôn đúng
+    nhưng quét cả bảng, nên chỉ dùng để dựng lại bộ đếm (reconcile_thread_statistics)."""
+    # Thống kê vẫn tính thread đã lưu trữ (chỉ giảm khi bị xóa hẳn)
+    counts: Dict[Tuple[str, str], int] = {}
+    for model in (Thread, ThreadArchive):
+        for status, assigned_to, count in db.query(
+            model.status, model.assigned_to, func.count(model.id)
+        ).group_by(model.status, model.assigned_to):
+            key = (status, assigned_to or "")
+            counts[key] = counts.get(key, 0) + count
+    return [(status, assigned_to, count) for (status, assigned_to), count in counts.items()]
+
+
+def get_thread_statistics(db: Session) -> Dict[str, Any]:
+    """Get thread statistics (một lần đọc bảng bộ đếm thread_stats).
+
+    Bộ đếm được điền khi migrate (migration thread_stats, hoặc migrate.py --create-all)
+    và cập nhật trên mọi đường ghi; bảng thiếu hay lệch thì dựng lại bằng
+    reconcile_thread_statistics, không tự đếm lại ở đây.
+    """
+    rows = db.query(ThreadStat.status, ThreadStat.assigned_to, ThreadStat.count).all()
+    return _summarize_counts(rows)
+
+
+def reconcile_thread_statistics(db: Session) -> Dict[str, Any]:
+    """Tính lại toàn bộ thread_stats từ bảng threads và threads_archive, báo cáo sai lệch."""
+    actual = {(status, assigned_to): count for status, assigned_to, count in count_thread_statistics(db)}
     
-    return {
-        "total": total,
-        "pending": status_counts["pending"],
-        "in_progress": status_counts["in_progress"],
-        "resolved": status_counts["resolved"],
-        "escalated": status_counts["escalated"],
-        "by_department": by_department
+    stored = {
+        (row.status, row.assigned_to): row.count
+        for row in db.query(ThreadStat).all()
     }
+    
+    drift = []
+    for key in sorted(set(actual) | set(stored)):
+        expected = actual.get(key, 0)
+        current = stored.get(key, 0)
+        if expected != current:
+            drift.append({
+                "status": key[0],
+                "assigned_to": key[1] or None,
+                "stored": current,
+                "actual": expected
+            })
+    
+    # Ghi lại bộ đếm từ đầu trong một transaction
+    db.query(ThreadStat).delete(synchronize_session=False)
+    db.add_all(
+        ThreadStat(status=status, assigned_to=assigned_to, count=count)
+        for (status, assigned_to), count in actual.items()
+    )
+    db.commit()
+    
+    return {"rows": len(actual), "drift": drift}
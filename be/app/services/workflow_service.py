@@ -0,0 +1,107 @@
+"""Các thao tác nghiệp vụ trên thread; mỗi thao tác là đúng một transaction."""
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.models import Message, Thread
+from ..schemas import ThreadCreate, ThreadUpdate
+from ..schemas.department_schemas import DepartmentCreate
+from . import department_service, message_service, thread_service
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """Commit một lần khi khối lệnh thành công, rollback nếu có lỗi."""
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def create_thread_with_issue(db: Session, thread_data: ThreadCreate, student_id: Optional[int] = None) -> Tuple[Thread, Optional[Message]]:
+    """Tạo thread và tin nhắn đầu tiên (nếu có) trong cùng một transaction."""
+    issue_message = None
+    with unit_of_work(db):
+        thread = thread_service.create_thread(db, thread_data, student_id, commit=False)
+        if thread_data.issue:
+            issue_message = message_service.create_message(
+                db=db,
+                thread_id=thread.id,
+                message_data={"text": thread_data.issue, "sender": "student"},
+                user_id=student_id,
+                commit=False
+            )
+    return thread, issue_message
+
+
+def assign_thread(db: Session, thread: Thread, department: str) -> Thread:
+    """Phân công thread cho phòng/khoa, tạo phòng ban nếu chưa có."""
+    with unit_of_work(db):
+        if not department_service.get_department_by_name(db, department):
+            # Tạo department mới nếu chưa tồn tại
+            department_service.create_department(
+                db, DepartmentCreate(name=department, description="Auto-created department"), commit=False
+            )
+        
+        thread_service.apply_thread_update(db, thread, ThreadUpdate(
+            assigned_to=department,
+            status="assigned"  # Đổi thành "assigned" thay vì "in_progress" để phù hợp với workflow
+        ))
+        message_service.create_message(
+            db=db,
+            thread_id=thread.id,
+            message_data={
+                "text": f"[SYSTEM] Yêu cầu đã được chuyển đến phòng/khoa: {department}",
+                "sender": "system"
+            },
+            commit=False
+        )
+    return thread
+
+
+def escalate_thread(db: Session, thread: Thread) -> Thread:
+    """Chuyển thread lên cấp cao hơn."""
+    with unit_of_work(db):
+        thread_service.apply_thread_update(db, thread, ThreadUpdate(status="escalated"))
+        message_service.create_message(
+            db=db,
+            thread_id=thread.id,
+            message_data={
+                "text": f"[SYSTEM] Vấn đề đã được chuyển lên cấp cao hơn.",
+                "sender": "system"
+            },
+            commit=False
+        )
+    return thread
+
+
+def respond_to_thread(db: Session, thread: Thread, thread_data: ThreadUpdate, role: str, user_id: Optional[int], department: Optional[str]) -> Thread:
+    """Cập nhật thread, kèm phản hồi của cán bộ và thông báo khi đã giải quyết."""
+    with unit_of_work(db):
+        thread_service.apply_thread_update(db, thread, thread_data)
+        
+        # Add response message if provided
+        if thread_data.response:
+            message_service.create_message(
+                db=db,
+                thread_id=thread.id,
+                message_data={"text": thread_data.response, "sender": role},
+                user_id=user_id,
+                commit=False
+            )
+            
+            # Add system notification if status changed to resolved
+            if thread_data.status == "resolved":
+                message_service.create_message(
+                    db=db,
+                    thread_id=thread.id,
+                    message_data={
+                        "text": f"[SYSTEM] Vấn đề của bạn đã được {department if department else 'giải quyết'} giải quyết.",
+                        "sender": "system"
+                    },
+                    commit=False
+                )
+    return thread
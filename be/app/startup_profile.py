@@ -0,0 +1,104 @@
+"""Đo thời gian khởi động app: import app.main và lifespan startup, chạy trong process mới.
+
+    python -m app.startup_profile [--top 15] [--budget-ms 1500] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# Chạy trong process con để không bị ảnh hưởng bởi module đã import sẵn
+_CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def _startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(_startup())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "heavy_modules_loaded": [m for m in ("google.generativeai", "alembic") if m in sys.modules],
+}))
+"""
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Đọc output của `python -X importtime`: thời gian riêng/tích lũy (µs) và độ sâu của từng module."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth,
+        })
+    return modules
+
+
+def profile() -> Dict[str, Any]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"App failed to start:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = _parse_importtime(result.stderr)
+    report["total_ms"] = report["import_ms"] + report["lifespan_ms"]
+    # Gộp theo package gốc (fastapi, sqlalchemy...) và từng module của app
+    packages: Dict[str, Dict[str, Any]] = {}
+    for m in modules:
+        if "." not in m["module"] or m["module"].startswith("app."):
+            # Một module có thể xuất hiện nhiều lần (import lại qua package cha): giữ lần lâu nhất
+            if m["module"] not in packages or m["cumulative_ms"] > packages[m["module"]]["cumulative_ms"]:
+                packages[m["module"]] = m
+    report["packages"] = sorted(packages.values(), key=lambda m: m["cumulative_ms"], reverse=True)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Báo cáo thời gian khởi động app")
+    parser.add_argument("--top", type=int, default=15, help="Số module chậm nhất hiển thị")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Thoát mã 1 nếu import + startup vượt ngưỡng này")
+    parser.add_argument("--json", action="store_true", help="In báo cáo dạng JSON")
+    args = parser.parse_args()
+
+    report = profile()
+    report["packages"] = report["packages"][:args.top]
+    over_budget = args.budget_ms is not None and report["total_ms"] > args.budget_ms
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import app.main : {report['import_ms']:8.1f} ms")
+        print(f"lifespan startup: {report['lifespan_ms']:8.1f} ms")
+        print(f"total           : {report['total_ms']:8.1f} ms")
+        if report["heavy_modules_loaded"]:
+            print(f"heavy modules loaded at startup: {', '.join(report['heavy_modules_loaded'])}")
+        print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+        for m in report["packages"]:
+            print(f"{m['cumulative_ms']:14.1f} {m['self_ms']:9.1f}  {m['module']}")
+
+    if over_budget:
+        print(f"\nStartup budget exceeded: {report['total_ms']:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Circuit breaker: ngừng gọi dịch vụ ngoài đang lỗi liên tục, thử lại sau một khoảng nghỉ."""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """closed -> open sau failure_threshold lỗi liên tiếp; sau reset_timeout giây chuyển half_open,
+    cho đúng một lần gọi thử: thành công thì đóng lại, lỗi thì mở tiếp."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """True nếu được gọi; False (fail fast) khi breaker đang mở hoặc đã có một lần gọi thử."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                self._probing = self.state == HALF_OPEN
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                print(f"Circuit breaker '{self.name}' closed")
+            self.state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                print(f"Circuit breaker '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+
+    def release(self) -> None:
+        """Trả lại lượt gọi thử khi lần gọi kết thúc mà không rõ thành công hay lỗi (người gọi dừng đọc)."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout,
+                "retry_in_s": retry_in,
+                "successes": self.successes,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "times_opened": self.times_opened,
+            }
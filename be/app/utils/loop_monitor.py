@@ -0,0 +1,75 @@
+"""Đo độ trễ của event loop: một tác vụ ngủ đều đặn và ghi lại phần thức dậy muộn."""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+# Biên trên (ms) của histogram độ trễ
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopLagMonitor:
+    """Độ trễ lớn nghĩa là có code chặn event loop (I/O đồng bộ, tính toán nặng trong async def)."""
+
+    def __init__(self, interval: float = 0.1, warn_ms: float = 100.0):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.samples = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.slow = 0
+        self._buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self._task: Optional[asyncio.Task] = None
+
+    def observe(self, lag_ms: float) -> None:
+        self.samples += 1
+        self.total_ms += lag_ms
+        self.last_ms = lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self._buckets[i] += 1
+                break
+        else:
+            self._buckets[-1] += 1
+        if lag_ms >= self.warn_ms:
+            self.slow += 1
+            print(f"Event loop blocked for {lag_ms:.0f} ms")
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = (time.perf_counter() - started - self.interval) * 1000
+            self.observe(max(lag_ms, 0.0))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(LAG_BUCKETS_MS, self._buckets):
+            cumulative += count
+            histogram[f"le_{bound}ms"] = cumulative
+        histogram["le_inf"] = cumulative + self._buckets[-1]
+        return {
+            "interval_ms": self.interval * 1000,
+            "warn_ms": self.warn_ms,
+            "samples": self.samples,
+            "avg_ms": round(self.total_ms / self.samples, 3) if self.samples else None,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+            "slow": self.slow,
+            "histogram": histogram,
+        }
@@ -0,0 +1,29 @@
+"""Chuẩn hóa văn bản tiếng Việt cho tìm kiếm."""
+import re
+import unicodedata
+from typing import List, Optional
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Bỏ dấu, chữ thường, gộp khoảng trắng: "Học phí  ĐH" -> "hoc phi dh"."""
+    if not text:
+        return ""
+    # đ/Đ không tách được dấu bằng NFD nên thay riêng
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return " ".join(stripped.split())
+
+
+def search_terms(query: Optional[str]) -> List[str]:
+    """Tách truy vấn thành các từ đã chuẩn hóa (bỏ ký tự đặc biệt của cú pháp full-text)."""
+    return _WORD_RE.findall(fold_text(query))
+
+
+def folded_default(column: str):
+    """Giá trị mặc định cho cột tìm kiếm, tính từ cột nguồn trong cùng câu INSERT."""
+    def default(context):
+        return fold_text(context.get_current_parameters().get(column))
+    return default
@@ -0,0 +1,38 @@
+"""
+Script chuyển thread đã giải quyết lâu ngày sang bảng lưu trữ và xóa hẳn khi hết thời hạn lưu trữ
+"""
+import argparse
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để có thể import các module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import ARCHIVE_AFTER_DAYS, ARCHIVE_PURGE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from app.database.db import SessionLocal
+from app.services import archive_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Lưu trữ thread đã giải quyết")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Lưu trữ thread resolved trước số ngày này")
+    parser.add_argument("--purge-days", type=int, default=ARCHIVE_PURGE_AFTER_DAYS, help="Xóa hẳn thread lưu trữ trước số ngày này (0 = không xóa)")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None, help="Giới hạn số batch mỗi lần chạy")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        archived = archive_service.archive_resolved_threads(db, args.days, args.batch_size, args.max_batches)
+        purged = archive_service.purge_archive(db, args.purge_days, args.batch_size, args.max_batches)
+    finally:
+        db.close()
+
+    print(f"Đã lưu trữ {archived['threads']} thread, {archived['messages']} tin nhắn ({archived['batches']} batch)")
+    if args.purge_days > 0:
+        print(f"Đã xóa hẳn {purged['threads']} thread, {purged['messages']} tin nhắn ({purged['batches']} batch)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
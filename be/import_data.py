@@ -0,0 +1,47 @@
+"""
+Script nhập hàng loạt threads/messages từ file NDJSON hoặc CSV (vd. ticket cũ, file xuất từ /leadership/export)
+"""
+import argparse
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để có thể import các module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.db import SessionLocal
+from app.services import import_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Nhập threads/messages hàng loạt")
+    parser.add_argument("kind", choices=sorted(import_service.IMPORT_SCHEMAS))
+    parser.add_argument("path", help="Đường dẫn file .jsonl/.ndjson hoặc .csv ('-' để đọc stdin)")
+    parser.add_argument("--format", choices=import_service.IMPORT_FORMATS, help="Mặc định đoán theo phần mở rộng")
+    parser.add_argument("--chunk-size", type=int, default=import_service.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    db = SessionLocal()
+    try:
+        if args.path == "-":
+            report = import_service.import_records(db, sys.stdin, args.kind, fmt, args.chunk_size)
+        else:
+            with open(args.path, encoding="utf-8-sig", newline="") as stream:
+                report = import_service.import_records(db, stream, args.kind, fmt, args.chunk_size)
+    finally:
+        db.close()
+
+    print(
+        f"Đã xử lý {report['processed']} dòng: ghi {report['inserted']}, loại {report['rejected']} "
+        f"trong {report['seconds']}s ({report['rows_per_sec']} dòng/s)"
+    )
+    for item in report["rejected_rows"]:
+        print(f"  dòng {item['line']}: {item['error']}")
+    if report["rejected"] > len(report["rejected_rows"]):
+        print(f"  ... và {report['rejected'] - len(report['rejected_rows'])} dòng khác")
+    return 1 if report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Script tạo/cập nhật schema database (chạy trước khi khởi động app)
+"""
+import argparse
+import sys
+import os
+from typing import List, Optional
+
+# Thêm thư mục cha vào sys.path để có thể import các module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import DATABASE_URL
+from app.database.db import Base, SessionLocal, engine
+from app.models import models  # noqa: F401  (đăng ký các bảng vào Base.metadata)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ALEMBIC_INI = os.path.join(BASE_DIR, "alembic.ini")
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    # Dùng cùng database với app thay vì URL cố định trong alembic.ini
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+    return config
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tạo/cập nhật schema database")
+    parser.add_argument(
+        "--create-all",
+        action="store_true",
+        help="Tạo bảng trực tiếp từ models (database dev/SQLite mới), rồi đánh dấu alembic ở head",
+    )
+    args = parser.parse_args(argv)
+
+    from alembic import command
+
+    if args.create_all:
+        Base.metadata.create_all(bind=engine)
+        # thread_stats vừa tạo có thể rỗng trong khi threads đã có dữ liệu: dựng lại bộ đếm
+        from app.services.thread_service import reconcile_thread_statistics
+        with SessionLocal() as db:
+            reconcile_thread_statistics(db)
+        command.stamp(_alembic_config(), "head")
+        print("Đã tạo bảng từ models và đánh dấu alembic ở head")
+    else:
+        command.upgrade(_alembic_config(), "head")
+        print("Đã cập nhật schema lên head")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""add_archive_tables
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3b4c5d6e7f8'
+down_revision = 'f2a3b4c5d6e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bảng lưu trữ thread đã giải quyết lâu ngày (cùng cột với threads)
+    op.create_table('threads_archive',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=True),
+        sa.Column('department', sa.String(length=100), nullable=True),
+        sa.Column('topic', sa.String(length=100), nullable=True),
+        sa.Column('issue_type', sa.String(length=100), nullable=True),
+        sa.Column('assigned_to', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.Enum('new', 'pending', 'assigned', 'in_progress', 'resolved', 'escalated'), nullable=False),
+        sa.Column('priority', sa.Enum('low', 'medium', 'normal', 'high', 'urgent'), nullable=False),
+        sa.Column('assignee_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['assignee_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_threads_archive_updated_at', 'threads_archive', ['updated_at'])
+
+    op.create_table('messages_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('thread_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('sender', sa.Enum('student', 'manager', 'department', 'leadership', 'system', 'assistant'), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_messages_archive_thread_id_created_at_id', 'messages_archive', ['thread_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_archive_thread_id_created_at_id', table_name='messages_archive')
+    op.drop_table('messages_archive')
+    op.drop_index('ix_threads_archive_updated_at', table_name='threads_archive')
+    op.drop_table('threads_archive')
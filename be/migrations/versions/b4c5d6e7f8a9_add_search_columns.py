@@ -0,0 +1,106 @@
+"""add_search_columns
+
+Revision ID: b4c5d6e7f8a9
+Revises: a3b4c5d6e7f8
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c5d6e7f8a9'
+down_revision = 'a3b4c5d6e7f8'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Chép nguyên từ app code tại thời điểm tạo migration để lịch sử không đổi theo code ứng dụng
+SQLITE_FTS_DDL = {
+    "threads": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS threads_fts USING fts5(search_title, content='threads', content_rowid='rowid')",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_ai AFTER INSERT ON threads BEGIN "
+        "INSERT INTO threads_fts(rowid, search_title) VALUES (new.rowid, new.search_title); END",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_ad AFTER DELETE ON threads BEGIN "
+        "INSERT INTO threads_fts(threads_fts, rowid, search_title) VALUES ('delete', old.rowid, old.search_title); END",
+        "CREATE TRIGGER IF NOT EXISTS threads_fts_au AFTER UPDATE OF search_title ON threads BEGIN "
+        "INSERT INTO threads_fts(threads_fts, rowid, search_title) VALUES ('delete', old.rowid, old.search_title); "
+        "INSERT INTO threads_fts(rowid, search_title) VALUES (new.rowid, new.search_title); END",
+    ],
+    "messages": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(search_text, content='messages', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF search_text ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        "INSERT INTO messages_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    ],
+}
+
+
+def fold_text(text):
+    """Bỏ dấu, chữ thường, gộp khoảng trắng (như app.utils.text.fold_text lúc tạo migration)."""
+    if not text:
+        return ""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return " ".join(stripped.split())
+
+
+def _backfill(bind, table, key, source, target):
+    # Điền theo từng batch khóa chính để không giữ khóa lâu trên bảng lớn
+    last = None
+    while True:
+        query = f"SELECT {key}, {source} FROM {table}"
+        params = {}
+        if last is not None:
+            query += f" WHERE {key} > :last"
+            params["last"] = last
+        rows = bind.execute(sa.text(query + f" ORDER BY {key} LIMIT {BATCH_SIZE}"), params).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            sa.text(f"UPDATE {table} SET {target} = :value WHERE {key} = :key"),
+            [{"key": row[0], "value": fold_text(row[1])} for row in rows]
+        )
+        last = rows[-1][0]
+
+
+def upgrade() -> None:
+    # Cột đã bỏ dấu phục vụ tìm kiếm không phân biệt dấu tiếng Việt
+    op.add_column('threads', sa.Column('search_title', sa.String(length=255), nullable=True))
+    op.add_column('messages', sa.Column('search_text', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    _backfill(bind, 'threads', 'id', 'title', 'search_title')
+    _backfill(bind, 'messages', 'id', 'text', 'search_text')
+
+    if bind.dialect.name == 'mysql':
+        op.create_index('ix_threads_search_title', 'threads', ['search_title'], mysql_prefix='FULLTEXT')
+        op.create_index('ix_messages_search_text', 'messages', ['search_text'], mysql_prefix='FULLTEXT')
+    elif bind.dialect.name == 'sqlite':
+        for table in ('threads', 'messages'):
+            for statement in SQLITE_FTS_DDL[table]:
+                op.execute(statement)
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'mysql':
+        op.drop_index('ix_messages_search_text', table_name='messages')
+        op.drop_index('ix_threads_search_title', table_name='threads')
+    elif bind.dialect.name == 'sqlite':
+        for table in ('threads', 'messages'):
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    op.drop_column('messages', 'search_text')
+    op.drop_column('threads', 'search_title')
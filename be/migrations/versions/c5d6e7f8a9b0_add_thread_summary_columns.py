@@ -0,0 +1,87 @@
+"""add_thread_summary_columns
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d6e7f8a9b0'
+down_revision = 'b4c5d6e7f8a9'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+SENDERS = ('student', 'manager', 'department', 'leadership', 'system', 'assistant')
+
+PREVIEW_LENGTH = 200
+
+
+def _preview(text):
+    # Như message_service.message_preview lúc tạo migration: gộp khoảng trắng rồi cắt
+    return " ".join((text or "").split())[:PREVIEW_LENGTH]
+
+
+def _add_summary_columns(table, with_defaults):
+    op.add_column(table, sa.Column('last_message_at', sa.DateTime(timezone=True),
+                                   server_default=sa.text('now()') if with_defaults else None, nullable=True))
+    op.add_column(table, sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column(table, sa.Column('last_message_preview', sa.String(length=255), nullable=True))
+    op.add_column(table, sa.Column('last_sender', sa.Enum(*SENDERS), nullable=True))
+
+
+def _backfill(bind, table, messages):
+    # Tính từ bảng tin nhắn tương ứng, theo từng batch thread để không khóa cả bảng
+    latest = (
+        f"SELECT {{column}} FROM {messages} m WHERE m.thread_id = {table}.id "
+        f"ORDER BY m.created_at DESC, m.id DESC LIMIT 1"
+    )
+    update = sa.text(f"""
+        UPDATE {table} SET
+            message_count = (SELECT COUNT(*) FROM {messages} m WHERE m.thread_id = {table}.id),
+            last_message_at = COALESCE((SELECT MAX(m.created_at) FROM {messages} m WHERE m.thread_id = {table}.id), created_at),
+            last_sender = ({latest.format(column="m.sender")})
+        WHERE id IN :ids
+    """).bindparams(sa.bindparam('ids', expanding=True))
+
+    last = ''
+    while True:
+        ids = [row[0] for row in bind.execute(
+            sa.text(f"SELECT id FROM {table} WHERE id > :last ORDER BY id LIMIT {BATCH_SIZE}"), {"last": last}
+        )]
+        if not ids:
+            break
+        bind.execute(update, {"ids": ids})
+        rows = bind.execute(
+            sa.text(f"SELECT id, ({latest.format(column='m.text')}) FROM {table} WHERE id IN :ids")
+            .bindparams(sa.bindparam('ids', expanding=True)),
+            {"ids": ids}
+        ).fetchall()
+        previews = [{"key": row[0], "value": _preview(row[1])} for row in rows if row[1] is not None]
+        if previews:
+            bind.execute(sa.text(f"UPDATE {table} SET last_message_preview = :value WHERE id = :key"), previews)
+        last = ids[-1]
+
+
+def upgrade() -> None:
+    # Tóm tắt hoạt động của thread cho trang danh sách
+    _add_summary_columns('threads', with_defaults=True)
+    _add_summary_columns('threads_archive', with_defaults=False)
+
+    bind = op.get_bind()
+    _backfill(bind, 'threads', 'messages')
+    _backfill(bind, 'threads_archive', 'messages_archive')
+
+    op.create_index('ix_threads_assigned_to_last_message_at', 'threads', ['assigned_to', 'last_message_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_threads_assigned_to_last_message_at', table_name='threads')
+    for table in ('threads_archive', 'threads'):
+        for column in ('last_sender', 'last_message_preview', 'message_count', 'last_message_at'):
+            op.drop_column(table, column)
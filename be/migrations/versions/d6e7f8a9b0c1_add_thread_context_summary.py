@@ -0,0 +1,27 @@
+"""add_thread_context_summary
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6e7f8a9b0c1'
+down_revision = 'c5d6e7f8a9b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Không cần backfill: tóm tắt được tạo dần ở lần sinh phản hồi tiếp theo
+    op.add_column('threads', sa.Column('context_summary', sa.Text(), nullable=True))
+    op.add_column('threads', sa.Column('context_summary_upto', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('threads', 'context_summary_upto')
+    op.drop_column('threads', 'context_summary')
@@ -0,0 +1,35 @@
+"""add_listing_indexes
+
+Revision ID: e1f2a3b4c5d6
+Revises: d20ca63b0a1e, 9a098d9a4def, ad989c1234fe
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f2a3b4c5d6'
+# Đồng thời là điểm merge: gộp ba head cũ (users mẫu, departments, chuỗi sửa bảng messages)
+# để các migration sau nằm trên một head duy nhất
+down_revision = ('d20ca63b0a1e', '9a098d9a4def', 'ad989c1234fe')
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Index cho các truy vấn danh sách threads (theo sinh viên, phòng ban, trạng thái)
+    op.create_index('ix_threads_student_id_created_at', 'threads', ['student_id', 'created_at'])
+    op.create_index('ix_threads_assigned_to_status_created_at', 'threads', ['assigned_to', 'status', 'created_at'])
+    op.create_index('ix_threads_status_created_at', 'threads', ['status', 'created_at'])
+
+    # Index cho danh sách tin nhắn trong một thread
+    op.create_index('ix_messages_thread_id_created_at_id', 'messages', ['thread_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_thread_id_created_at_id', table_name='messages')
+    op.drop_index('ix_threads_status_created_at', table_name='threads')
+    op.drop_index('ix_threads_assigned_to_status_created_at', table_name='threads')
+    op.drop_index('ix_threads_student_id_created_at', table_name='threads')
@@ -0,0 +1,31 @@
+"""add_unfiltered_listing_indexes
+
+Revision ID: e7f8a9b0c1d2
+Revises: d6e7f8a9b0c1
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f8a9b0c1d2'
+down_revision = 'd6e7f8a9b0c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (assigned_to, status, created_at) không sắp xếp được khi chỉ lọc theo phòng ban;
+    # danh sách của quản lý/lãnh đạo không lọc gì, chỉ ORDER BY created_at DESC
+    op.create_index('ix_threads_assigned_to_created_at', 'threads', ['assigned_to', 'created_at'])
+    op.create_index('ix_threads_created_at', 'threads', ['created_at'])
+    # Poll tin nhắn mới theo after_id sắp xếp theo id, không theo created_at
+    op.create_index('ix_messages_thread_id_id', 'messages', ['thread_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_thread_id_id', table_name='messages')
+    op.drop_index('ix_threads_created_at', table_name='threads')
+    op.drop_index('ix_threads_assigned_to_created_at', table_name='threads')
@@ -0,0 +1,38 @@
+"""add_thread_stats_table
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a3b4c5d6e7'
+down_revision = 'e1f2a3b4c5d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bảng bộ đếm thread theo (status, assigned_to)
+    op.create_table('thread_stats',
+        sa.Column('status', sa.Enum('new', 'pending', 'assigned', 'in_progress', 'resolved', 'escalated'), nullable=False),
+        sa.Column('assigned_to', sa.String(length=100), nullable=False, server_default=''),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('status', 'assigned_to')
+    )
+
+    # Điền dữ liệu ban đầu từ bảng threads
+    op.execute("""
+        INSERT INTO thread_stats (status, assigned_to, count)
+        SELECT status, COALESCE(assigned_to, ''), COUNT(*)
+        FROM threads
+        GROUP BY status, COALESCE(assigned_to, '')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('thread_stats')
@@ -0,0 +1,36 @@
+"""
+Script đồng bộ lại bảng thread_stats từ bảng threads và báo cáo sai lệch
+"""
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để có thể import các module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.db import SessionLocal
+from app.services import thread_service
+
+
+def main() -> int:
+    db = SessionLocal()
+    try:
+        report = thread_service.reconcile_thread_statistics(db)
+    finally:
+        db.close()
+
+    print(f"Đã tính lại {report['rows']} bộ đếm thread_stats")
+    if not report["drift"]:
+        print("Không phát hiện sai lệch")
+        return 0
+
+    print(f"Phát hiện {len(report['drift'])} bộ đếm sai lệch:")
+    for item in report["drift"]:
+        print(
+            f"  status={item['status']} assigned_to={item['assigned_to']}: "
+            f"stored={item['stored']} actual={item['actual']}"
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Script phát lại câu hỏi của sinh viên vào pipeline sinh phản hồi tự động với QPS cố định
+và báo cáo phân vị độ trễ. Mặc định dùng LLM giả lập (FakeProvider) nên chạy offline được.
+
+    python replay_load.py --qps 20 --count 500 --threads 50 --latency-ms 800 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+# Thêm thư mục cha vào sys.path để có thể import các module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select
+
+from app.config.settings import (
+    ROUTER_WORKER_CONCURRENCY,
+    ROUTER_WORKER_QUEUE_SIZE,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_LATENCY_SIGMA,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_OUTPUT_WORDS,
+    FAKE_LLM_SEED,
+    LLM_TIMEOUT,
+)
+from app.database.db import SessionLocal
+from app.models.models import Message, Thread, User
+from app.schemas import ThreadCreate
+from app.services import message_service, thread_service
+from app.services.answer_cache import answer_cache
+from app.services.llm_provider import FakeProvider, ResilientProvider, get_provider, use_provider
+from app.services.router_worker import RouterWorkerPool
+
+LOAD_TEST_TITLE = "[load-test] replay"
+
+DEFAULT_QUESTIONS = [
+    "Hạn nộp học phí học kỳ này là khi nào?",
+    "Em muốn đăng ký học lại môn Giải tích thì làm thế nào?",
+    "Lịch thi cuối kỳ đã có chưa ạ?",
+    "Thủ tục xin giấy xác nhận sinh viên cần những gì?",
+    "Em bị trùng lịch thi hai môn thì xử lý ra sao?",
+    "Khi nào có kết quả xét học bổng?",
+]
+
+
+def load_questions(db, path: str, limit: int) -> List[str]:
+    """Câu hỏi lấy từ file (mỗi dòng một câu) hoặc từ tin nhắn của sinh viên trong database."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = list(db.scalars(
+            select(Message.text)
+            .filter(Message.sender == "student", Message.text.is_not(None))
+            .order_by(Message.id.desc())
+            .limit(limit)
+        ))
+    return questions or DEFAULT_QUESTIONS
+
+
+def create_threads(db, student: User, count: int) -> List[str]:
+    thread_data = ThreadCreate(title=LOAD_TEST_TITLE, topic="Khác")
+    threads = [thread_service.create_thread(db, thread_data, student.id, commit=False) for _ in range(count)]
+    db.commit()
+    return [t.id for t in threads]
+
+
+def cleanup(db, thread_ids: List[str]) -> None:
+    """Xóa thread và tin nhắn đã tạo, trả lại bộ đếm thread_stats."""
+    db.execute(delete(Message).where(Message.thread_id.in_(thread_ids)))
+    db.execute(delete(Thread).where(Thread.id.in_(thread_ids)))
+    thread_service.bump_thread_stat(db, "pending", None, -len(thread_ids))
+    db.commit()
+
+
+def replay(pool: RouterWorkerPool, thread_ids: List[str], questions: List[str], student: User, qps: float, count: int) -> float:
+    """Gửi count tin nhắn theo lịch cố định (open-loop: không chờ phản hồi); trả về thời gian gửi (giây)."""
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        for i in range(count):
+            # Ngủ tới thời điểm của tin nhắn thứ i; nếu bị trễ thì gửi ngay, không dồn lịch
+            delay = started + i / qps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            thread_id = thread_ids[i % len(thread_ids)]
+            text = questions[i % len(questions)]
+            message = message_service.create_message(db, thread_id, {"text": text, "sender": "student"}, student.id)
+            pool.enqueue(thread_id, "student", text, message.id)
+    finally:
+        db.close()
+    return time.perf_counter() - started
+
+
+def wait_for_drain(pool: RouterWorkerPool, count: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = pool.stats()
+        if stats["processed"] + stats["failed"] + stats["rejected"] >= count:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def report(stats: Dict[str, Any], qps: float, count: int, send_s: float, total_s: float, drained: bool) -> Dict[str, Any]:
+    keys = ("count", "avg_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")
+    return {
+        "target_qps": qps,
+        "sent": count,
+        "offered_qps": round(count / send_s, 2) if send_s else None,
+        "completed_qps": round((stats["processed"] + stats["failed"]) / total_s, 2) if total_s else None,
+        "drained": drained,
+        "processed": stats["processed"],
+        "failed": stats["failed"],
+        "rejected": stats["rejected"],
+        "llm_errors": stats["llm_errors"],
+        "latency": {
+            name: {k: stats[name][k] for k in keys}
+            for name in ("end_to_end", "time_to_first_token", "queue_wait", "processing")
+        },
+        "answer_cache": answer_cache.stats()["hit_rate"],
+        "llm": get_provider().stats(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Phát lại tải vào pipeline sinh phản hồi tự động")
+    parser.add_argument("--qps", type=float, default=10.0, help="Số tin nhắn gửi mỗi giây")
+    parser.add_argument("--count", type=int, default=None, help="Tổng số tin nhắn (mặc định qps * duration)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Thời gian gửi (giây) khi không có --count")
+    parser.add_argument("--threads", type=int, default=20, help="Số thread tạo cho lần chạy")
+    parser.add_argument("--student", default="student1", help="Username sinh viên gửi tin nhắn")
+    parser.add_argument("--questions", default="", help="File câu hỏi (mỗi dòng một câu); mặc định lấy từ database")
+    parser.add_argument("--concurrency", type=int, default=ROUTER_WORKER_CONCURRENCY)
+    parser.add_argument("--queue-size", type=int, default=ROUTER_WORKER_QUEUE_SIZE)
+    parser.add_argument("--provider", choices=("fake", "configured"), default="fake",
+                        help="fake: LLM giả lập với tham số bên dưới; configured: theo LLM_PROVIDER")
+    parser.add_argument("--latency-ms", type=float, default=FAKE_LLM_LATENCY_MS)
+    parser.add_argument("--latency-sigma", type=float, default=FAKE_LLM_LATENCY_SIGMA)
+    parser.add_argument("--error-rate", type=float, default=FAKE_LLM_ERROR_RATE)
+    parser.add_argument("--output-words", type=int, default=FAKE_LLM_OUTPUT_WORDS)
+    parser.add_argument("--seed", type=int, default=FAKE_LLM_SEED)
+    parser.add_argument("--llm-timeout", type=float, default=LLM_TIMEOUT, help="Thời hạn mỗi lần gọi LLM (giây)")
+    parser.add_argument("--answer-cache", action="store_true", help="Giữ cache câu trả lời (mặc định tắt để mọi tin nhắn đều gọi LLM)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Thời gian chờ xử lý hết hàng đợi sau khi gửi xong")
+    parser.add_argument("--keep", action="store_true", help="Không xóa thread/tin nhắn đã tạo")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    count = args.count if args.count is not None else int(args.qps * args.duration)
+    if args.qps <= 0 or count <= 0 or args.threads <= 0:
+        parser.error("--qps, --count/--duration và --threads phải lớn hơn 0")
+
+    if args.provider == "fake":
+        fake = FakeProvider(args.latency_ms, args.latency_sigma, args.error_rate, args.output_words, args.seed)
+        use_provider(ResilientProvider(fake, timeout=args.llm_timeout))
+    if not get_provider().is_configured():
+        print("LLM provider chưa được cấu hình (thiếu GEMINI_API_KEY?)", file=sys.stderr)
+        return 1
+    if not args.answer_cache:
+        # Câu hỏi không bao giờ đủ dài để cache
+        answer_cache.min_chars = sys.maxsize
+
+    db = SessionLocal()
+    try:
+        student = db.scalars(select(User).filter(User.username == args.student)).first()
+        if student is None:
+            print(f"Không tìm thấy người dùng {args.student}", file=sys.stderr)
+            return 1
+        questions = load_questions(db, args.questions, count)
+        thread_ids = create_threads(db, student, args.threads)
+    finally:
+        db.close()
+
+    pool = RouterWorkerPool(args.concurrency, args.queue_size, latency_samples=count)
+    pool.start()
+    try:
+        started = time.perf_counter()
+        send_s = replay(pool, thread_ids, questions, student, args.qps, count)
+        drained = wait_for_drain(pool, count, args.timeout)
+        total_s = time.perf_counter() - started
+    finally:
+        pool.stop()
+        if not args.keep:
+            db = SessionLocal()
+            try:
+                cleanup(db, thread_ids)
+            finally:
+                db.close()
+
+    result = report(pool.stats(), args.qps, count, send_s, total_s, drained)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0 if drained else 1
+
+    print(f"Provider: {get_provider().name}, {args.concurrency} worker, {args.threads} thread")
+    print(f"Đã gửi {count} tin nhắn: {result['offered_qps']} QPS (mục tiêu {args.qps}), "
+          f"hoàn thành {result['completed_qps']} QPS")
+    print(f"Xử lý xong {result['processed']} (lỗi LLM {result['llm_errors']}), lỗi {result['failed']}, "
+          f"bị từ chối (hàng đợi đầy) {result['rejected']}"
+          + ("" if drained else " - HẾT THỜI GIAN CHỜ"))
+    llm = result["llm"]
+    print(f"LLM: {llm['calls']} lần gọi, thử lại {llm['retries']}, quá hạn {llm['timeouts']}, "
+          f"breaker {llm['breaker']['state']} (mở {llm['breaker']['times_opened']} lần, "
+          f"bỏ qua {llm['breaker']['short_circuited']} lần gọi)")
+    print(f"{'':<22}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, latency in result["latency"].items():
+        print(f"{name:<22}" + "".join(
+            f"{latency[k]:>9.0f}" if latency[k] is not None else f"{'-':>9}"
+            for k in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")
+        ))
+    return 0 if drained else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
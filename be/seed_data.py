@@ -32,9 +32,15 @@ departments = [
 # Tạo phòng ban
 department_ids = {}  # Lưu trữ id của các phòng ban để sử dụng sau này
 
+# Kiểm tra các phòng ban đã tồn tại bằng một truy vấn
+existing_depts = {
+    dept.name: dept
+    for dept in db.query(Department).filter(Department.name.in_([d["name"] for d in departments]))
+}
+new_depts = []
+
 for dept_data in departments:
-    # Kiểm tra xem phòng ban đã tồn tại chưa
-    existing_dept = db.query(Department).filter(Department.name == dept_data["name"]).first()
+    existing_dept = existing_depts.get(dept_data["name"])
     
     if not existing_dept:
         department = Department(
@@ -42,15 +48,18 @@ for dept_data in departments:
             name=dept_data["name"],
             description=dept_data["description"]
         )
-        db.add(department)
-        db.commit()
-        db.refresh(department)
-        department_ids[dept_data["name"]] = department.id
+        new_depts.append(department)
         print(f"Đã tạo phòng ban: {dept_data['name']}")
     else:
         department_ids[dept_data["name"]] = existing_dept.id
         print(f"Phòng ban {dept_data['name']} đã tồn tại")
 
+# Ghi tất cả phòng ban mới trong một transaction
+db.add_all(new_depts)
+db.commit()
+for department in new_depts:
+    department_ids[department.name] = department.id
+
 # Tạo người dùng mẫu nếu chưa có
 users = [
     {
@@ -105,9 +114,16 @@ users = [
 
 # Tạo người dùng
 user_ids = {}
+
+# Kiểm tra các người dùng đã tồn tại bằng một truy vấn
+existing_users = {
+    user.username: user
+    for user in db.query(User).filter(User.username.in_([u["username"] for u in users]))
+}
+new_users = []
+
 for user_data in users:
-    # Kiểm tra xem người dùng đã tồn tại chưa
-    existing_user = db.query(User).filter(User.username == user_data["username"]).first()
+    existing_user = existing_users.get(user_data["username"])
     
     if not existing_user:
         user = User(
@@ -119,21 +135,22 @@ for user_data in users:
             role=user_data["role"],
             department=user_data.get("department")
         )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        user_ids[user_data["username"]] = user.id
+        new_users.append(user)
         print(f"Đã tạo người dùng: {user_data['username']}")
     else:
         # Cập nhật department cho người dùng đã tồn tại
         if user_data.get("department"):
             existing_user.department = user_data["department"]
-            db.commit()
-            db.refresh(existing_user)
             print(f"Đã cập nhật department cho người dùng: {user_data['username']}")
         
         user_ids[user_data["username"]] = existing_user.id
         print(f"Người dùng {user_data['username']} đã tồn tại")
 
+# Ghi người dùng mới và các cập nhật trong một transaction
+db.add_all(new_users)
+db.commit()
+for user in new_users:
+    user_ids[user.username] = user.id
+
 print("Hoàn tất tạo dữ liệu mẫu")
 db.close()
@@ -0,0 +1,137 @@
+"""Fixture dùng chung: database SQLite tạm, người dùng mẫu, thread mẫu và TestClient.
+
+    cd be && python -m pytest -q
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# settings đọc biến môi trường lúc import, nên phải gán trước khi import app
+_DB_DIR = tempfile.mkdtemp(prefix="qlsv-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+for _name in ("ASYNC_DATABASE_URL", "DATABASE_REPLICA_URL", "AUTH_SECRET_KEY"):
+    os.environ.pop(_name, None)
+os.environ["APP_ENV"] = "development"
+# Gemini chưa cấu hình: worker trả lời bằng câu mặc định, không gọi mạng
+os.environ["LLM_PROVIDER"] = "gemini"
+os.environ["GEMINI_API_KEY"] = ""
+
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database.db import Base, SessionLocal, analytics_engine, engine, get_async_engine
+from app.main import app
+from app.models import departments  # noqa: F401  (đăng ký bảng departments vào Base.metadata)
+from app.models.models import Thread, User
+from app.schemas import ThreadCreate, ThreadUpdate
+from app.services import auth_service, message_service, thread_service
+
+# username -> (role, department)
+TEST_USERS = {
+    "student1": ("student", None),
+    "student2": ("student", None),
+    "daotao": ("department", "Phòng Đào tạo"),
+    "manager": ("manager", None),
+    "leader": ("leadership", None),
+}
+
+
+@event.listens_for(engine, "connect")
+def _no_fsync(dbapi_connection, connection_record) -> None:
+    # Database tạm, không cần fsync sau mỗi commit (nhanh hơn nhiều khi test ghi song song)
+    dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database() -> Iterator[None]:
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def users(database) -> Dict[str, User]:
+    with SessionLocal() as db:
+        return {
+            username: auth_service.create_user(
+                db, username, f"{username}@example.edu.vn", username.title(), "password123", role, department
+            )
+            for username, (role, department) in TEST_USERS.items()
+        }
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(users) -> Iterator[TestClient]:
+    # Dùng context manager để mọi request chạy trên cùng một event loop (engine async giữ kết nối theo loop)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(users) -> Callable[[str], Dict[str, str]]:
+    def headers(username: str) -> Dict[str, str]:
+        token = auth_service.create_access_token({"sub": username})
+        return {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+@pytest.fixture
+def make_thread(users) -> Callable[..., Thread]:
+    """Tạo thread của sinh viên kèm các tin nhắn cho sẵn (xen kẽ student/assistant)."""
+    def make(
+        student: str = "student1",
+        messages: int = 0,
+        assigned_to: Optional[str] = None,
+        texts: Optional[List[str]] = None,
+        **fields: Any,
+    ) -> Thread:
+        with SessionLocal() as db:
+            data = ThreadCreate(title=fields.pop("title", "Hỏi về học phí"), topic=fields.pop("topic", "Khác"), **fields)
+            thread = thread_service.create_thread(db, data, users[student].id)
+            if assigned_to is not None:
+                thread_service.update_thread(db, thread.id, ThreadUpdate(assigned_to=assigned_to))
+            for i, text in enumerate(texts or [f"Tin nhắn số {i}" for i in range(messages)]):
+                sender = "student" if i % 2 == 0 else "assistant"
+                message_service.create_message(
+                    db, thread.id, {"text": text, "sender": sender},
+                    users[student].id if sender == "student" else None,
+                )
+            return thread
+    return make
+
+
+@pytest.fixture
+def count_queries() -> Callable[[], ContextManager[List[str]]]:
+    """`with count_queries() as statements:` ghi lại mọi câu lệnh SQL gửi tới database
+    (engine chính, analytics và async) trong khối with."""
+    @contextmanager
+    def counting() -> Iterator[List[str]]:
+        statements: List[str] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engines = {id(e): e for e in (engine, analytics_engine, get_async_engine().sync_engine)}.values()
+        for e in engines:
+            event.listen(e, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            for e in engines:
+                event.remove(e, "before_cursor_execute", record)
+    return counting
@@ -0,0 +1,78 @@
+"""Cache câu trả lời: câu hỏi gần giống dùng lại câu trả lời theo ngưỡng mặc định, câu hỏi khác
+nội dung/số/trạng thái thread thì không, và xóa theo câu hỏi xóa cả các cách hỏi gần giống."""
+import pytest
+
+from app.config.settings import ANSWER_CACHE_SIMILARITY
+from app.services.answer_cache import AnswerCache, normalize_question, shingles, signature, similarity
+
+TOPIC, DEPARTMENT, STATUS = "Học phí", "Phòng Tài chính", "pending"
+QUESTION = "Hạn nộp học phí học kỳ này là khi nào?"
+REPLY = "Hạn nộp học phí là ngày 15/9."
+
+
+@pytest.fixture
+def cache() -> AnswerCache:
+    cache = AnswerCache(maxsize=100, ttl=60)
+    cache.store(TOPIC, DEPARTMENT, STATUS, QUESTION, REPLY, latency_ms=800)
+    return cache
+
+
+def test_default_threshold_enables_near_matches():
+    assert 0 < ANSWER_CACHE_SIMILARITY < 1
+
+
+@pytest.mark.parametrize("question", [
+    "Cho em hỏi hạn nộp học phí học kỳ này là khi nào ạ",
+    "Khi nào là hạn nộp học phí học kỳ này?",
+    "Hạn nộp học phí học kì này là khi nào?",
+])
+def test_near_duplicate_questions_hit(cache, question):
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, question) == REPLY
+
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["latency_saved_ms"]) == (1, 800)
+    # Cách hỏi mới được lưu để lần sau khớp chính xác
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, question) == REPLY
+    assert cache.stats()["exact_hits"] == 1
+
+
+@pytest.mark.parametrize("question", [
+    "Hạn nộp học bổng học kỳ này là khi nào?",
+    "Hạn nộp hồ sơ học kỳ này là khi nào?",
+    "Hạn nộp học phí học kỳ 2 là khi nào?",
+])
+def test_different_questions_miss(cache, question):
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, question) is None
+
+
+def test_numbers_must_match():
+    cache = AnswerCache(maxsize=100, ttl=60)
+    cache.store(TOPIC, DEPARTMENT, STATUS, "Lịch thi học kỳ 1 khi nào có?", "Tuần 18.", latency_ms=500)
+
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, "Lịch thi học kỳ 2 khi nào có?") is None
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, "Cho em hỏi lịch thi học kỳ 1 khi nào có ạ") == "Tuần 18."
+
+
+def test_thread_status_is_part_of_the_key(cache):
+    # Trạng thái thread có trong system prompt: câu trả lời khi đang chờ không dùng cho thread đã xong
+    assert cache.lookup(TOPIC, DEPARTMENT, "resolved", QUESTION) is None
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, QUESTION) == REPLY
+
+
+def test_invalidate_question_removes_near_duplicates(cache):
+    cache.lookup(TOPIC, DEPARTMENT, STATUS, "Khi nào là hạn nộp học phí học kỳ này?")
+    cache.store(TOPIC, DEPARTMENT, "in_progress", QUESTION, REPLY, latency_ms=800)
+    cache.store(TOPIC, DEPARTMENT, STATUS, "Mật khẩu wifi của thư viện là gì?", "thuvien2024", latency_ms=600)
+
+    assert cache.invalidate(question="hạn nộp học phí học kỳ này là khi nào") == 3
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, QUESTION) is None
+    assert cache.lookup(TOPIC, DEPARTMENT, STATUS, "Mật khẩu wifi của thư viện là gì?") == "thuvien2024"
+
+
+def test_minhash_estimates_jaccard():
+    a, b = (shingles(normalize_question(q)) for q in (QUESTION, "Khi nào là hạn nộp học phí học kỳ này?"))
+    sig_a, sig_b = signature(a), signature(b)
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+    assert abs(estimate - similarity(a, b)) < 0.2
+    assert signature(a) == sig_a
@@ -0,0 +1,188 @@
+"""Các service async (AsyncSession) trả về cùng kết quả với bản đồng bộ; endpoint async hoạt động đầy đủ;
+và khi nhiều request cùng chờ database, đường async không bị giới hạn bởi threadpool như đường đồng bộ."""
+import asyncio
+import threading
+import time
+
+import anyio
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config.settings import ASYNC_DATABASE_URL, DATABASE_URL
+from app.database.db import SessionLocal
+from app.models.models import Thread
+from app.services import async_message_service, async_thread_service, message_service, thread_service
+
+
+def run_async(work):
+    """Chạy work(session) trên engine async riêng (không dùng chung pool với TestClient)."""
+    async def main():
+        engine = create_async_engine(ASYNC_DATABASE_URL)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                return await work(session)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+def test_async_reads_match_sync(users, make_thread):
+    thread = make_thread(student="student2", messages=5)
+    student_id = users["student2"].id
+
+    async def read(session):
+        return (
+            [t.id for t in await async_thread_service.list_threads_by_student(session, student_id)],
+            (await async_thread_service.get_thread(session, thread.id)).title,
+            [m.id for m in await async_message_service.list_messages(session, thread.id, limit=3)],
+            [m.id for m in await async_message_service.list_new_messages(session, thread.id, after_id=0)],
+        )
+
+    with SessionLocal() as db:
+        expected = (
+            [t.id for t in thread_service.list_threads_by_student(db, student_id)],
+            thread_service.get_thread(db, thread.id).title,
+            [m.id for m in message_service.list_messages(db, thread.id, limit=3)],
+            [m.id for m in message_service.list_new_messages(db, thread.id, after_id=0)],
+        )
+    assert run_async(read) == expected
+
+
+def test_async_create_message_updates_thread_summary(users, make_thread):
+    thread = make_thread(messages=1)
+
+    async def post(session):
+        return await async_message_service.create_message(
+            session, thread.id, {"text": "  Gửi   lại bảng điểm  ", "sender": "student"}, users["student1"].id
+        )
+
+    message = run_async(post)
+
+    with SessionLocal() as db:
+        saved = db.get(Thread, thread.id)
+        assert saved.message_count == 2
+        assert saved.last_sender == "student"
+        assert saved.last_message_preview == message_service.message_preview(message.text)
+
+
+def test_login_post_and_poll(client, make_thread):
+    thread = make_thread(messages=2)
+    login = client.post("/auth/login", data={"username": "student1", "password": "password123"})
+    assert login.status_code == 200, login.text
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.post("/auth/login", data={"username": "student1", "password": "wrong"}).status_code == 401
+
+    last_id = client.get(f"/threads/{thread.id}/messages", headers=headers).json()["messages"][-1]["id"]
+    posted = client.post(f"/threads/{thread.id}/messages", json={"text": "Em cảm ơn"}, headers=headers)
+    assert posted.status_code == 200, posted.text
+    assert posted.json()["sender"] == "student"
+
+    new = client.get(f"/threads/{thread.id}/messages", params={"after_id": last_id}, headers=headers)
+    assert new.status_code == 200
+    assert new.json()["messages"][0]["id"] == posted.json()["id"]
+
+
+# Một đợt request đồng thời (ngày công bố điểm); mỗi câu lệnh SQL chờ I/O ROUND_TRIP_SECONDS
+BURST = 160
+ROUND_TRIP_SECONDS = 0.2
+
+
+class SlowIO:
+    """Giả lập độ trễ mạng của database: câu lệnh đầu tiên chạy trên mỗi connection sau
+    before_cursor_execute phải chờ ROUND_TRIP_SECONDS, ngay trong thread đang chạy SQLite
+    (thread worker với đường đồng bộ, thread riêng của aiosqlite với đường async)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.peak = 0
+
+    def _wait(self) -> None:
+        with self._lock:
+            self.waiting += 1
+            self.peak = max(self.peak, self.waiting)
+        time.sleep(ROUND_TRIP_SECONDS)
+        with self._lock:
+            self.waiting -= 1
+
+    def install(self, engine: Engine, is_async: bool = False) -> None:
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            state = connection_record.info["slow_io"] = {"pending": False}
+
+            def progress():
+                if state["pending"]:
+                    state["pending"] = False
+                    self._wait()
+                return 0
+
+            if is_async:
+                dbapi_connection.run_async(lambda conn: conn.set_progress_handler(progress, 10))
+            else:
+                dbapi_connection.set_progress_handler(progress, 10)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info["slow_io"]["pending"] = True
+
+
+def test_async_burst_is_not_capped_by_threadpool(users, make_thread):
+    make_thread(student="student2")
+    student_id = users["student2"].id
+
+    # Pool đủ lớn cho cả đợt ở cả hai đường: giới hạn còn lại chỉ là threadpool của đường đồng bộ
+    sync_io = SlowIO()
+    sync_engine = create_engine(DATABASE_URL, poolclass=QueuePool, pool_size=BURST, max_overflow=0)
+    sync_io.install(sync_engine)
+    sync_sessions = sessionmaker(sync_engine)
+
+    def sync_request():
+        with sync_sessions() as db:
+            return thread_service.list_threads_by_student(db, student_id)
+
+    thread_limits = []
+
+    async def sync_burst():
+        # Như endpoint def của FastAPI: mỗi request giữ một slot threadpool (mặc định 40) suốt lượt gọi database
+        thread_limits.append(anyio.to_thread.current_default_thread_limiter().total_tokens)
+        async with anyio.create_task_group() as group:
+            for _ in range(BURST):
+                group.start_soon(anyio.to_thread.run_sync, sync_request)
+
+    async def async_burst():
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=BURST, max_overflow=0)
+        async_io.install(async_engine.sync_engine, is_async=True)
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async def request():
+            async with sessions() as db:
+                return await async_thread_service.list_threads_by_student(db, student_id)
+
+        try:
+            # Lượt đầu mở đủ connection; chỉ đo lượt sau
+            await asyncio.gather(*[request() for _ in range(BURST)])
+            async_io.peak = 0
+            started = time.perf_counter()
+            results = await asyncio.gather(*[request() for _ in range(BURST)])
+            return time.perf_counter() - started, results
+        finally:
+            await async_engine.dispose()
+
+    try:
+        anyio.run(sync_burst)
+        sync_io.peak = 0
+        started = time.perf_counter()
+        anyio.run(sync_burst)
+        sync_seconds = time.perf_counter() - started
+    finally:
+        sync_engine.dispose()
+    async_io = SlowIO()
+    async_seconds, results = anyio.run(async_burst)
+
+    assert results[0] and all([t.id for t in result] == [t.id for t in results[0]] for result in results)
+    # Đường đồng bộ chỉ chờ database song song tối đa bằng số thread; đường async chờ được cả đợt
+    assert sync_io.peak <= thread_limits[-1] < async_io.peak, (sync_io.peak, async_io.peak)
+    assert async_seconds < 0.8 * sync_seconds, (async_seconds, sync_seconds)
@@ -0,0 +1,192 @@
+"""Ngữ cảnh gửi LLM nằm trong ngân sách token; tóm tắt được lưu cùng tin nhắn trả lời,
+worker không giữ connection nào trong lúc chờ LLM, và kích thước/thời gian dựng prompt
+không tăng theo độ dài thread."""
+import time
+from typing import List
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.database.db import SessionLocal, engine
+from app.models.models import Message, Thread
+from app.services import context_builder, gemini_service, router_worker
+from app.services.context_builder import build_context, estimate_tokens, extend_summary
+from app.services.router_worker import FALLBACK_ACK, ReplyJob, RouterWorkerPool
+
+# Mỗi tin nhắn dài ~100 token, ngân sách chỉ đủ cho vài lượt gần nhất
+LONG_TEXT = "Em muốn hỏi về lịch đóng học phí và thủ tục xin miễn giảm cho học kỳ này. " * 5
+SUMMARY_TOKENS = 200
+BUDGET = SUMMARY_TOKENS + 500
+# Thread tham chiếu (vừa vượt ngân sách) và các độ dài thread đem so với nó
+REFERENCE_LENGTH = 20
+THREAD_LENGTHS = (100, 1_000, 10_000)
+
+
+def history(count: int, start_id: int = 1, sender: str = None) -> List[Message]:
+    return [
+        Message(id=start_id + i, sender=sender or ("student" if i % 2 == 0 else "assistant"), text=f"{i}: {LONG_TEXT}")
+        for i in range(count)
+    ]
+
+
+def test_short_history_is_kept_verbatim():
+    messages = history(3)
+
+    context = build_context("- student: câu cũ", 0, messages, fixed_tokens=50, budget=BUDGET, summary_tokens=SUMMARY_TOKENS)
+
+    assert context.recent == messages
+    assert not context.changed
+    assert (context.summary, context.summary_upto) == ("- student: câu cũ", 0)
+
+
+def test_long_history_is_folded_into_summary():
+    messages = history(20)
+
+    context = build_context(None, None, messages, fixed_tokens=50, budget=BUDGET, summary_tokens=SUMMARY_TOKENS)
+
+    # Giữ nguyên văn phần đuôi mới nhất, phần cũ hơn gộp vào tóm tắt
+    assert 0 < len(context.recent) < len(messages)
+    assert context.recent == messages[-len(context.recent):]
+    assert context.changed
+    assert context.summary_upto == messages[-len(context.recent) - 1].id
+    assert estimate_tokens(context.summary) <= SUMMARY_TOKENS
+    assert context.tokens <= BUDGET
+
+
+def test_messages_already_summarized_and_system_messages_are_skipped():
+    messages = history(4) + history(1, start_id=5, sender="system")
+
+    context = build_context("- student: câu cũ", 2, messages, budget=BUDGET, summary_tokens=SUMMARY_TOKENS)
+
+    assert [m.id for m in context.recent] == [3, 4, 5]
+    assert not context.changed
+
+    summary = extend_summary(None, messages[-2:])
+    assert summary.splitlines() == [context_builder.summary_line(messages[3])]
+
+
+def test_summary_drops_oldest_lines_when_over_limit():
+    summary = None
+    for message in history(30):
+        summary = extend_summary(summary, [message], max_tokens=SUMMARY_TOKENS)
+
+    lines = summary.splitlines()
+    assert estimate_tokens(summary) <= SUMMARY_TOKENS
+    assert lines[-1].startswith("- assistant: 29:")
+    assert not any(line.startswith("- student: 0:") for line in lines)
+
+
+@pytest.fixture
+def small_context(monkeypatch):
+    """Provider giả: ghi lại ngữ cảnh nhận được và số connection đang mượn khỏi pool lúc gọi LLM."""
+    calls = []
+
+    def fake_build_context(thread, history, new_message):
+        return context_builder.build_context(
+            thread.context_summary, thread.context_summary_upto, history,
+            estimate_tokens(new_message), BUDGET, SUMMARY_TOKENS,
+        )
+
+    def fake_stream_reply(thread, messages, new_message, summary=None):
+        prompt = gemini_service.format_messages_for_gemini(thread, messages, new_message, summary)
+        calls.append({
+            "at": time.perf_counter(),
+            "checked_out": engine.pool.checkedout(),
+            "recent": [m.id for m in messages],
+            "summary": summary,
+            "prompt_tokens": sum(estimate_tokens(part["text"]) for item in prompt for part in item["parts"]),
+        })
+        yield "Phòng Đào tạo "
+        yield "sẽ phản hồi em."
+
+    monkeypatch.setattr(gemini_service, "is_configured", lambda: True)
+    monkeypatch.setattr(gemini_service, "build_context", fake_build_context)
+    monkeypatch.setattr(gemini_service, "stream_reply", fake_stream_reply)
+    return calls
+
+
+def ask(thread_id: str, text: str = "Khi nào hết hạn nộp hồ sơ ạ?") -> bool:
+    return RouterWorkerPool(concurrency=1)._process(ReplyJob(thread_id, "student", text, None, time.perf_counter()))
+
+
+def stored(thread_id: str):
+    """Tóm tắt đã lưu của thread và tin nhắn cuối cùng."""
+    with SessionLocal() as db:
+        thread = db.execute(
+            select(Thread.context_summary, Thread.context_summary_upto, Thread.updated_at).filter(Thread.id == thread_id)
+        ).one()
+        last = db.scalars(
+            select(Message).filter(Message.thread_id == thread_id).order_by(Message.id.desc()).limit(1)
+        ).first()
+        return thread, last
+
+
+def test_worker_saves_summary_with_reply_and_releases_connection(small_context, make_thread):
+    thread = make_thread(texts=[f"{i}: {LONG_TEXT}" for i in range(20)])
+    before, _ = stored(thread.id)
+
+    assert ask(thread.id)
+
+    # Không mượn connection nào trong suốt lúc stream phản hồi
+    assert small_context[0]["checked_out"] == 0
+    after, reply = stored(thread.id)
+    assert reply.text == "Phòng Đào tạo sẽ phản hồi em."
+    assert after.context_summary == small_context[0]["summary"]
+    assert after.context_summary_upto < min(small_context[0]["recent"])
+    # Lưu tóm tắt không tính là thread được cập nhật
+    assert after.updated_at == before.updated_at
+
+    # Lần sau chỉ đọc các tin nhắn chưa nằm trong tóm tắt
+    assert ask(thread.id)
+    assert min(small_context[1]["recent"]) > after.context_summary_upto
+
+
+def test_summary_is_rolled_back_when_reply_fails(small_context, make_thread, monkeypatch):
+    thread = make_thread(texts=[f"{i}: {LONG_TEXT}" for i in range(20)])
+    save_reply = RouterWorkerPool._save_reply
+
+    def fail_reply(self, session, job, text):
+        if text != FALLBACK_ACK:
+            raise RuntimeError("insert failed")
+        save_reply(self, session, job, text)
+
+    monkeypatch.setattr(router_worker.RouterWorkerPool, "_save_reply", fail_reply)
+
+    assert not ask(thread.id)
+
+    after, reply = stored(thread.id)
+    assert reply.text == FALLBACK_ACK
+    assert (after.context_summary, after.context_summary_upto) == (None, None)
+
+
+def steady_prompt(small_context, make_thread, length: int, rounds: int = 5):
+    """Số token của prompt và thời gian dựng prompt ngắn nhất (từ lúc worker nhận việc tới lúc gọi LLM)
+    của một thread dài length tin nhắn, sau khi phần cũ đã được gộp vào tóm tắt."""
+    thread = make_thread()
+    with SessionLocal() as db:
+        db.execute(insert(Message), [
+            {"thread_id": thread.id, "sender": "student" if i % 2 == 0 else "assistant", "text": f"{i}: {LONG_TEXT}"}
+            for i in range(length)
+        ])
+        db.commit()
+    # Lần đầu đọc toàn bộ lịch sử và lưu tóm tắt; các lần sau chỉ đọc phần chưa tóm tắt
+    assert ask(thread.id)
+
+    build_ms = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        assert ask(thread.id)
+        build_ms = min(build_ms, (small_context[-1]["at"] - started) * 1000)
+    return small_context[-1]["prompt_tokens"], build_ms
+
+
+@pytest.mark.parametrize("length", THREAD_LENGTHS)
+def test_prompt_size_and_build_time_do_not_grow_with_thread_length(small_context, make_thread, length):
+    reference_tokens, reference_ms = steady_prompt(small_context, make_thread, REFERENCE_LENGTH)
+
+    tokens, build_ms = steady_prompt(small_context, make_thread, length)
+
+    # Tóm tắt có trần, phần nguyên văn nằm trong ngân sách: prompt cỡ như thread ngắn
+    assert abs(tokens - reference_tokens) <= 0.1 * reference_tokens, (tokens, reference_tokens)
+    # Chỉ đọc các tin nhắn sau context_summary_upto, không đọc lại toàn bộ lịch sử
+    assert build_ms < 2 * reference_ms + 1, (build_ms, reference_ms)
@@ -0,0 +1,104 @@
+"""Endpoint async không được chặn event loop: đo độ trễ loop khi nhiều request chạy đồng thời
+trong lúc database đồng bộ bị làm chậm (I/O đồng bộ trong async def sẽ lộ ra thành độ trễ)."""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config.settings import ASYNC_DATABASE_URL
+from app.database.db import analytics_engine, engine, get_async_db
+from app.main import app
+from app.utils.loop_monitor import LoopLagMonitor
+
+# Độ chậm giả lập của mỗi câu lệnh SQL đồng bộ, và độ trễ tối đa cho phép của event loop:
+# đủ cao cho phần CPU của vài chục request chạy xen kẽ, thấp hơn hẳn một câu lệnh chậm
+SLOW_SYNC_QUERY_SECONDS = 0.5
+MAX_LOOP_LAG_MS = 250
+
+
+@contextmanager
+def slow_sync_database() -> Iterator[None]:
+    def delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(SLOW_SYNC_QUERY_SECONDS)
+
+    engines = {id(e): e for e in (engine, analytics_engine)}.values()
+    for e in engines:
+        event.listen(e, "before_cursor_execute", delay)
+    try:
+        yield
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", delay)
+
+
+async def measure_lag(work) -> dict:
+    monitor = LoopLagMonitor(interval=0.01, warn_ms=MAX_LOOP_LAG_MS)
+    monitor.start()
+    try:
+        await work()
+        # Thêm vài mẫu sau khi xong việc
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+    return monitor.snapshot()
+
+
+def test_monitor_detects_blocking_call():
+    async def block():
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+
+    snapshot = asyncio.run(measure_lag(block))
+
+    assert snapshot["max_ms"] >= 250
+    assert snapshot["slow"] >= 1
+
+
+def test_concurrent_requests_do_not_block_the_loop(users, make_thread, auth_headers):
+    thread = make_thread(messages=5)
+
+    async def requests():
+        # Engine async riêng trên loop của test (pool async gắn với event loop đang chạy)
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+        async def get_test_async_db():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = get_test_async_db
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                calls = []
+                for username in ("student1", "manager", "leader"):
+                    headers = auth_headers(username)
+                    calls += [
+                        client.post("/auth/login", data={"username": username, "password": "password123"}),
+                        client.get("/auth/me", headers=headers),
+                        client.get("/threads", headers=headers),
+                        # Endpoint đồng bộ: chạy trong threadpool, chậm nhưng không chặn loop
+                        client.get(f"/threads/{thread.id}", headers=headers),
+                    ]
+                calls.append(client.get(f"/threads/{thread.id}/messages", headers=auth_headers("student1")))
+                calls.append(client.get("/leadership/analytics", headers=auth_headers("leader")))
+                responses = await asyncio.gather(*calls)
+            assert all(r.status_code == 200 for r in responses), [r.text for r in responses if r.status_code != 200]
+        finally:
+            app.dependency_overrides.pop(get_async_db, None)
+            await async_engine.dispose()
+
+    # Chạy một lượt trước để import/khởi tạo lười không bị tính vào độ trễ
+    asyncio.run(requests())
+    with slow_sync_database():
+        started = time.perf_counter()
+        snapshot = asyncio.run(measure_lag(requests))
+        elapsed = time.perf_counter() - started
+
+    # Có request đồng bộ thực sự chạy chậm, và các request chạy song song chứ không nối tiếp
+    assert elapsed >= SLOW_SYNC_QUERY_SECONDS
+    assert snapshot["max_ms"] < MAX_LOOP_LAG_MS, snapshot
@@ -0,0 +1,80 @@
+"""Xuất NDJSON/CSV: lọc đúng, và bộ nhớ Python không tăng theo số dòng xuất."""
+import csv
+import io
+import json
+import tracemalloc
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.db import SessionLocal
+from app.models.models import Message
+from app.services import export_service
+
+# Số tin nhắn tổng hợp cho phép đo bộ nhớ, cỡ batch, và trần bộ nhớ Python khi xuất hết
+# (trần phụ thuộc cỡ batch, không phụ thuộc số dòng)
+SYNTHETIC_MESSAGES = 20_000
+BATCH_SIZE = 200
+MEMORY_CEILING_BYTES = 2 * 1024 * 1024
+
+
+@pytest.fixture
+def department() -> str:
+    return f"Khoa xuất {uuid.uuid4().hex[:8]}"
+
+
+def test_export_endpoint_filters_and_formats(client, auth_headers, make_thread, department):
+    make_thread(messages=3, assigned_to=department)
+    make_thread(messages=2, assigned_to=department)
+    make_thread(messages=4)  # phòng ban khác, không được xuất
+    headers = auth_headers("leader")
+    params = {"kind": "messages", "department": department}
+
+    ndjson = client.get("/leadership/export", params={**params, "format": "ndjson"}, headers=headers)
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) == 5
+    assert {row["thread_assigned_to"] for row in rows} == {department}
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+    exported = client.get("/leadership/export", params={**params, "format": "csv"}, headers=headers)
+    table = list(csv.reader(io.StringIO(exported.text)))
+    assert table[0][:2] == ["id", "thread_id"]
+    assert [int(r[0]) for r in table[1:]] == [row["id"] for row in rows]
+
+    threads = client.get("/leadership/export", params={"kind": "threads", "department": department, "status": "pending"},
+                         headers=headers)
+    assert len(threads.text.splitlines()) == 2
+
+    assert client.get("/leadership/export", params=params, headers=auth_headers("manager")).status_code == 403
+
+
+def test_export_memory_is_constant(users, make_thread, department):
+    thread = make_thread(assigned_to=department)
+    with SessionLocal() as db:
+        db.execute(insert(Message), [
+            {"thread_id": thread.id, "user_id": users["student1"].id, "sender": "student",
+             "text": f"Tin nhắn tổng hợp số {i}: " + "em muốn hỏi về học phí và lịch thi cuối kỳ. " * 3,
+             "search_text": f"tin nhan {i}"}
+            for i in range(SYNTHETIC_MESSAGES)
+        ])
+        db.commit()
+
+    tracemalloc.start()
+    try:
+        rows = size = 0
+        for chunk in export_service.stream_export(
+            SessionLocal, "messages", "ndjson", department=department, batch_size=BATCH_SIZE
+        ):
+            rows += chunk.count("\n")
+            size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert rows == SYNTHETIC_MESSAGES
+    # Dữ liệu xuất lớn hơn nhiều so với trần: không thể giữ toàn bộ trong bộ nhớ
+    assert size > 2 * MEMORY_CEILING_BYTES
+    assert peak < MEMORY_CEILING_BYTES, f"peak {peak / 1024 / 1024:.1f} MiB"
@@ -0,0 +1,71 @@
+"""Nhập hàng loạt: dòng hỏng trong chunk bị tách riêng, bộ đếm/tóm tắt thread cập nhật một lần
+cho cả chunk, và chunk_size được giới hạn như tham số phân trang."""
+import json
+import uuid
+from typing import List
+
+import pytest
+from sqlalchemy import select
+
+from app.database.db import SessionLocal
+from app.models.models import Message, Thread
+from app.services import import_service, thread_service
+
+
+def upload(client, headers, kind: str, records: List[dict], **params):
+    body = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    return client.post(
+        "/leadership/import", params={"kind": kind, **params}, headers=headers,
+        files={"file": ("data.ndjson", body.encode(), "application/x-ndjson")},
+    )
+
+
+def test_bad_message_row_is_rejected_and_summary_refreshed_once(client, auth_headers, make_thread, monkeypatch):
+    refreshed = []
+    refresh = import_service.refresh_thread_summaries
+    monkeypatch.setattr(import_service, "refresh_thread_summaries",
+                        lambda db, thread_ids: refreshed.append(thread_ids) or refresh(db, thread_ids))
+    thread = make_thread(messages=1)
+    with SessionLocal() as db:
+        existing_id = db.scalars(select(Message.id).filter(Message.thread_id == thread.id)).one()
+    records = [
+        {"thread_id": thread.id, "sender": "student", "text": "Em hỏi lại về học phí"},
+        {"thread_id": thread.id, "sender": "assistant", "text": "Đã nhận"},
+        {"id": existing_id, "thread_id": thread.id, "sender": "student", "text": "Trùng id"},
+        {"thread_id": thread.id, "sender": "student", "text": "Tin nhắn cuối cùng"},
+    ]
+
+    response = upload(client, auth_headers("manager"), "messages", records)
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["inserted"], report["rejected"]) == (3, 1)
+    assert report["rejected_rows"][0]["line"] == 3
+    # Chunk lỗi ghi lại từng dòng, nhưng tóm tắt thread chỉ tính lại một lần
+    assert refreshed == [[thread.id]]
+    with SessionLocal() as db:
+        saved = db.get(Thread, thread.id)
+        assert saved.message_count == 4
+        assert saved.last_message_preview == "Tin nhắn cuối cùng"
+
+
+def test_bad_thread_row_keeps_statistics_exact(client, auth_headers, make_thread):
+    department = f"Khoa nhập {uuid.uuid4().hex[:8]}"
+    existing = make_thread(assigned_to=department)
+    records = [{"title": f"Thread cũ {i}", "assigned_to": department, "status": "resolved"} for i in range(3)]
+    records.insert(1, {"id": existing.id, "title": "Trùng id", "assigned_to": department})
+
+    response = upload(client, auth_headers("leader"), "threads", records)
+
+    assert response.status_code == 200, response.text
+    assert (response.json()["inserted"], response.json()["rejected"]) == (3, 1)
+    with SessionLocal() as db:
+        stats = thread_service.get_thread_statistics(db)
+        assert stats == thread_service._summarize_counts(thread_service.count_thread_statistics(db))
+    assert stats["by_department"][department] == 4
+
+
+@pytest.mark.parametrize("chunk_size", [0, import_service.MAX_CHUNK_SIZE + 1])
+def test_chunk_size_is_bounded(client, auth_headers, chunk_size):
+    response = upload(client, auth_headers("manager"), "threads", [{"title": "Một dòng"}], chunk_size=chunk_size)
+    assert response.status_code == 422
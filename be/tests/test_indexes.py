@@ -0,0 +1,78 @@
+"""Các truy vấn danh sách phải dùng đúng index (EXPLAIN QUERY PLAN của SQLite trên câu lệnh
+mà hàm service thực sự gửi tới database)."""
+import re
+from datetime import datetime
+from typing import Any, Callable, List, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from app.database.db import SessionLocal, engine
+from app.services import message_service, thread_service
+from app.services.pagination import encode_cursor
+
+CURSOR = encode_cursor(datetime(2026, 1, 1), "00000000-0000-0000-0000-000000000000")
+UNFILTERED = {"all threads (manager/leadership)"}
+
+
+def executed(call: Callable[[Any], Any]) -> List[Tuple[str, Any]]:
+    """Các câu lệnh (kèm tham số) mà call(db) gửi tới database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def query_plan(call: Callable[[Any], Any]) -> List[str]:
+    statements = executed(call)
+    assert len(statements) == 1, statements
+    statement, parameters = statements[0]
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+@pytest.mark.parametrize("name, call, table, index", [
+    ("all threads (manager/leadership)", lambda db: thread_service.list_threads(db), "threads",
+     "ix_threads_created_at"),
+    ("all threads, next page", lambda db: thread_service.list_threads(db, cursor=CURSOR), "threads",
+     "ix_threads_created_at"),
+    ("threads by status", lambda db: thread_service.list_threads(db, status="pending"), "threads",
+     "ix_threads_status_created_at"),
+    ("threads by student", lambda db: thread_service.list_threads_by_student(db, 1), "threads",
+     "ix_threads_student_id_created_at"),
+    ("threads by student, next page", lambda db: thread_service.list_threads_by_student(db, 1, cursor=CURSOR),
+     "threads", "ix_threads_student_id_created_at"),
+    ("threads by department", lambda db: thread_service.list_threads_by_department(db, "CNTT"), "threads",
+     "ix_threads_assigned_to_created_at"),
+    ("threads by department and status",
+     lambda db: thread_service.list_threads_by_department(db, "CNTT", status="pending"), "threads",
+     "ix_threads_assigned_to_status_created_at"),
+    ("department inbox by activity",
+     lambda db: thread_service.list_threads_by_department(db, "CNTT", sort="last_message_at"), "threads",
+     "ix_threads_assigned_to_last_message_at"),
+    ("messages of a thread", lambda db: message_service.list_messages(db, "t", 100), "messages",
+     "ix_messages_thread_id_created_at_id"),
+    ("messages of a thread, next page", lambda db: message_service.list_messages(db, "t", 100, CURSOR),
+     "messages", "ix_messages_thread_id_created_at_id"),
+    ("new messages since", lambda db: message_service.list_new_messages(db, "t", after_id=5), "messages",
+     "ix_messages_thread_id_id"),
+])
+def test_listing_query_uses_index(name, call, table, index):
+    plan = query_plan(call)
+    steps = [step for step in plan if step.split(" ")[1:2] == [table]]
+    assert len(steps) == 1, f"{name}: {plan}"
+    assert re.search(rf"USING (COVERING )?INDEX {index}\b", steps[0]), f"{name}: {plan}"
+    # Có điều kiện lọc (hoặc cursor) thì phải là SEARCH theo index; chỉ trang đầu không lọc
+    # mới được SCAN, và khi đó đọc index theo thứ tự rồi dừng ở LIMIT
+    if name not in UNFILTERED:
+        assert steps[0].startswith("SEARCH"), f"{name}: {plan}"
+    # Thứ tự lấy từ index: không sắp xếp lại toàn bộ kết quả (chỉ phần id khi trùng created_at)
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{name}: {plan}"
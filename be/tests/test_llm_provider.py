@@ -0,0 +1,57 @@
+"""FakeProvider chạy offline: tất định theo (seed, prompt), giả lập lỗi và timeout như provider thật,
+và worker trả lời bằng nội dung của provider khi được thay qua use_provider."""
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.database.db import SessionLocal
+from app.models.models import Message
+from app.services import gemini_service, llm_provider
+from app.services.llm_provider import FakeProvider, LLMError, LLMTimeout, ResilientProvider, use_provider
+from app.services.router_worker import STUDENT_ACK, ReplyJob, RouterWorkerPool
+
+CONTENTS = [{"role": "user", "parts": [{"text": "Khi nào có lịch thi ạ?"}]}]
+
+
+def fake(**options) -> FakeProvider:
+    return FakeProvider(**{"latency_ms": 5, "latency_sigma": 0, "error_rate": 0, "output_words": 20, "seed": 7, **options})
+
+
+def test_same_seed_and_prompt_give_same_reply():
+    reply = fake().generate(CONTENTS)
+
+    assert reply.strip()
+    assert fake().generate(CONTENTS) == reply
+    assert fake(seed=8).generate(CONTENTS) != reply
+    assert fake().generate([{"role": "user", "parts": [{"text": "Học phí bao nhiêu ạ?"}]}]) != reply
+
+
+def test_simulated_errors_and_timeouts():
+    with pytest.raises(LLMError):
+        fake(error_rate=1).generate(CONTENTS)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        fake(latency_ms=5000).generate(CONTENTS, timeout=0.1)
+    assert time.monotonic() - started < 1.0
+
+
+def test_worker_replies_through_swapped_provider(make_thread, monkeypatch):
+    provider = fake()
+    monkeypatch.setattr(llm_provider, "_provider", None)
+    assert isinstance(use_provider(provider), ResilientProvider)
+    assert gemini_service.is_configured()
+    thread = make_thread(messages=2)
+
+    assert RouterWorkerPool(concurrency=1)._process(
+        ReplyJob(thread.id, "student", "Khi nào có lịch thi ạ?", None, time.perf_counter())
+    )
+
+    with SessionLocal() as db:
+        reply = db.scalars(
+            select(Message).filter(Message.thread_id == thread.id).order_by(Message.id.desc()).limit(1)
+        ).first()
+    assert reply.sender == "assistant"
+    assert reply.text not in (STUDENT_ACK, "")
+    assert llm_provider.get_provider().stats()["errors"] == 0
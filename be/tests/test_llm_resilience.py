@@ -0,0 +1,162 @@
+"""ResilientProvider: thử lại lỗi tạm thời trước đoạn đầu tiên, thời hạn cho từng lần gọi,
+circuit breaker mở khi lỗi liên tiếp và worker trả lời mặc định ngay khi breaker mở."""
+import time
+from typing import List
+
+import pytest
+from sqlalchemy import select
+
+from app.database.db import SessionLocal
+from app.models.models import Message
+from app.services import llm_provider
+from app.services.llm_provider import CircuitOpenError, LLMError, LLMProvider, LLMTimeout, ResilientProvider
+from app.services.router_worker import STUDENT_ACK, ReplyJob, RouterWorkerPool
+from app.utils.circuit_breaker import CircuitBreaker
+
+CONTENTS = [{"role": "user", "parts": [{"text": "Khi nào có lịch thi ạ?"}]}]
+
+
+class ScriptedProvider(LLMProvider):
+    """Mỗi lần gọi chạy một kịch bản: chuỗi là đoạn phản hồi, số là thời gian chờ (giây),
+    exception thì ném ra; hết kịch bản thì lặp lại kịch bản cuối."""
+    name = "scripted"
+
+    def __init__(self, *attempts: List) -> None:
+        self.attempts = attempts
+        self.calls = 0
+
+    def is_configured(self) -> bool:
+        return True
+
+    def stream(self, contents, timeout=None):
+        steps = self.attempts[min(self.calls, len(self.attempts) - 1)]
+        self.calls += 1
+        for step in steps:
+            if isinstance(step, BaseException):
+                raise step
+            if isinstance(step, float):
+                time.sleep(step)
+                continue
+            yield step
+
+
+def test_provider_must_implement_stream():
+    class Incomplete(LLMProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def resilient(provider: LLMProvider, timeout: float = 2.0, max_retries: int = 2,
+              failure_threshold: int = 3, reset_timeout: float = 60.0) -> ResilientProvider:
+    return ResilientProvider(
+        provider, timeout=timeout, max_retries=max_retries, backoff_ms=1, backoff_max_ms=1,
+        breaker=CircuitBreaker("test", failure_threshold, reset_timeout),
+    )
+
+
+def test_retries_transient_error_before_first_chunk():
+    provider = ScriptedProvider([LLMError("ServiceUnavailable")], ["Lịch thi ", "có trên cổng thông tin."])
+    llm = resilient(provider)
+
+    assert llm.generate(CONTENTS) == "Lịch thi có trên cổng thông tin."
+    assert provider.calls == 2
+    stats = llm.stats()
+    assert (stats["retries"], stats["errors"]) == (1, 1)
+    assert stats["breaker"]["state"] == "closed"
+    assert stats["breaker"]["consecutive_failures"] == 0
+
+
+@pytest.mark.parametrize("error", [LLMError("PermissionDenied", retryable=False), ValueError("bad request")])
+def test_permanent_errors_are_not_retried(error):
+    provider = ScriptedProvider([error])
+    llm = resilient(provider)
+
+    with pytest.raises(LLMError) as raised:
+        llm.generate(CONTENTS)
+
+    assert not raised.value.retryable
+    assert provider.calls == 1
+
+
+def test_no_retry_after_a_chunk_was_streamed():
+    provider = ScriptedProvider(["Lịch thi ", LLMError("ServiceUnavailable")], ["không được gửi lại"])
+    received = []
+
+    with pytest.raises(LLMError):
+        for chunk in resilient(provider).stream(CONTENTS):
+            received.append(chunk)
+
+    assert received == ["Lịch thi "]
+    assert provider.calls == 1
+
+
+def test_times_out_when_provider_hangs_before_first_chunk():
+    provider = ScriptedProvider([5.0, "quá muộn"])
+    llm = resilient(provider, timeout=0.2, max_retries=0)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        llm.generate(CONTENTS)
+
+    assert time.monotonic() - started < 1.0
+    assert llm.stats()["timeouts"] == 1
+
+
+def test_breaker_opens_after_consecutive_failures():
+    provider = ScriptedProvider([LLMError("InternalServerError")])
+    llm = resilient(provider, max_retries=0, failure_threshold=3)
+
+    for _ in range(3):
+        with pytest.raises(LLMError) as raised:
+            llm.generate(CONTENTS)
+        assert not isinstance(raised.value, CircuitOpenError)
+
+    # Breaker mở: không gọi provider nữa
+    with pytest.raises(CircuitOpenError):
+        llm.generate(CONTENTS)
+    assert provider.calls == 3
+    breaker = llm.stats()["breaker"]
+    assert (breaker["state"], breaker["short_circuited"]) == ("open", 1)
+
+
+def test_half_open_probe_is_released_when_caller_stops_reading():
+    provider = ScriptedProvider([LLMError("InternalServerError")], ["Lịch thi ", "tuần sau."])
+    # reset_timeout=0: breaker chuyển half_open ngay ở lần gọi kế tiếp
+    llm = resilient(provider, max_retries=0, failure_threshold=1, reset_timeout=0)
+    with pytest.raises(LLMError):
+        llm.generate(CONTENTS)
+
+    probe = llm.stream(CONTENTS)
+    assert next(probe) == "Lịch thi "
+    # Đang có một lần gọi thử: lần gọi khác bị từ chối ngay
+    with pytest.raises(CircuitOpenError):
+        llm.generate(CONTENTS)
+    probe.close()
+
+    # Dừng giữa chừng không tính là thành công, nhưng lần gọi thử kế tiếp vẫn được phép
+    breaker = llm.breaker.snapshot()
+    assert (breaker["state"], breaker["successes"]) == ("half_open", 0)
+    assert llm.generate(CONTENTS) == "Lịch thi tuần sau."
+    assert llm.breaker.snapshot()["state"] == "closed"
+
+
+def test_worker_replies_with_ack_when_circuit_is_open(make_thread, monkeypatch):
+    provider = ScriptedProvider(["không được gọi"])
+    llm = resilient(provider, failure_threshold=1)
+    llm.breaker.record_failure()
+    monkeypatch.setattr(llm_provider, "_provider", llm)
+    thread = make_thread(messages=2)
+    worker = RouterWorkerPool(concurrency=1)
+
+    assert worker._process(ReplyJob(thread.id, "student", "Khi nào có lịch thi ạ?", None, time.perf_counter()))
+
+    with SessionLocal() as db:
+        reply = db.scalars(
+            select(Message).filter(Message.thread_id == thread.id).order_by(Message.id.desc()).limit(1)
+        ).first()
+    assert reply.text == STUDENT_ACK
+    assert provider.calls == 0
+    # Breaker mở không tính là lỗi gọi LLM
+    assert worker.stats()["llm_errors"] == 0
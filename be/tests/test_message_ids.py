@@ -0,0 +1,53 @@
+"""id tin nhắn do database cấp: không trùng khi nhiều thread cùng ghi, tăng dần theo thứ tự ghi."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sqlalchemy import func, select
+
+from app.database.db import SessionLocal
+from app.models.models import Message, Thread
+from app.services import message_service
+
+WRITERS = 8
+MESSAGES_PER_WRITER = 250
+
+
+def test_parallel_posts_never_collide(users, make_thread):
+    # Một nửa số writer ghi chung một thread (tranh chấp cả dòng tóm tắt của thread)
+    shared = make_thread()
+    own = [make_thread() for _ in range(WRITERS // 2)]
+    targets = [shared.id] * (WRITERS - len(own)) + [t.id for t in own]
+    student_id = users["student1"].id
+
+    def post(thread_id: str) -> List[int]:
+        ids = []
+        with SessionLocal() as db:
+            for i in range(MESSAGES_PER_WRITER):
+                message = message_service.create_message(
+                    db, thread_id, {"text": f"Tin {i}", "sender": "student"}, student_id
+                )
+                ids.append(message.id)
+        return ids
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        results = list(pool.map(post, targets))
+
+    ids = [i for writer in results for i in writer]
+    assert len(ids) == WRITERS * MESSAGES_PER_WRITER
+    assert len(set(ids)) == len(ids)
+    # Mỗi writer nhận id tăng dần: id dùng được làm cursor (after_id)
+    assert all(writer == sorted(writer) for writer in results)
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count()).select_from(Message).where(Message.id.in_(ids)))
+        assert stored == len(ids)
+        assert db.get(Thread, shared.id).message_count == MESSAGES_PER_WRITER * (WRITERS - len(own))
+
+
+def test_create_message_does_not_print_message_text(users, make_thread, capsys):
+    thread = make_thread()
+    with SessionLocal() as db:
+        message_service.create_message(db, thread.id, {"text": "Số tài khoản của em là 0123456789", "sender": "student"},
+                                       users["student1"].id)
+
+    assert "0123456789" not in capsys.readouterr().out
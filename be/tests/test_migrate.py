@@ -0,0 +1,46 @@
+"""migrate.py trên một file SQLite mới: tạo bảng từ models, đánh dấu alembic ở head duy nhất,
+và lần chạy upgrade sau đó không còn gì để làm."""
+import os
+import subprocess
+import sys
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BE_DIR)
+
+import migrate  # noqa: E402
+
+
+def run_migrate(database_url: str, *args: str) -> subprocess.CompletedProcess:
+    # settings đọc DATABASE_URL lúc import, nên chạy migrate.main() trong tiến trình riêng
+    env = dict(os.environ, DATABASE_URL=database_url)
+    return subprocess.run(
+        [sys.executable, "-c", "import sys, migrate; sys.exit(migrate.main(sys.argv[1:]))", *args],
+        cwd=BE_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_create_all_then_upgrade_on_fresh_sqlite(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    heads = ScriptDirectory.from_config(migrate._alembic_config()).get_heads()
+    assert len(heads) == 1, heads
+
+    created = run_migrate(database_url, "--create-all")
+    assert created.returncode == 0, created.stderr
+
+    engine = create_engine(database_url)
+    try:
+        tables = set(inspect(engine).get_table_names())
+        assert {"users", "threads", "messages", "thread_stats", "threads_archive"} <= tables
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT version_num FROM alembic_version")).scalars().all() == heads
+
+        # Đã ở head: upgrade không chạy migration nào (các migration cũ chỉ chạy được trên MySQL)
+        upgraded = run_migrate(database_url)
+        assert upgraded.returncode == 0, upgraded.stderr
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT version_num FROM alembic_version")).scalars().all() == heads
+    finally:
+        engine.dispose()
@@ -0,0 +1,142 @@
+"""Phân trang theo cursor: đi hết các trang không trùng, không sót; limit có giới hạn;
+trang sâu theo cursor nhanh như trang đầu (skip thì chậm dần theo độ sâu)."""
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.database.db import SessionLocal, engine
+from app.models.models import Thread
+from app.services import auth_service, thread_service
+from app.services.pagination import MAX_PAGE_SIZE, encode_cursor
+
+# Số thread tổng hợp của một sinh viên, cỡ trang, và các độ sâu (vị trí bắt đầu trang) cần đo
+SYNTHETIC_THREADS = 20_000
+PAGE_SIZE = 50
+DEPTHS = (0, 1_000, 10_000, SYNTHETIC_THREADS - PAGE_SIZE)
+
+
+def walk(client, url, key, headers, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page[key]) <= limit
+        items.extend(page[key])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_thread_pages_cover_every_thread_once(client, auth_headers, make_thread):
+    created = {make_thread(student="student2").id for _ in range(7)}
+
+    threads = walk(client, "/threads", "threads", auth_headers("student2"), limit=3)
+    ids = [t["id"] for t in threads]
+
+    assert len(ids) == len(set(ids))
+    assert created <= set(ids)
+    # Mới nhất trước
+    assert [t["created_at"] for t in threads] == sorted((t["created_at"] for t in threads), reverse=True)
+
+
+def test_message_pages_are_oldest_first(client, auth_headers, make_thread):
+    thread = make_thread(messages=7)
+
+    messages = walk(client, f"/threads/{thread.id}/messages", "messages", auth_headers("student1"), limit=3)
+
+    assert [m["text"] for m in messages] == [f"Tin nhắn số {i}" for i in range(7)]
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": MAX_PAGE_SIZE + 1}, {"skip": -1}])
+def test_page_size_is_bounded(client, auth_headers, params):
+    response = client.get("/threads", params=params, headers=auth_headers("manager"))
+    assert response.status_code == 422
+
+
+@pytest.fixture(scope="module")
+def crowded_student(database) -> dict:
+    """Sinh viên có SYNTHETIC_THREADS thread, created_at cách nhau 1 giây (id theo thứ tự mới nhất trước)."""
+    start = datetime(2025, 1, 1)
+    rows = [
+        {"id": str(uuid.uuid4()), "title": f"Thread tổng hợp {i}", "status": "pending", "priority": "normal",
+         "created_at": start + timedelta(seconds=i), "updated_at": start + timedelta(seconds=i)}
+        for i in range(SYNTHETIC_THREADS)
+    ]
+    with SessionLocal() as db:
+        student = auth_service.create_user(
+            db, "bench_student", "bench_student@example.edu.vn", "Bench Student", "password123", "student", None
+        )
+        db.execute(insert(Thread), [{**row, "student_id": student.id} for row in rows])
+        thread_service.bump_thread_stat(db, "pending", None, SYNTHETIC_THREADS)
+        db.commit()
+        rows.reverse()
+        return {"id": student.id, "threads": rows}
+
+
+def cursor_at(threads: List[dict], depth: int):
+    """Cursor của trang bắt đầu ở vị trí depth (khóa của dòng ngay trước đó)."""
+    if depth == 0:
+        return None
+    last = threads[depth - 1]
+    return encode_cursor(last["created_at"], last["id"])
+
+
+def best_ms(call: Callable, repeat: int = 7) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            call(db)
+            best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def test_deep_cursor_pages_stay_flat(crowded_student):
+    student, threads = crowded_student["id"], crowded_student["threads"]
+
+    def by_cursor(depth):
+        return lambda db: thread_service.list_threads_by_student(db, student, limit=PAGE_SIZE, cursor=cursor_at(threads, depth))
+
+    def by_skip(depth):
+        return lambda db: thread_service.list_threads_by_student(db, student, skip=depth, limit=PAGE_SIZE)
+
+    for depth in DEPTHS:
+        with SessionLocal() as db:
+            page = [t.id for t in by_cursor(depth)(db)]
+            assert page == [t.id for t in by_skip(depth)(db)]
+            assert page == [t["id"] for t in threads[depth:depth + PAGE_SIZE]]
+
+    cursor_ms = {depth: best_ms(by_cursor(depth)) for depth in DEPTHS}
+    skip_ms = {depth: best_ms(by_skip(depth)) for depth in DEPTHS}
+    deepest = DEPTHS[-1]
+
+    # Cursor: trang cuối không chậm hơn đáng kể so với trang đầu; skip: chậm dần theo độ sâu
+    assert cursor_ms[deepest] < 2 * cursor_ms[0] + 0.5, (cursor_ms, skip_ms)
+    assert skip_ms[deepest] > 3 * cursor_ms[deepest], (cursor_ms, skip_ms)
+
+
+def test_deep_cursor_page_seeks_the_index(crowded_student):
+    student, threads = crowded_student["id"], crowded_student["threads"]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            thread_service.list_threads_by_student(db, student, limit=PAGE_SIZE, cursor=cursor_at(threads, DEPTHS[-1]))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    (statement, parameters), = statements
+    with engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    # Khoảng quét bắt đầu ngay tại cursor, không đọc lại các dòng đứng trước
+    assert any("ix_threads_student_id_created_at (student_id=? AND created_at<?)" in step for step in plan), plan
@@ -0,0 +1,35 @@
+"""/diagnostics/db-pool: số liệu pool đúng quyền xem, và vẫn đo được sau khi engine.dispose() thay pool mới."""
+from sqlalchemy import text
+
+from app.config.settings import DB_POOL_SIZE
+from app.database.db import engine
+
+
+def primary_pool(client, headers) -> dict:
+    response = client.get("/diagnostics/db-pool", headers=headers)
+    assert response.status_code == 200, response.text
+    return next(pool for pool in response.json()["pools"] if pool["name"] == "primary")
+
+
+def test_pool_metrics_survive_engine_dispose(client, auth_headers):
+    headers = auth_headers("manager")
+    assert client.get("/diagnostics/db-pool", headers=auth_headers("student1")).status_code == 403
+
+    before = primary_pool(client, headers)
+    assert before["pool_class"] == "InstrumentedQueuePool"
+    assert before["size"] == DB_POOL_SIZE
+
+    old_pool = engine.pool
+    engine.dispose()
+    assert engine.pool is not old_pool
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        # Số liệu đọc từ pool mới (pool cũ không còn connection nào được mượn)
+        during = primary_pool(client, headers)
+        assert during["checked_out"] >= 1
+
+    after = primary_pool(client, headers)
+    assert after["checked_out"] == 0
+    # Lượt mượn connection trên pool mới vẫn được đếm
+    assert after["checkouts"] > before["checkouts"]
+    assert after["connects"] > before["connects"]
@@ -0,0 +1,49 @@
+"""Số câu lệnh SQL của các endpoint danh sách không tăng theo số phần tử (không N+1)."""
+import pytest
+
+from app.database.db import SessionLocal
+from app.schemas import ThreadCreate, ThreadUpdate
+from app.services import message_service, thread_service
+
+# Xác thực (users) + kiểm tra thread + truy vấn danh sách, cộng dư một câu
+MAX_LIST_QUERIES = 4
+
+
+@pytest.fixture(scope="module")
+def busy_thread(users):
+    """Thread có nhiều tin nhắn của nhiều người gửi, được phân công cho phòng ban."""
+    with SessionLocal() as db:
+        thread = thread_service.create_thread(db, ThreadCreate(title="Thread đông", topic="Khác"), users["student1"].id)
+        thread_service.update_thread(db, thread.id, ThreadUpdate(assigned_to="Phòng Đào tạo"))
+        authors = [("student", users["student1"].id), ("department", users["daotao"].id), ("assistant", None)]
+        for i in range(30):
+            sender, user_id = authors[i % len(authors)]
+            message_service.create_message(db, thread.id, {"text": f"Tin {i}", "sender": sender}, user_id, commit=False)
+        db.commit()
+        return thread
+
+
+@pytest.mark.parametrize("username, url", [
+    ("student1", "/threads"),
+    ("daotao", "/threads"),
+    ("manager", "/threads"),
+    ("manager", "/threads?sort=last_message_at"),
+    ("leader", "/leadership/threads"),
+    ("manager", "/departments"),
+    ("student1", "/threads/{thread_id}/messages"),
+])
+def test_list_endpoint_query_count(client, auth_headers, count_queries, busy_thread, username, url):
+    url = url.format(thread_id=busy_thread.id)
+    separator = "&" if "?" in url else "?"
+
+    counts = []
+    for limit in (1, 30):
+        # Token mới mỗi lần: tính cả truy vấn users (không trúng cache người dùng)
+        headers = auth_headers(username)
+        with count_queries() as statements:
+            response = client.get(f"{url}{separator}limit={limit}", headers=headers)
+        assert response.status_code == 200, response.text
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1], f"{url}: query count grows with page size {counts}"
+    assert counts[1] <= MAX_LIST_QUERIES, f"{url}: {counts[1]} queries: {statements}"
@@ -0,0 +1,70 @@
+"""Session chỉ đọc (get_read_db) với replica là một file SQLite riêng: đọc từ replica, ghi vào
+database chính, và đọc trong transaction đã ghi thì ở lại database chính."""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app.database import db as database_module
+from app.database.db import Base, SessionLocal, get_read_db
+from app.models.models import Thread
+from app.services import thread_service
+
+
+def thread_row(title: str) -> dict:
+    return {"id": str(uuid.uuid4()), "title": title, "status": "pending", "priority": "normal"}
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """Replica riêng (chưa đồng bộ với database chính) có một thread chỉ tồn tại ở replica."""
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica_engine)
+    row = thread_row("Chỉ có ở replica")
+    with replica_engine.begin() as conn:
+        conn.execute(insert(Thread), [row])
+    monkeypatch.setattr(database_module, "analytics_engine", replica_engine)
+    yield row["id"]
+    replica_engine.dispose()
+
+
+def read_session():
+    dependency = get_read_db()
+    return dependency, next(dependency)
+
+
+def test_reads_go_to_replica_and_writes_to_primary(replica, make_thread):
+    primary_only = make_thread(title="Chỉ có ở database chính").id
+    dependency, db = read_session()
+    try:
+        assert db.get(Thread, replica) is not None
+        assert db.get(Thread, primary_only) is None
+        db.rollback()
+
+        written = thread_row("Ghi qua session chỉ đọc")
+        db.execute(insert(Thread), [written])
+        thread_service.bump_thread_stat(db, "pending", None, 1)
+        db.commit()
+    finally:
+        dependency.close()
+
+    with SessionLocal() as primary:
+        assert primary.get(Thread, written["id"]) is not None
+        assert primary.get(Thread, replica) is None
+
+
+def test_reads_inside_write_transaction_stay_on_primary(replica):
+    dependency, db = read_session()
+    try:
+        added = Thread(**thread_row("Thêm trong transaction"))
+        db.add(added)
+        db.flush()
+        # Chưa commit: chỉ database chính thấy dòng vừa ghi
+        titles = db.scalars(select(Thread.title).filter(Thread.id.in_([added.id, replica]))).all()
+        assert titles == ["Thêm trong transaction"]
+        db.rollback()
+
+        # Transaction mới: đọc lại từ replica
+        assert db.scalars(select(Thread.title).filter(Thread.id.in_([added.id, replica]))).all() == ["Chỉ có ở replica"]
+    finally:
+        dependency.close()
@@ -0,0 +1,44 @@
+"""Khởi động app trong process mới: nằm trong ngân sách thời gian, không import module nặng;
+khóa JWT mặc định chỉ dùng được khi APP_ENV là development (mặc định)."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.startup_profile import profile
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cùng ngân sách với lệnh kiểm tra trong README (python -m app.startup_profile --budget-ms 1500)
+STARTUP_BUDGET_MS = 1500
+
+
+def test_startup_within_budget(database):
+    report = profile()
+
+    assert report["heavy_modules_loaded"] == []
+    assert report["total_ms"] < STARTUP_BUDGET_MS, [
+        (m["module"], m["cumulative_ms"]) for m in report["packages"][:10]
+    ]
+
+
+@pytest.mark.parametrize("app_env, expected", [
+    (None, "dev-secret-change-me"),
+    ("development", "dev-secret-change-me"),
+    ("production", "RuntimeError"),
+])
+def test_dev_secret_key_only_outside_production(app_env, expected):
+    # settings đọc biến môi trường lúc import: kiểm tra trong process mới, không có AUTH_SECRET_KEY
+    env = {k: v for k, v in os.environ.items() if k not in ("APP_ENV", "AUTH_SECRET_KEY")}
+    if app_env is not None:
+        env["APP_ENV"] = app_env
+    code = (
+        "from app.services import auth_service\n"
+        "try:\n    print(auth_service.secret_key())\n"
+        "except RuntimeError:\n    print('RuntimeError')"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BE_DIR, env=env, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == expected
@@ -0,0 +1,100 @@
+"""Bộ đếm thread_stats: cập nhật cùng transaction với thread, không mất lượt khi nhiều
+transaction cùng cộng, và reconcile dựng lại bộ đếm (kể cả thread đã lưu trữ) kèm báo cáo sai lệch."""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from app.database.db import SessionLocal
+from app.models.models import ThreadArchive, ThreadStat
+from app.schemas import ThreadUpdate
+from app.services import thread_service
+
+WRITERS = 8
+BUMPS_PER_WRITER = 50
+
+
+@pytest.fixture
+def department() -> str:
+    return f"Khoa thống kê {uuid.uuid4().hex[:8]}"
+
+
+def counters(department: str) -> dict:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(ThreadStat.status, ThreadStat.count).filter(ThreadStat.assigned_to == department)
+        ).all()
+    return {status: count for status, count in rows if count}
+
+
+def exact_statistics() -> dict:
+    with SessionLocal() as db:
+        return thread_service._summarize_counts(thread_service.count_thread_statistics(db))
+
+
+def test_counters_follow_thread_updates(users, make_thread, department):
+    thread = make_thread(assigned_to=department)
+    assert counters(department) == {"pending": 1}
+
+    with SessionLocal() as db:
+        thread_service.update_thread(db, thread.id, ThreadUpdate(status="in_progress"))
+    make_thread(assigned_to=department)
+    assert counters(department) == {"pending": 1, "in_progress": 1}
+
+    with SessionLocal() as db:
+        stats = thread_service.get_thread_statistics(db)
+    assert stats["by_department"][department] == 2
+    assert stats == exact_statistics()
+
+
+def test_concurrent_bumps_are_not_lost(database, department):
+    # Các writer cùng tạo rồi cùng cộng vào một dòng bộ đếm chưa có sẵn
+    def bump(_):
+        for _ in range(BUMPS_PER_WRITER):
+            with SessionLocal() as db:
+                thread_service.bump_thread_stat(db, "resolved", department, 1)
+                db.commit()
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        list(pool.map(bump, range(WRITERS)))
+
+    assert counters(department) == {"resolved": WRITERS * BUMPS_PER_WRITER}
+
+    with SessionLocal() as db:
+        thread_service.bump_thread_stat(db, "resolved", department, -WRITERS * BUMPS_PER_WRITER)
+        db.commit()
+    assert counters(department) == {}
+
+
+def test_reconcile_reports_drift_and_rebuilds(users, make_thread, department):
+    with SessionLocal() as db:
+        thread_service.reconcile_thread_statistics(db)
+    make_thread(assigned_to=department)
+    make_thread(assigned_to=department)
+    make_thread()
+
+    with SessionLocal() as db:
+        # Bộ đếm bị lệch, thiếu dòng (bảng chỉ có một phần dữ liệu), và một thread lưu trữ
+        # được ghi thẳng vào database mà không qua bộ đếm
+        db.execute(update(ThreadStat).filter(ThreadStat.assigned_to == department).values(count=5))
+        db.execute(delete(ThreadStat).filter(ThreadStat.status == "pending", ThreadStat.assigned_to == ""))
+        db.execute(insert(ThreadArchive).values(
+            id=str(uuid.uuid4()), title="Đã lưu trữ", assigned_to=department, status="resolved", priority="normal",
+        ))
+        db.commit()
+        missing = exact_statistics()["total"] - thread_service.get_thread_statistics(db)["total"]
+        assert missing != 0
+
+        report = thread_service.reconcile_thread_statistics(db)
+
+    drift = {(d["status"], d["assigned_to"]): (d["stored"], d["actual"]) for d in report["drift"]}
+    assert drift[("pending", department)] == (5, 2)
+    assert drift[("resolved", department)] == (0, 1)
+    assert drift[("pending", None)][0] == 0
+    assert len(drift) == 3
+
+    assert counters(department) == {"pending": 2, "resolved": 1}
+    with SessionLocal() as db:
+        assert thread_service.get_thread_statistics(db) == exact_statistics()
+        assert thread_service.reconcile_thread_statistics(db)["drift"] == []
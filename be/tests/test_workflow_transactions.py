@@ -0,0 +1,114 @@
+"""Mỗi thao tác nghiệp vụ là đúng một transaction, với số câu lệnh cố định (không refresh sau commit)."""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+
+from app.database.db import SessionLocal, engine
+from app.schemas import ThreadCreate, ThreadResponse, ThreadUpdate
+from app.schemas.department_schemas import DepartmentCreate
+from app.services import department_service, message_service, thread_service, workflow_service
+
+
+@contextmanager
+def count_commits() -> Iterator[List[int]]:
+    commits: List[int] = []
+
+    def record(conn) -> None:
+        commits.append(1)
+
+    event.listen(engine, "commit", record)
+    try:
+        yield commits
+    finally:
+        event.remove(engine, "commit", record)
+
+
+@pytest.fixture(scope="module")
+def department(users) -> str:
+    """Phòng ban đã có sẵn, để assign không phải tạo mới."""
+    with SessionLocal() as db:
+        if not department_service.get_department_by_name(db, "Phòng Đào tạo"):
+            department_service.create_department(db, DepartmentCreate(name="Phòng Đào tạo"))
+    return "Phòng Đào tạo"
+
+
+def create_with_issue(db, thread, users):
+    return workflow_service.create_thread_with_issue(
+        db, ThreadCreate(title="Xin giấy xác nhận", topic="Khác", issue="Em cần giấy xác nhận sinh viên"),
+        users["student1"].id,
+    )
+
+
+def assign(db, thread, users):
+    return workflow_service.assign_thread(db, thread, "Phòng Đào tạo")
+
+
+def assign_new_department(db, thread, users):
+    return workflow_service.assign_thread(db, thread, f"Khoa mới {thread.id[:8]}")
+
+
+def escalate(db, thread, users):
+    return workflow_service.escalate_thread(db, thread)
+
+
+def respond(db, thread, users):
+    return workflow_service.respond_to_thread(
+        db, thread, ThreadUpdate(status="in_progress", response="Phòng đang xử lý"),
+        "department", users["daotao"].id, "Phòng Đào tạo",
+    )
+
+
+def resolve(db, thread, users):
+    return workflow_service.respond_to_thread(
+        db, thread, ThreadUpdate(status="resolved", response="Đã gửi giấy xác nhận"),
+        "department", users["daotao"].id, "Phòng Đào tạo",
+    )
+
+
+# Số câu lệnh tối đa: đọc phòng ban (assign), UPSERT thread_stats (cũ/mới), UPDATE tóm tắt
+# và trạng thái thread, đọc lại cột tóm tắt trong cùng flush, INSERT tin nhắn/phòng ban
+@pytest.mark.parametrize("action, max_statements", [
+    (create_with_issue, 3),
+    (assign, 7),
+    (assign_new_department, 8),
+    (escalate, 6),
+    (respond, 6),
+    (resolve, 8),
+])
+def test_workflow_action_is_one_transaction(users, department, make_thread, count_queries, action, max_statements):
+    thread = make_thread()
+    with SessionLocal() as db:
+        thread = thread_service.get_thread(db, thread.id)
+        with count_commits() as commits, count_queries() as statements:
+            result = action(db, thread, users)
+        assert len(commits) == 1
+        assert len(statements) <= max_statements, statements
+
+        # Không refresh sau commit: serialize kết quả không cần truy vấn nào
+        if isinstance(result, tuple):
+            result = result[0]
+        with count_queries() as statements:
+            ThreadResponse.model_validate(result, from_attributes=True)
+        assert statements == []
+
+
+def test_failed_action_rolls_back_everything(users, make_thread, monkeypatch):
+    thread = make_thread()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    thread_id = thread.id
+    with SessionLocal() as db:
+        before = thread_service.get_thread_statistics(db)
+        thread = thread_service.get_thread(db, thread_id)
+        # Lỗi ở bước cuối, sau khi đã cập nhật trạng thái thread và thread_stats
+        monkeypatch.setattr(message_service, "create_message", fail)
+        with pytest.raises(RuntimeError):
+            workflow_service.escalate_thread(db, thread)
+
+    with SessionLocal() as db:
+        assert thread_service.get_thread(db, thread_id).status == "pending"
+        assert thread_service.get_thread_statistics(db) == before
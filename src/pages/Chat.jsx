@@ -1,4 +1,5 @@
 import { useCallback, useEffect, useRef, useState } from 'react'
+import { refreshAccessToken } from '../utils/api'
 
 const API_BASE = 'http://localhost:8000'
 
@@ -12,7 +13,10 @@ export default function Chat() {
   const [error, setError] = useState('')
   const [user, setUser] = useState(null)
   const [loading, setLoading] = useState(false)
+  // Phản hồi tự động đang được sinh (null = không có)
+  const [streaming, setStreaming] = useState(null)
   const pollRef = useRef(null)
+  const lastIdRef = useRef(null)
 
   useEffect(() => {
     const u = localStorage.getItem('auth_user')
@@ -27,7 +31,7 @@ export default function Chat() {
   }, [])
 
   const fetchThreads = useCallback(async () => {
-    const res = await fetch(`${API_BASE}/threads`, { headers: { ...authHeaders() } })
+    const res = await fetch(`${API_BASE}/threads?sort=last_message_at`, { headers: { ...authHeaders() } })
     const data = await res.json()
     setThreads(data.threads || [])
   }, [authHeaders])
@@ -70,29 +74,110 @@ export default function Chat() {
     if (!threadId) return
     setLoading(true)
     try {
-      const res = await fetch(`${API_BASE}/threads/${threadId}/messages`, { headers: { ...authHeaders() } })
-      const data = await res.json()
-      setMessages(data.messages || [])
+      // Lấy lần lượt từng trang theo next_cursor
+      let all = []
+      let cursor = null
+      do {
+        const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+        const res = await fetch(`${API_BASE}/threads/${threadId}/messages${qs}`, { headers: { ...authHeaders() } })
+        const data = await res.json()
+        all = all.concat(data.messages || [])
+        cursor = data.next_cursor
+      } while (cursor)
+      setMessages(all)
+      lastIdRef.current = all.length ? all[all.length - 1].id : null
     } finally {
       setLoading(false)
     }
   }, [authHeaders])
 
+  // Chỉ lấy tin nhắn mới sau tin nhắn cuối cùng đã có (204 = không có gì mới)
+  const fetchNewMessages = useCallback(async (threadId) => {
+    if (!threadId) return
+    if (!lastIdRef.current) return fetchMessages(threadId)
+    const res = await fetch(
+      `${API_BASE}/threads/${threadId}/messages?after_id=${encodeURIComponent(lastIdRef.current)}`,
+      { headers: { ...authHeaders() } }
+    )
+    // Access token hết hạn: làm mới, lần poll sau dùng token mới
+    if (res.status === 401) { await refreshAccessToken(); return }
+    if (res.status === 204 || !res.ok) return
+    const data = await res.json()
+    const fresh = data.messages || []
+    if (!fresh.length) return
+    lastIdRef.current = fresh[fresh.length - 1].id
+    setMessages(prev => {
+      const known = new Set(prev.map(m => m.id))
+      return prev.concat(fresh.filter(m => !known.has(m.id)))
+    })
+  }, [authHeaders, fetchMessages])
+
   const startPolling = useCallback((threadId) => {
     if (pollRef.current) clearInterval(pollRef.current)
-    pollRef.current = setInterval(() => fetchMessages(threadId), 1000)
-  }, [fetchMessages])
+    pollRef.current = setInterval(() => fetchNewMessages(threadId), 1000)
+  }, [fetchNewMessages])
 
   useEffect(() => { fetchThreads() }, [fetchThreads])
 
   useEffect(() => {
     if (activeThread) {
+      lastIdRef.current = null
       fetchMessages(activeThread)
       startPolling(activeThread)
       return () => { if (pollRef.current) clearInterval(pollRef.current) }
     }
   }, [activeThread, fetchMessages, startPolling])
 
+  // Nhận phản hồi tự động theo từng đoạn qua SSE; polling vẫn chạy làm dự phòng
+  useEffect(() => {
+    if (!activeThread) return
+    const controller = new AbortController()
+    setStreaming(null)
+
+    const handleEvent = (event) => {
+      if (event.type === 'start') setStreaming('')
+      else if (event.type === 'chunk') setStreaming(prev => (prev || '') + event.text)
+      else if (event.type === 'done') {
+        setStreaming(null)
+        setMessages(prev => prev.some(m => m.id === event.message.id) ? prev : prev.concat(event.message))
+      }
+    }
+
+    const listen = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const res = await fetch(`${API_BASE}/threads/${activeThread}/stream`, {
+            headers: { ...authHeaders() },
+            signal: controller.signal,
+          })
+          if (res.status === 401) await refreshAccessToken()
+          else if (res.ok && res.body) {
+            const reader = res.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ''
+            for (;;) {
+              const { value, done } = await reader.read()
+              if (done) break
+              buffer += decoder.decode(value, { stream: true })
+              const blocks = buffer.split('\n\n')
+              buffer = blocks.pop()
+              for (const block of blocks) {
+                const data = block.split('\n').find(line => line.startsWith('data: '))
+                if (data) handleEvent(JSON.parse(data.slice(6)))
+              }
+            }
+          }
+        } catch (e) {
+          if (controller.signal.aborted) return
+        }
+        // Mất kết nối: thử lại sau một lúc
+        await new Promise(resolve => setTimeout(resolve, 2000))
+      }
+    }
+    listen()
+    return () => controller.abort()
+  }, [activeThread, authHeaders])
+
   const sendMessage = useCallback(async () => {
     if (!activeThread || !input.trim()) return
     const text = input.trim()
@@ -102,11 +187,12 @@ export default function Chat() {
       headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify({ text, sender: 'student' })
     })
-    await fetchMessages(activeThread)
-  }, [activeThread, input, fetchMessages, authHeaders])
+    await fetchNewMessages(activeThread)
+  }, [activeThread, input, fetchNewMessages, authHeaders])
 
   const logout = useCallback(() => {
     localStorage.removeItem('auth_token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('auth_user')
     window.location.href = '/login'
   }, [])
@@ -138,7 +224,8 @@ export default function Chat() {
           {threads.map(t => (
             <li key={t.id} className={activeThread === t.id ? 'active' : ''} onClick={() => setActiveThread(t.id)}>
               <div className="thread-title">{t.title}</div>
-              <div className="thread-meta">{new Date(t.created_at).toLocaleString()}</div>
+              {t.last_message_preview ? <div className="thread-preview">{t.last_message_preview}</div> : null}
+              <div className="thread-meta">{new Date(t.last_message_at || t.created_at).toLocaleString()} · {t.message_count} tin nhắn</div>
             </li>
           ))}
         </ul>
@@ -156,6 +243,14 @@ export default function Chat() {
                   <div className="bubble">{m.text}</div>
                 </div>
               ))}
+              {streaming !== null && (
+                <div className="msg msg-assistant streaming">
+                  <div className="meta">
+                    <span className="sender">assistant</span>
+                  </div>
+                  <div className="bubble">{streaming || '...'}</div>
+                </div>
+              )}
               {loading && <div className="loading">Đang tải...</div>}
             </div>
             <div className="composer">
@@ -9,8 +9,32 @@ const getToken = () => {
   return tokenData || '';
 };
 
+// Đổi refresh token lấy access token mới; trả về false nếu không còn hiệu lực
+export const refreshAccessToken = async () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) return false;
+  try {
+    const response = await fetch(`${API_URL}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!response.ok) {
+      localStorage.removeItem('refresh_token');
+      return false;
+    }
+    const result = await response.json();
+    localStorage.setItem('auth_token', result.access_token);
+    if (result.refresh_token) localStorage.setItem('refresh_token', result.refresh_token);
+    return true;
+  } catch (error) {
+    console.error('Làm mới token thất bại:', error);
+    return false;
+  }
+};
+
 // Helper function for making API requests
-export const apiRequest = async (endpoint, method = 'GET', data = null) => {
+export const apiRequest = async (endpoint, method = 'GET', data = null, retried = false) => {
   try {
     const url = `${API_URL}${endpoint}`;
     const token = getToken();
@@ -46,6 +70,11 @@ export const apiRequest = async (endpoint, method = 'GET', data = null) => {
     const response = await fetch(url, options);
     console.log(`Response status: ${response.status} ${response.statusText}`);
     
+    // Access token hết hạn: làm mới một lần rồi gửi lại
+    if (response.status === 401 && !retried && await refreshAccessToken()) {
+      return apiRequest(endpoint, method, data, true);
+    }
+    
     // Handle non-JSON responses
     let result;
     const contentType = response.headers.get('content-type');
@@ -107,4 +136,5 @@ export const loginRequest = async (username, password) => {
 export default {
   apiRequest,
   loginRequest,
+  refreshAccessToken,
 };
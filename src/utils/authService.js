@@ -11,6 +11,9 @@ export const login = async (username, password) => {
     if (response.access_token) {
       localStorage.setItem('auth_token', response.access_token);
     }
+    if (response.refresh_token) {
+      localStorage.setItem('refresh_token', response.refresh_token);
+    }
     
     // Extract user data
     const userData = response.user || {};
@@ -55,6 +58,7 @@ export const getCurrentUser = async () => {
 export const logout = () => {
   // Clear stored auth data
   localStorage.removeItem('auth_token');
+  localStorage.removeItem('refresh_token');
   localStorage.removeItem('auth_user');
   
   return {